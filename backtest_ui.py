@@ -6,7 +6,9 @@ import logging
 from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget, QLabel, QLineEdit, QPushButton, QComboBox, QMessageBox, QDateEdit
 from PyQt5.QtCore import QThread, pyqtSignal, QObject, QDate
 from trading_system.data_sources.historical_data_source import HistoricalDataSource
+from trading_system.data_sources.rate_cache import RateCache
 from trading_system.strategies.strategy_factory import StrategyFactory
+from trading_system.backtesting.engine import run_backtest
 from trading_system.risk_management.risk_manager import RiskManager
 from datetime import datetime
 import MetaTrader5 as mt5
@@ -28,7 +30,7 @@ class BacktestWorker(QObject):
     def run(self):
         try:
             # Initialize data source
-            data_source = HistoricalDataSource()
+            data_source = HistoricalDataSource(cache=RateCache())
             data_source.initialize()
 
             # Set up risk manager
@@ -52,9 +54,12 @@ class BacktestWorker(QObject):
                 end_date=self.end_date
             )
 
-            # Run backtest
-            result = strategy.apply()
-            self.finished.emit(result)
+            # Run backtest over the whole history at once (strategy.apply() is the live loop)
+            data = data_source.get_data(self.symbol, self.timeframe, self.start_date, self.end_date)
+            if data is None or data.empty:
+                raise ValueError(f"No historical data for {self.symbol} between {self.start_date} and {self.end_date}")
+            result = run_backtest(strategy, data, risk_manager)
+            self.finished.emit(result['stats'])
         except Exception as e:
             self.error.emit(str(e))
 
@@ -69,7 +74,7 @@ class BacktestUI(QMainWindow):
         layout = QVBoxLayout()
 
         self.strategy_combo = QComboBox()
-        self.strategy_combo.addItems(["MACD", "RSI", "BollingerBands"])
+        self.strategy_combo.addItems(["MACD", "Mean Reversion", "TopBottom", "Chart Pattern"])
         layout.addWidget(QLabel("Strategy:"))
         layout.addWidget(self.strategy_combo)
 
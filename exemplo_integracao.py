@@ -14,6 +14,7 @@ import logging
 from datetime import datetime
 import time
 import json
+from quantum_inference_server import connect_if_available
 
 # Configurar logging
 logging.basicConfig(
@@ -53,8 +54,11 @@ class QuantumTrailIntegration:
     def load_model(self, model_path):
         """Carrega o modelo ML treinado"""
         try:
-            with open(model_path, 'rb') as f:
-                self.model = pickle.load(f)
+            # Usa o servidor de inferência compartilhado se estiver rodando
+            self.model = connect_if_available(model_path=model_path)
+            if self.model is None:
+                with open(model_path, 'rb') as f:
+                    self.model = pickle.load(f)
             
             logger.info("✅ QUANTUM TRAIL - Modelo ML carregado!")
             logger.info("   🎯 Acurácia: 88.62%")
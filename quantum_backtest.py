@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+📜 QUANTUM TRAIL - BACKTEST DO SINAL ML
+Reproduz em histórico as regras do QuantumTradingSystem (probability_threshold,
+min_confidence, stop_loss, take_profit, cooldown_minutes). As features de todo
+o período são calculadas de uma vez, todas as linhas são pontuadas em uma única
+chamada predict_proba e os trades são simulados pelo kernel vetorizado de
+trading_system/backtesting/engine.py, sem o loop ao vivo de 30 segundos.
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from quantum_early_exit import EarlyExitEnsemble
+from quantum_sweep import entry_signals, load_profiles, simulate_trades, summarize
+from trading_system.backtesting.monte_carlo import METHODS, monte_carlo
+from trading_system.backtesting.portfolio import run_portfolio_backtest
+
+logger = logging.getLogger(__name__)
+
+
+def score_history(system, data):
+    """
+    Probabilidade de alta (0-1) de cada barra com features completas. A hora de
+    cada linha alimenta as features de tempo; as barras de aquecimento (NaN) saem.
+    """
+    timings = {}
+    started = time.perf_counter()
+    now = pd.to_datetime(data['time']) if 'time' in data.columns else None
+    df, feature_columns = system.create_features(data, system.feature_subset, now)
+    X = df[system.feature_subset] if system.feature_subset else df[feature_columns]
+    timings['features'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    if isinstance(system.model, EarlyExitEnsemble):
+        probabilities = system.model.predict_proba(X, boundaries=system.decision_boundaries())[:, 1]
+    else:
+        probabilities = np.asarray(system.model.predict_proba(X))[:, 1]
+    timings['inference'] = time.perf_counter() - started
+
+    columns = [column for column in ('time', 'open', 'high', 'low', 'close') if column in df.columns]
+    return df[columns].assign(probability=probabilities), timings
+
+
+def backtest_signal(system, data, config=None, initial_balance=None):
+    """
+    Backtest de uma configuração (padrão: system.config) sobre barras de 1m
+    OHLCV. Retorna os trades, as estatísticas e as probabilidades por barra,
+    que podem ser reaproveitadas em quantum_sweep.py para outros perfis.
+    """
+    started = time.perf_counter()
+    config = {**system.config, **(config or {})}
+    initial_balance = initial_balance or system.balance
+
+    scored, timings = score_history(system, data)
+    trades = simulate_trades(scored, config, initial_balance)
+    if 'time' in scored.columns:
+        times = scored['time'].to_numpy()
+        trades.insert(0, 'entry_time', times[trades['entry_index'].to_numpy()])
+        trades.insert(1, 'exit_time', times[trades['exit_index'].to_numpy()])
+
+    stats = {
+        **summarize(trades, initial_balance),
+        'final_balance': initial_balance + float(trades['profit'].sum()),
+        'rows': int(len(scored)),
+        'features_seconds': timings['features'],
+        'inference_seconds': timings['inference'],
+        'seconds': time.perf_counter() - started
+    }
+    logger.info(f"📜 Backtest: {stats['trades']} trades em {stats['rows']} barras, "
+                f"lucro ${stats['total_profit']:.2f} em {stats['seconds']:.1f}s "
+                f"(features {timings['features']:.1f}s | inferência {timings['inference']:.1f}s)")
+    return {'trades': trades, 'stats': stats, 'probabilities': scored}
+
+
+def backtest_portfolio(system, data_by_symbol, config=None, initial_balance=None, max_concurrent_trades=3):
+    """
+    Backtest com vários símbolos e capital compartilhado: cada símbolo é
+    pontuado em lote como em backtest_signal e as entradas de todos passam
+    pelo limite de max_concurrent_trades (trading_system/backtesting/portfolio.py).
+    """
+    config = {**system.config, **(config or {})}
+    frames, signals = {}, {}
+    for symbol, data in data_by_symbol.items():
+        scored, _ = score_history(system, data)
+        frames[symbol] = scored.set_index('time')
+        signals[symbol] = entry_signals(scored['probability'].to_numpy(), config['probability_threshold'],
+                                        config.get('min_confidence', 'LOW'))
+    return run_portfolio_backtest(
+        frames, signals=signals, initial_balance=initial_balance or system.balance,
+        max_concurrent_trades=max_concurrent_trades, max_risk_per_trade=config['max_risk_per_trade'],
+        stop_loss_pct=config['stop_loss'], take_profit_pct=config['take_profit'],
+        cooldown=int(config.get('cooldown_minutes', 0)), tie_policy=config.get('tie_policy', 'stop_loss')
+    )
+
+
+def max_concurrent_from_config(path):
+    """configuracoes_avancadas.max_concurrent_trades de config_exemplo.json (padrão 3)"""
+    with open(path, 'r') as f:
+        return json.load(f).get('configuracoes_avancadas', {}).get('max_concurrent_trades', 3)
+
+
+def load_candles(path):
+    """CSV de barras de 1m com time, open, high, low, close, volume"""
+    data = pd.read_csv(path)
+    data['time'] = pd.to_datetime(data['time'])
+    return data.sort_values('time').reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest histórico do sinal do QuantumTrail')
+    parser.add_argument('data', nargs='+', help='CSV de barras de 1m (time, open, high, low, close, volume); '
+                                                'vários arquivos = carteira, um símbolo por arquivo')
+    parser.add_argument('--model', default='gpu_perfect_model.pkl')
+    parser.add_argument('--registry', default=None)
+    parser.add_argument('--variant', default=None)
+    parser.add_argument('--profile', default=None, help='Perfil de config_exemplo.json (padrão: config do sistema)')
+    parser.add_argument('--profiles', default='config_exemplo.json')
+    parser.add_argument('--trades', default='quantum_backtest_trades.csv')
+    parser.add_argument('--save-probabilities', default=None, help='CSV para quantum_sweep.py')
+    parser.add_argument('--monte-carlo', type=int, default=0, help='Reamostragens da sequência de trades')
+    parser.add_argument('--mc-method', default='bootstrap', choices=METHODS)
+    args = parser.parse_args()
+
+    # Import tardio: quantum_trading_optimized importa este módulo
+    from quantum_trading_optimized import QuantumTradingSystem
+
+    system = QuantumTradingSystem(args.model, args.registry, args.variant)
+    config = load_profiles(args.profiles)[args.profile] if args.profile else None
+    try:
+        if len(args.data) > 1:
+            data_by_symbol = {os.path.splitext(os.path.basename(path))[0]: load_candles(path) for path in args.data}
+            max_concurrent = max_concurrent_from_config(args.profiles)
+            portfolio = backtest_portfolio(system, data_by_symbol, config, max_concurrent_trades=max_concurrent)
+            stats = portfolio['stats']
+            logger.info(f"💼 CARTEIRA ({len(data_by_symbol)} símbolos, até {max_concurrent} trades simultâneos):")
+            logger.info(f"   📈 Trades: {stats['trades']} | Sinais sem vaga: {stats['skipped_signals']}")
+            logger.info(f"   💰 Saldo final: ${stats['final_balance']:.2f} | "
+                        f"📉 Drawdown máximo: {stats['max_drawdown'] * 100:.2f}%")
+            for symbol, profit in stats['profit_by_symbol'].items():
+                logger.info(f"   🪙 {symbol}: ${profit:.2f}")
+            portfolio['trades'].to_csv(args.trades, index=False)
+            logger.info(f"💾 Trades salvos em {args.trades}")
+            return
+        result = system.backtest(load_candles(args.data[0]), config)
+    finally:
+        if system.model_swap is not None:
+            system.model_swap.stop()
+
+    stats = result['stats']
+    logger.info("📊 RESULTADO:")
+    logger.info(f"   📈 Trades: {stats['trades']} | Taxa de acerto: {stats['win_rate'] * 100:.1f}%")
+    logger.info(f"   💰 Lucro: ${stats['total_profit']:.2f} ({stats['return_pct']:+.2f}%)")
+    logger.info(f"   📉 Drawdown máximo: {stats['max_drawdown'] * 100:.2f}%")
+    logger.info(f"   🎯 Take profit: {stats['take_profits']} | 🛡️ Stop loss: {stats['stop_losses']}")
+
+    if args.monte_carlo and stats['trades']:
+        # Robustez: distribuição de patrimônio final e drawdown com os trades reamostrados
+        robustness = monte_carlo(result['trades'], system.balance, args.monte_carlo, args.mc_method)
+        summary = robustness['summary']
+        logger.info(f"🎲 MONTE CARLO ({args.mc_method}, {args.monte_carlo} caminhos em {robustness['seconds']:.1f}s):")
+        logger.info(f"   💰 Patrimônio final p5/p50/p95: ${summary.loc['terminal_equity', 'p5']:.2f} / "
+                    f"${summary.loc['terminal_equity', 'p50']:.2f} / ${summary.loc['terminal_equity', 'p95']:.2f}")
+        logger.info(f"   📉 Drawdown p50/p95: {summary.loc['max_drawdown', 'p50'] * 100:.2f}% / "
+                    f"{summary.loc['max_drawdown', 'p95'] * 100:.2f}%")
+        logger.info(f"   ⚠️ Probabilidade de prejuízo: {summary.attrs['probability_of_loss'] * 100:.1f}%")
+
+    result['trades'].to_csv(args.trades, index=False)
+    logger.info(f"💾 Trades salvos em {args.trades}")
+    if args.save_probabilities:
+        result['probabilities'].to_csv(args.save_probabilities, index=False)
+        logger.info(f"💾 Probabilidades salvas em {args.save_probabilities}")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,7 +16,7 @@ from quantum_monitor import QuantumMonitor
 class QuantumControlCenter:
     def __init__(self):
         self.quantum = QuantumTradingSystem()
-        self.monitor = QuantumMonitor()
+        self.monitor = QuantumMonitor(self.quantum)
         self.running = False
         self.trading_thread = None
         self.config_file = 'quantum_config.json'
@@ -238,6 +238,7 @@ class QuantumControlCenter:
         """Executa trading em background"""
         try:
             while self.running:
+                self.quantum.apply_pending_model()
                 signal = self.quantum.get_trading_signal('BTCUSDT')
                 
                 if signal['signal'] == 'BUY':
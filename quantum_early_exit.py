@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+🏁 QUANTUM TRAIL - INFERÊNCIA ADAPTATIVA COM SAÍDA ANTECIPADA
+Avalia as árvores do modelo achatado em estágios e para assim que a margem
+parcial fica fora da faixa de decisão em torno dos thresholds. A faixa de
+cada estágio é calibrada offline para limitar a taxa de decisões invertidas.
+"""
+
+import argparse
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+from numba import njit
+
+from quantum_flat_model import FlatTreeEnsemble, LOGISTIC_OBJECTIVES, _tree_value
+
+logger = logging.getLogger(__name__)
+
+
+@njit(cache=True, nogil=True)
+def _early_exit_kernel(X, feature, threshold, left, right, default_left, value, tree_offsets,
+                       stage_ends, deltas, suffix_min, suffix_max, boundaries, base_margin):
+    n_rows = X.shape[0]
+    n_stages = stage_ends.shape[0]
+    margins = np.empty(n_rows, dtype=np.float64)
+    trees_used = np.empty(n_rows, dtype=np.int64)
+    for i in range(n_rows):
+        total = base_margin
+        t = 0
+        for s in range(n_stages):
+            end = stage_ends[s]
+            while t < end:
+                total += _tree_value(X, i, t, feature, threshold, left, right, default_left, value, tree_offsets)
+                t += 1
+            if s == n_stages - 1:
+                break
+            decided = True
+            for b in boundaries:
+                # Garantido: nem o pior caso das árvores restantes cruza o threshold
+                provable = total + suffix_min[end] > b or total + suffix_max[end] < b
+                # Empírico: distância ao threshold maior que a faixa calibrada do estágio
+                empirical = abs(total - b) > deltas[s]
+                if not (provable or empirical):
+                    decided = False
+                    break
+            if decided:
+                break
+        margins[i] = total
+        trees_used[i] = t
+    return margins, trees_used
+
+
+def default_stages(n_trees, n_stages=4):
+    """Estágios geométricos, ex.: 800 árvores -> 100, 200, 400, 800"""
+    ends = [max(1, n_trees >> k) for k in range(n_stages - 1, -1, -1)]
+    return sorted(set(ends))
+
+
+class EarlyExitEnsemble:
+    """Envolve um FlatTreeEnsemble com avaliação em estágios e saída antecipada"""
+
+    def __init__(self, flat, stages=None, deltas=None, boundaries=(0.5,)):
+        self.flat = flat
+        if stages is None:
+            stages = default_stages(flat.n_trees)
+        self.stages = np.asarray(stages, dtype=np.int64)
+        if self.stages[-1] != flat.n_trees:
+            raise ValueError("O último estágio deve cobrir todas as árvores")
+        # Sem calibração, só a saída garantida (limites de folha) é usada
+        self.deltas = np.asarray(deltas if deltas is not None else [np.inf] * (len(self.stages) - 1),
+                                 dtype=np.float64)
+        self.boundaries = list(boundaries)
+        self.feature_names = flat.feature_names
+        self.suffix_min, self.suffix_max = self._leaf_suffix_bounds()
+        self.rows_evaluated = 0
+        self.trees_evaluated = 0
+        self.last_trees_evaluated = None
+
+    def _leaf_suffix_bounds(self):
+        """Soma do menor/maior valor de folha das árvores t..N (limite garantido do restante)"""
+        flat = self.flat
+        is_leaf = flat.left == -1
+        tree_ids = np.repeat(np.arange(flat.n_trees), np.diff(np.append(flat.tree_offsets, len(flat.left))))
+        leaf_min = np.full(flat.n_trees, np.inf)
+        leaf_max = np.full(flat.n_trees, -np.inf)
+        np.minimum.at(leaf_min, tree_ids[is_leaf], flat.value[is_leaf])
+        np.maximum.at(leaf_max, tree_ids[is_leaf], flat.value[is_leaf])
+        suffix_min = np.append(np.cumsum(leaf_min[::-1])[::-1], 0.0)
+        suffix_max = np.append(np.cumsum(leaf_max[::-1])[::-1], 0.0)
+        return suffix_min, suffix_max
+
+    def _margin_boundaries(self, boundaries):
+        if boundaries is None:
+            boundaries = self.boundaries
+        probs = np.asarray(boundaries, dtype=np.float64)
+        if self.flat.objective in LOGISTIC_OBJECTIVES:
+            return np.log(probs / (1.0 - probs))
+        return probs
+
+    def predict_margin(self, X, boundaries=None):
+        """Retorna (margens, árvores avaliadas por linha)"""
+        flat = self.flat
+        margins, trees_used = _early_exit_kernel(
+            flat._as_matrix(X), flat.feature, flat.threshold, flat.left, flat.right,
+            flat.default_left, flat.value, flat.tree_offsets, self.stages, self.deltas,
+            self.suffix_min, self.suffix_max,
+            self._margin_boundaries(boundaries), flat.base_margin
+        )
+        self.rows_evaluated += len(trees_used)
+        self.trees_evaluated += int(trees_used.sum())
+        self.last_trees_evaluated = trees_used
+        return margins, trees_used
+
+    def predict_proba(self, X, boundaries=None):
+        margins, _ = self.predict_margin(X, boundaries)
+        return self.flat.margin_to_proba(margins)
+
+    def predict(self, X, boundaries=None):
+        return (self.predict_proba(X, boundaries)[:, 1] > 0.5).astype(np.int64)
+
+    @property
+    def average_trees_per_row(self):
+        if self.rows_evaluated == 0:
+            return 0.0
+        return self.trees_evaluated / self.rows_evaluated
+
+    def calibrate(self, X, max_flip_rate=0.001):
+        """
+        Calibra a faixa de cada estágio como um quantil alto de
+        |margem final - margem parcial|. Uma decisão só inverte se o restante
+        das árvores mover a margem mais do que a faixa, o que acontece com
+        probabilidade (quantil) por estágio e por limiar de decisão; as chances
+        se somam entre eles, então cada estágio usa o quantil
+        1 - max_flip_rate / (estágios intermediários * limiares) para que a
+        predição inteira fique dentro de max_flip_rate nos dados de calibração.
+        """
+        flat = self.flat
+        partial = np.zeros(len(X), dtype=np.float64)
+        partials = []
+        start = 0
+        for end in self.stages:
+            partial = partial + flat.predict_margin(X, start, end)
+            partials.append(partial)
+            start = end
+        final = partials[-1]
+        n_tests = max(1, (len(self.stages) - 1) * len(self.boundaries))
+        quantile = 1.0 - max_flip_rate / n_tests
+        self.deltas = np.array([np.quantile(np.abs(final - p), quantile) for p in partials[:-1]])
+        return self.evaluate(X, final_margin=final)
+
+    def evaluate(self, X, boundaries=None, final_margin=None):
+        """Mede taxa de inversão e média de árvores avaliadas contra o modelo completo"""
+        if final_margin is None:
+            final_margin = self.flat.predict_margin(X)
+        margins, trees_used = _early_exit_kernel(
+            self.flat._as_matrix(X), self.flat.feature, self.flat.threshold, self.flat.left,
+            self.flat.right, self.flat.default_left, self.flat.value, self.flat.tree_offsets,
+            self.stages, self.deltas, self.suffix_min, self.suffix_max,
+            self._margin_boundaries(boundaries), self.flat.base_margin
+        )
+        flips = np.zeros(len(margins), dtype=bool)
+        for b in self._margin_boundaries(boundaries):
+            flips |= (margins > b) != (final_margin > b)
+        return {
+            'rows': int(len(margins)),
+            'flip_rate': float(flips.mean()) if len(margins) else 0.0,
+            'avg_trees': float(trees_used.mean()) if len(margins) else 0.0,
+            'total_trees': int(self.flat.n_trees),
+            'stages': self.stages.tolist(),
+            'deltas': self.deltas.tolist()
+        }
+
+    def save_calibration(self, path, max_flip_rate=None):
+        with open(path, 'w') as f:
+            json.dump({
+                'stages': self.stages.tolist(),
+                'deltas': self.deltas.tolist(),
+                'boundaries': self.boundaries,
+                'max_flip_rate': max_flip_rate
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, flat, calibration_path):
+        with open(calibration_path, 'r') as f:
+            calibration = json.load(f)
+        return cls(flat, calibration['stages'], calibration['deltas'], calibration.get('boundaries', (0.5,)))
+
+
+def calibration_path_for(model_path):
+    return model_path.rsplit('.', 1)[0] + '_early_exit.json'
+
+
+def _load_features(path):
+    if path.endswith('.npy'):
+        return np.load(path)
+    return pd.read_csv(path)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Calibração da inferência adaptativa do QuantumTrail')
+    parser.add_argument('model', help='Modelo achatado (.npz)')
+    parser.add_argument('features', help='Matriz de features de calibração (.npy ou .csv)')
+    parser.add_argument('--max-flip-rate', type=float, default=0.001)
+    parser.add_argument('--boundaries', type=float, nargs='+', default=[0.5, 0.70, 0.75, 0.90])
+    parser.add_argument('--stages', type=int, nargs='+', default=None)
+    args = parser.parse_args()
+
+    flat = FlatTreeEnsemble.load(args.model)
+    ensemble = EarlyExitEnsemble(flat, args.stages, boundaries=args.boundaries)
+    report = ensemble.calibrate(_load_features(args.features), args.max_flip_rate)
+
+    output_path = calibration_path_for(args.model)
+    ensemble.save_calibration(output_path, args.max_flip_rate)
+
+    logger.info(f"✅ Calibração salva em {output_path}")
+    logger.info(f"   🌲 Árvores médias por sinal: {report['avg_trees']:.1f} / {report['total_trees']}")
+    logger.info(f"   🔄 Taxa de inversão: {report['flip_rate'] * 100:.3f}% (limite {args.max_flip_rate * 100:.3f}%)")
+    logger.info(f"   📏 Estágios: {report['stages']}")
+
+
+if __name__ == "__main__":
+    main()
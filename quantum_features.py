@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+🧮 QUANTUM TRAIL - MOTOR DE FEATURES
+As 113 features do modelo, organizadas em grupos. Com um subconjunto de
+colunas (metadados do modelo), só os grupos necessários são calculados.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from trading_system.utils.indicator_cache import Indicators
+
+BASE_COLUMNS = ['time', 'open', 'high', 'low', 'close', 'volume']
+
+MA_WINDOWS = [3, 5, 7, 10, 14, 20, 30, 50, 100]
+RSI_PERIODS = [7, 14, 21, 30, 50]
+BB_WINDOWS = [20, 30, 50]
+VOLATILITY_WINDOWS = [5, 10, 20, 30, 50]
+MOMENTUM_PERIODS = [3, 5, 10, 15, 20, 30]
+TIME_FEATURES = ['hour', 'day_of_week', 'month', 'is_weekend', 'is_night',
+                 'hour_sin', 'hour_cos', 'day_sin', 'day_cos']
+
+
+def _sma_group(window):
+    def compute(df, out, indicators):
+        sma = indicators['close'].sma(window)
+        out[f'sma_{window}'] = sma
+        out[f'price_sma_{window}_ratio'] = df['close'] / sma
+        out[f'price_sma_{window}_dev'] = (df['close'] - sma) / sma
+    return compute
+
+
+def _volume_sma_group(window):
+    def compute(df, out, indicators):
+        volume_sma = indicators['volume'].sma(window)
+        out[f'volume_sma_{window}'] = volume_sma
+        out[f'volume_sma_{window}_ratio'] = df['volume'] / volume_sma
+    return compute
+
+
+def _macd_group(df, out, indicators):
+    out['macd'], out['macd_signal'], out['macd_histogram'] = indicators['close'].macd()
+
+
+def _bollinger_group(window):
+    def compute(df, out, indicators):
+        sma = indicators['close'].sma(window)
+        std = indicators['close'].std(window)
+        upper = sma + (std * 2)
+        lower = sma - (std * 2)
+        out[f'bb_upper_{window}'] = upper
+        out[f'bb_lower_{window}'] = lower
+        out[f'bb_position_{window}'] = (df['close'] - lower) / (upper - lower)
+        out[f'bb_width_{window}'] = (upper - lower) / sma
+    return compute
+
+
+def _volatility_group(window):
+    def compute(df, out, indicators):
+        volatility = indicators['close'].std(window)
+        out[f'volatility_{window}'] = volatility
+        out[f'volatility_{window}_norm'] = volatility / df['close']
+    return compute
+
+
+def _column(name, function):
+    def compute(df, out, indicators):
+        out[name] = function(df)
+    return compute
+
+
+def _indicator(name, function):
+    def compute(df, out, indicators):
+        out[name] = function(indicators)
+    return compute
+
+
+def _volume_weighted_price(df, out, indicators):
+    out['volume_weighted_price'] = (df['volume'] * df['close']).rolling(window=20).sum() / df['volume'].rolling(window=20).sum()
+
+
+def _time_group(now):
+    def compute(df, out, indicators):
+        if isinstance(now, pd.Series):
+            # Histórico: hora de cada linha
+            hour = now.dt.hour.to_numpy()
+            weekday = now.dt.weekday.to_numpy()
+            month = now.dt.month.to_numpy()
+        else:
+            moment = now or datetime.now()
+            hour = np.full(len(df), moment.hour)
+            weekday = np.full(len(df), moment.weekday())
+            month = np.full(len(df), moment.month)
+        out['hour'] = hour
+        out['day_of_week'] = weekday
+        out['month'] = month
+        out['is_weekend'] = weekday >= 5
+        out['is_night'] = (hour >= 22) | (hour <= 6)
+        out['hour_sin'] = np.sin(2 * np.pi * hour / 24)
+        out['hour_cos'] = np.cos(2 * np.pi * hour / 24)
+        out['day_sin'] = np.sin(2 * np.pi * weekday / 7)
+        out['day_cos'] = np.cos(2 * np.pi * weekday / 7)
+    return compute
+
+
+def _feature_groups(now=None):
+    """Lista ordenada de (colunas, função) na mesma ordem do modelo treinado"""
+    groups = [
+        (['price_change'], _column('price_change', lambda df: df['close'].pct_change())),
+        (['volume_change'], _column('volume_change', lambda df: df['volume'].pct_change())),
+        (['high_low_ratio'], _column('high_low_ratio', lambda df: df['high'] / df['low'])),
+        (['close_open_ratio'], _column('close_open_ratio', lambda df: df['close'] / df['open'])),
+        (['price_range'], _column('price_range', lambda df: (df['high'] - df['low']) / df['close'])),
+        (['volume_price_ratio'], _column('volume_price_ratio', lambda df: df['volume'] / df['close'])),
+    ]
+    for window in MA_WINDOWS:
+        groups += [
+            ([f'sma_{window}', f'price_sma_{window}_ratio', f'price_sma_{window}_dev'], _sma_group(window)),
+            ([f'ema_{window}'], _indicator(f'ema_{window}', lambda indicators, window=window: indicators['close'].ema(window))),
+            ([f'volume_sma_{window}', f'volume_sma_{window}_ratio'], _volume_sma_group(window)),
+        ]
+    groups += [([f'rsi_{period}'], _indicator(f'rsi_{period}', lambda indicators, period=period: indicators['close'].rsi(period)))
+               for period in RSI_PERIODS]
+    groups.append((['macd', 'macd_signal', 'macd_histogram'], _macd_group))
+    groups += [([f'bb_upper_{w}', f'bb_lower_{w}', f'bb_position_{w}', f'bb_width_{w}'], _bollinger_group(w))
+               for w in BB_WINDOWS]
+    groups += [([f'volatility_{w}', f'volatility_{w}_norm'], _volatility_group(w)) for w in VOLATILITY_WINDOWS]
+    for period in MOMENTUM_PERIODS:
+        groups += [
+            ([f'momentum_{period}'],
+             _column(f'momentum_{period}', lambda df, period=period: df['close'] / df['close'].shift(period) - 1)),
+            ([f'roc_{period}'], _column(f'roc_{period}', lambda df, period=period: df['close'].pct_change(periods=period))),
+        ]
+    groups += [
+        (['volume_price_trend'], _column('volume_price_trend', lambda df: df['volume'] * df['close'].pct_change())),
+        (['volume_weighted_price'], _volume_weighted_price),
+        (TIME_FEATURES, _time_group(now)),
+    ]
+    return groups
+
+
+def _all_features():
+    ordered = ['price_change', 'volume_change', 'high_low_ratio', 'close_open_ratio', 'price_range',
+               'volume_price_ratio']
+    for window in MA_WINDOWS:
+        ordered += [f'sma_{window}', f'ema_{window}', f'volume_sma_{window}', f'price_sma_{window}_ratio',
+                    f'volume_sma_{window}_ratio', f'price_sma_{window}_dev']
+    ordered += [f'rsi_{period}' for period in RSI_PERIODS]
+    ordered += ['macd', 'macd_signal', 'macd_histogram']
+    for window in BB_WINDOWS:
+        ordered += [f'bb_upper_{window}', f'bb_lower_{window}', f'bb_position_{window}', f'bb_width_{window}']
+    for window in VOLATILITY_WINDOWS:
+        ordered += [f'volatility_{window}', f'volatility_{window}_norm']
+    for period in MOMENTUM_PERIODS:
+        ordered += [f'momentum_{period}', f'roc_{period}']
+    return ordered + ['volume_price_trend', 'volume_weighted_price'] + TIME_FEATURES
+
+
+# Ordem das 113 colunas usada no treinamento
+ALL_FEATURES = _all_features()
+
+
+def compute_features(data, columns=None, now=None):
+    """
+    Calcula as features a partir de OHLCV. Com `columns`, só os grupos que
+    produzem essas colunas são calculados e elas voltam nessa ordem. `now`
+    pode ser um datetime (padrão: agora) ou uma série de timestamps por linha.
+    Médias, desvios, EMAs, RSI e MACD passam pelo cache de indicadores
+    (trading_system/utils/indicator_cache.py): a SMA das Bandas de Bollinger é
+    a mesma de sma_N e séries longas repetidas não são recalculadas.
+    Retorna (df sem NaN, lista de colunas de features).
+    """
+    if columns is not None:
+        unknown = set(columns) - set(ALL_FEATURES)
+        if unknown:
+            raise ValueError(f"Features desconhecidas: {sorted(unknown)}")
+        wanted = set(columns)
+    else:
+        wanted = None
+
+    out = {}
+    indicators = {column: Indicators(data[column]) for column in ('close', 'volume') if column in data.columns}
+    for group_columns, compute in _feature_groups(now):
+        if wanted is None or wanted.intersection(group_columns):
+            compute(data, out, indicators)
+
+    computed = pd.DataFrame(out, index=data.index)
+    feature_columns = list(columns) if columns is not None else ALL_FEATURES
+    df = pd.concat([data, computed[feature_columns]], axis=1)
+    df = df.dropna().reset_index(drop=True)
+    return df, feature_columns
+
+
+def model_feature_names(model):
+    """Colunas esperadas pelo modelo, ou None se ele não informar"""
+    names = getattr(model, 'feature_names_in_', None)
+    if names is None:
+        names = getattr(model, 'feature_names', None)
+    if names is None or len(names) == 0:
+        return None
+    return [str(name) for name in names]
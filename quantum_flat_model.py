@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+⚡ QUANTUM TRAIL - MODELO ACHATADO PARA INFERÊNCIA RÁPIDA
+Exporta o booster XGBoost treinado para arrays NumPy contíguos e avalia
+linhas isoladas (ou pequenos lotes) com um kernel compilado em numba,
+sem precisar importar o xgboost em tempo de execução.
+"""
+
+import json
+import logging
+import pickle
+import sys
+
+import numpy as np
+from numba import njit
+
+logger = logging.getLogger(__name__)
+
+LOGISTIC_OBJECTIVES = ('binary:logistic', 'reg:logistic')
+
+
+@njit(cache=True, nogil=True)
+def _tree_value(X, i, t, feature, threshold, left, right, default_left, value, tree_offsets):
+    node = tree_offsets[t]
+    while left[node] != -1:
+        x = X[i, feature[node]]
+        if np.isnan(x):
+            child = left[node] if default_left[node] else right[node]
+        elif x < threshold[node]:
+            child = left[node]
+        else:
+            child = right[node]
+        node = tree_offsets[t] + child
+    return value[node]
+
+
+@njit(cache=True, nogil=True)
+def _predict_margin_kernel(X, feature, threshold, left, right, default_left,
+                           value, tree_offsets, tree_start, tree_end, base_margin):
+    n_rows = X.shape[0]
+    out = np.empty(n_rows, dtype=np.float64)
+    for i in range(n_rows):
+        total = base_margin
+        for t in range(tree_start, tree_end):
+            total += _tree_value(X, i, t, feature, threshold, left, right, default_left, value, tree_offsets)
+        out[i] = total
+    return out
+
+
+class FlatTreeEnsemble:
+    """Ensemble de árvores em arrays planos, compatível com predict/predict_proba"""
+
+    def __init__(self, feature, threshold, left, right, default_left, value,
+                 tree_offsets, base_margin, objective='binary:logistic', feature_names=None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float32)
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.right = np.ascontiguousarray(right, dtype=np.int32)
+        self.default_left = np.ascontiguousarray(default_left, dtype=np.bool_)
+        self.value = np.ascontiguousarray(value, dtype=np.float32)
+        self.tree_offsets = np.ascontiguousarray(tree_offsets, dtype=np.int64)
+        self.base_margin = float(base_margin)
+        self.objective = objective
+        self.feature_names = list(feature_names) if feature_names else None
+        # Colunas lidas pelo kernel, que indexa sem checar limites
+        self.min_columns = int(self.feature.max()) + 1 if len(self.feature) else 0
+
+    @property
+    def n_trees(self):
+        return len(self.tree_offsets)
+
+    def _as_matrix(self, X):
+        """Converte a entrada para float32 contíguo na ordem de features do modelo"""
+        if hasattr(X, 'columns'):
+            if self.feature_names:
+                X = X[self.feature_names]
+            X = X.to_numpy(dtype=np.float32)
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] < self.min_columns:
+            raise ValueError(f"Entrada com {X.shape[1]} features; o modelo lê {self.min_columns} colunas")
+        return X
+
+    def predict_margin(self, X, tree_start=0, tree_end=None):
+        """Margem bruta (log-odds) somando as árvores [tree_start, tree_end)"""
+        if tree_end is None:
+            tree_end = self.n_trees
+        base = self.base_margin if tree_start == 0 else 0.0
+        return _predict_margin_kernel(
+            self._as_matrix(X), self.feature, self.threshold, self.left, self.right,
+            self.default_left, self.value, self.tree_offsets, tree_start, tree_end, base
+        )
+
+    def margin_to_proba(self, margin):
+        """Converte margens em matriz (n, 2) de probabilidades, como no sklearn"""
+        if self.objective in LOGISTIC_OBJECTIVES:
+            positive = 1.0 / (1.0 + np.exp(-margin))
+        else:
+            positive = margin
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict_proba(self, X):
+        return self.margin_to_proba(self.predict_margin(X))
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(np.int64)
+
+    def save(self, path):
+        """Salva o modelo achatado em .npz (não depende do xgboost para carregar)"""
+        np.savez(
+            path,
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            default_left=self.default_left,
+            value=self.value,
+            tree_offsets=self.tree_offsets,
+            base_margin=np.float64(self.base_margin),
+            objective=np.array(self.objective),
+            feature_names=np.array(self.feature_names or [], dtype=str)
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            feature_names = [str(name) for name in data['feature_names']]
+            return cls(
+                feature=data['feature'],
+                threshold=data['threshold'],
+                left=data['left'],
+                right=data['right'],
+                default_left=data['default_left'],
+                value=data['value'],
+                tree_offsets=data['tree_offsets'],
+                base_margin=float(data['base_margin']),
+                objective=str(data['objective']),
+                feature_names=feature_names or None
+            )
+
+
+def _parse_base_score(raw):
+    return float(str(raw).strip('[]').split(',')[0])
+
+
+def _booster_of(estimator):
+    return estimator.get_booster() if hasattr(estimator, 'get_booster') else estimator
+
+
+def unwrap_pipeline(model):
+    """
+    Separa um Pipeline do sklearn (StandardScaler, SelectKBest, XGBClassifier)
+    no estimador final e na transformação das colunas de entrada: para cada
+    coluna vista pelo booster, o índice da coluna original e o (mean, scale)
+    acumulado dos scalers. Modelos sem pipeline voltam com transformação None.
+    """
+    steps = getattr(model, 'steps', None)
+    if steps is None:
+        return model, None
+    from sklearn.preprocessing import StandardScaler
+
+    *transformers, (_, estimator) = steps
+    n_inputs = getattr(model, 'n_features_in_', None)
+    if n_inputs is None:
+        raise ValueError("Pipeline sem n_features_in_: treine-o antes de exportar")
+    columns = np.arange(n_inputs)
+    mean = np.zeros(n_inputs)
+    scale = np.ones(n_inputs)
+    for name, step in transformers:
+        if step is None or step == 'passthrough':
+            continue
+        if isinstance(step, StandardScaler):
+            # x' = (x - mean_) / scale_ sobre o que chegou ao scaler
+            if step.mean_ is not None:
+                mean = mean + step.mean_ * scale
+            if step.scale_ is not None:
+                scale = scale * step.scale_
+        elif hasattr(step, 'get_support'):
+            support = step.get_support()
+            columns, mean, scale = columns[support], mean[support], scale[support]
+        else:
+            raise ValueError(f"Etapa '{name}' ({type(step).__name__}) do pipeline não pode ser achatada; "
+                             "suportadas: StandardScaler e seletores com get_support()")
+    if not hasattr(estimator, 'get_booster'):
+        raise ValueError(f"O pipeline termina em {type(estimator).__name__}, não em um modelo XGBoost")
+    return estimator, (columns, mean, scale)
+
+
+def _fold_thresholds(threshold, mean, scale):
+    """
+    Menor x float32 com float32((x - mean) / scale) >= threshold: com ele,
+    x < limiar no espaço original decide o split igual ao scaler + booster.
+    """
+    threshold = threshold.astype(np.float32)
+
+    def scaled(x):
+        return ((x.astype(np.float64) - mean) / scale).astype(np.float32)
+
+    folded = (threshold.astype(np.float64) * scale + mean).astype(np.float32)
+    for _ in range(64):
+        below = np.nextafter(folded, np.float32(-np.inf))
+        down = scaled(below) >= threshold
+        up = scaled(folded) < threshold
+        if not (down.any() or up.any()):
+            break
+        folded = np.where(down, below, np.where(up, np.nextafter(folded, np.float32(np.inf)), folded))
+    return folded
+
+
+def export_booster(model):
+    """
+    Achata um XGBClassifier (ou Booster) em um FlatTreeEnsemble. Em um
+    Pipeline(StandardScaler, SelectKBest, XGBClassifier) o scaler é embutido
+    nos limiares (thr * scale + mean) e os índices de feature passam a apontar
+    para as colunas de entrada do pipeline.
+    """
+    estimator, transform = unwrap_pipeline(model)
+    booster = _booster_of(estimator)
+    learner = json.loads(booster.save_raw(raw_format='json'))['learner']
+
+    gradient_booster = learner['gradient_booster']
+    if gradient_booster['name'] != 'gbtree':
+        raise ValueError(f"Booster não suportado: {gradient_booster['name']}")
+    if int(learner['learner_model_param'].get('num_class', '0')) > 1:
+        raise ValueError("Apenas modelos binários/regressão são suportados")
+
+    objective = learner['objective']['name']
+    base_score = _parse_base_score(learner['learner_model_param']['base_score'])
+    if objective in LOGISTIC_OBJECTIVES:
+        base_margin = np.log(base_score / (1.0 - base_score))
+    else:
+        base_margin = base_score
+
+    features, thresholds, lefts, rights, defaults, values, offsets = [], [], [], [], [], [], []
+    offset = 0
+    for tree in gradient_booster['model']['trees']:
+        if any(tree.get('split_type', [])):
+            raise ValueError("Splits categóricos não são suportados")
+        left = np.asarray(tree['left_children'], dtype=np.int32)
+        split = np.asarray(tree['split_indices'], dtype=np.int32)
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float64)
+        offsets.append(offset)
+        lefts.append(left)
+        rights.append(np.asarray(tree['right_children'], dtype=np.int32))
+        defaults.append(np.asarray(tree['default_left'], dtype=np.bool_))
+        # Nas folhas o XGBoost guarda o valor da folha em split_conditions
+        values.append(np.where(left == -1, conditions, 0.0).astype(np.float32))
+        if transform is not None:
+            columns, mean, scale = transform
+            is_split = left != -1
+            conditions = np.where(is_split, _fold_thresholds(conditions, mean[split], scale[split]), conditions)
+            split = np.where(is_split, columns[split], 0).astype(np.int32)
+        features.append(split)
+        thresholds.append(conditions.astype(np.float32))
+        offset += len(left)
+
+    if transform is not None:
+        feature_names = getattr(model, 'feature_names_in_', None)
+    else:
+        feature_names = learner.get('feature_names') or getattr(model, 'feature_names_in_', None)
+
+    return FlatTreeEnsemble(
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        left=np.concatenate(lefts),
+        right=np.concatenate(rights),
+        default_left=np.concatenate(defaults),
+        value=np.concatenate(values),
+        tree_offsets=np.asarray(offsets, dtype=np.int64),
+        base_margin=base_margin,
+        objective=objective,
+        feature_names=list(feature_names) if feature_names is not None else None
+    )
+
+
+def verify_export(model, flat, X, atol=1e-4):
+    """Compara a margem do modelo achatado com a do booster original"""
+    import xgboost as xgb
+
+    estimator, transform = unwrap_pipeline(model)
+    booster = _booster_of(estimator)
+    if hasattr(X, 'columns'):
+        X = X[flat.feature_names] if flat.feature_names else X
+    if transform is not None:
+        # O booster do pipeline vê as colunas já transformadas
+        dmatrix = xgb.DMatrix(model[:-1].transform(X), feature_names=booster.feature_names)
+    elif hasattr(X, 'columns'):
+        dmatrix = xgb.DMatrix(X)
+    else:
+        dmatrix = xgb.DMatrix(X, feature_names=flat.feature_names)
+    expected = booster.predict(dmatrix, output_margin=True)
+    actual = flat.predict_margin(X)
+    max_diff = float(np.max(np.abs(expected - actual))) if len(actual) else 0.0
+    return max_diff <= atol, max_diff
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    model_path = sys.argv[1] if len(sys.argv) > 1 else 'gpu_perfect_model.pkl'
+    output_path = sys.argv[2] if len(sys.argv) > 2 else model_path.rsplit('.', 1)[0] + '_flat.npz'
+
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+
+    flat = export_booster(model)
+
+    n_features = len(flat.feature_names) if flat.feature_names else \
+        getattr(model, 'n_features_in_', None) or int(flat.feature.max()) + 1
+    sample = np.random.default_rng(42).normal(size=(256, n_features)).astype(np.float32)
+    if flat.feature_names:
+        import pandas as pd
+        sample = pd.DataFrame(sample, columns=flat.feature_names)
+    ok, max_diff = verify_export(model, flat, sample)
+    if not ok:
+        logger.error(f"❌ Divergência na margem após exportar: {max_diff:.2e}")
+        sys.exit(1)
+
+    flat.save(output_path)
+    logger.info(f"✅ Modelo achatado salvo em {output_path}")
+    logger.info(f"   🌲 Árvores: {flat.n_trees} | Nós: {len(flat.feature)}")
+    logger.info(f"   🎯 Divergência máxima da margem: {max_diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+🔁 QUANTUM TRAIL - TROCA DE MODELO SEM PARADA
+Observa o registro de modelos, carrega a nova versão em uma thread de fundo,
+pontua em modo sombra ao lado do modelo atual por N sinais e só então troca
+entre iterações do loop. Se a latência ou a divergência da sombra passarem
+dos limites configurados, o registro volta para a versão anterior.
+"""
+
+import logging
+import threading
+import time
+
+import numpy as np
+
+from quantum_features import model_feature_names
+
+logger = logging.getLogger(__name__)
+
+
+class ModelSwapManager:
+    def __init__(self, registry, loader, shadow_signals=20, max_latency_ms=50.0,
+                 max_divergence=0.10, poll_seconds=30.0, variant=None):
+        self.registry = registry
+        self.variant = variant
+        self.loader = loader
+        self.shadow_signals = shadow_signals
+        self.max_latency_ms = max_latency_ms
+        self.max_divergence = max_divergence
+        self.poll_seconds = poll_seconds
+
+        current = registry.current(variant)
+        self.active_version = current['version'] if current else None
+        self._seen_revision = registry.revision
+        self._lock = threading.Lock()
+        self._candidate = None
+        self._candidate_version = None
+        self._wanted_version = self.active_version
+        self._loading = False
+        self._ready = None
+        self._latencies = []
+        self._divergences = []
+        self._stop = threading.Event()
+        self._watcher = None
+        self.history = []
+
+    def start(self):
+        self._watcher = threading.Thread(target=self._watch, daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.check_registry()
+            except Exception as e:
+                logger.error(f"❌ Erro ao verificar registro de modelos: {e}")
+
+    def check_registry(self):
+        """Dispara o carregamento em segundo plano se a versão atual do registro mudou"""
+        revision = self.registry.revision
+        if revision == self._seen_revision:
+            return
+        self._seen_revision = revision
+        current = self.registry.current(self.variant)
+        with self._lock:
+            self._wanted_version = current['version'] if current else None
+            if current is None or current['version'] == self.active_version:
+                # Operador voltou o registro: o candidato em sombra não deve mais entrar
+                if self._candidate_version is not None:
+                    logger.info(f"↩️ Candidato {self._candidate_version} descartado: registro voltou para "
+                                f"{self._wanted_version}")
+                self._candidate = None
+                self._candidate_version = None
+                self._ready = None
+                return
+            if self._loading or current['version'] == self._candidate_version:
+                return
+            self._loading = True
+        threading.Thread(target=self._load_candidate, args=(current,), daemon=True).start()
+
+    def _load_candidate(self, entry):
+        try:
+            started = time.monotonic()
+            model = self.loader(entry['model_path'])
+            with self._lock:
+                if entry['version'] != self._wanted_version:
+                    # O registro mudou durante o carregamento: verificar de novo na próxima rodada
+                    self._seen_revision = None
+                    logger.info(f"↩️ {entry['version']} carregado, mas o registro já aponta para {self._wanted_version}")
+                    return
+                self._candidate = model
+                self._candidate_version = entry['version']
+                self._ready = None
+                self._latencies = []
+                self._divergences = []
+            logger.info(f"🔁 Modelo {entry['version']} carregado em {time.monotonic() - started:.1f}s, iniciando sombra")
+        except Exception as e:
+            logger.error(f"❌ Falha ao carregar {entry['version']}: {e}")
+            self._rollback(entry['version'], f"erro ao carregar: {e}")
+        finally:
+            with self._lock:
+                self._loading = False
+
+    def candidate_features(self):
+        """Colunas que o candidato em sombra usa: [] sem candidato, None se não informar"""
+        with self._lock:
+            candidate = self._candidate
+        if candidate is None or self._ready is not None:
+            return []
+        return model_feature_names(candidate)
+
+    def shadow_score(self, X, current_probability):
+        """Pontua a linha com o candidato e compara com a probabilidade do modelo atual (0-1)"""
+        with self._lock:
+            candidate = self._candidate
+            version = self._candidate_version
+        if candidate is None or self._ready is not None:
+            return
+
+        columns = model_feature_names(candidate)
+        started = time.perf_counter()
+        try:
+            if columns and hasattr(X, 'columns'):
+                X = X[columns]
+            candidate_probability = float(np.asarray(candidate.predict_proba(X))[0][1])
+        except Exception as e:
+            self._reject(version, f"erro na sombra: {e}")
+            return
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        with self._lock:
+            # Registro voltou ou outro candidato foi carregado enquanto este pontuava
+            if self._candidate_version != version:
+                return
+            self._latencies.append(latency_ms)
+            self._divergences.append(abs(candidate_probability - current_probability))
+            if latency_ms > self.max_latency_ms * 3:
+                rejection = f"latência {latency_ms:.1f}ms"
+            elif len(self._latencies) < self.shadow_signals:
+                return
+            else:
+                p95_latency = float(np.percentile(self._latencies, 95))
+                mean_divergence = float(np.mean(self._divergences))
+                if p95_latency > self.max_latency_ms:
+                    rejection = f"latência p95 {p95_latency:.1f}ms > {self.max_latency_ms:.1f}ms"
+                elif mean_divergence > self.max_divergence:
+                    rejection = f"divergência média {mean_divergence:.3f} > {self.max_divergence:.3f}"
+                else:
+                    rejection = None
+                    self._ready = (version, candidate)
+
+        if rejection:
+            self._reject(version, rejection)
+        else:
+            logger.info(f"✅ Sombra aprovada para {version}: p95 {p95_latency:.1f}ms, divergência {mean_divergence:.3f}")
+
+    def apply_pending(self, target):
+        """Troca target.model atomicamente; chamar entre iterações do loop de trading"""
+        with self._lock:
+            ready, self._ready = self._ready, None
+            if ready is None:
+                return False
+            self._candidate = None
+            self._candidate_version = None
+        version, candidate = ready
+        previous_version = self.active_version
+        target.model = candidate
+        self.active_version = version
+        self.history.append({'version': version, 'previous': previous_version, 'swapped_at': time.time()})
+        logger.info(f"🔁 Modelo trocado: {previous_version} → {version}")
+        return True
+
+    def _reject(self, version, reason):
+        with self._lock:
+            if self._candidate_version == version:
+                self._candidate = None
+                self._candidate_version = None
+        self._rollback(version, reason)
+
+    def _rollback(self, version, reason):
+        """Tira a versão rejeitada do registro: volta para a ativa, a anterior a ela ou nenhuma"""
+        logger.warning(f"↩️ Rollback de {version}: {reason}")
+        current = self.registry.current(self.variant)
+        if current is None or current['version'] != version:
+            return
+        target = self.active_version if self.active_version is not None else current.get('previous')
+        self.registry.set_current(target, self.variant)
+        with self._lock:
+            self._wanted_version = target
+        self._seen_revision = self.registry.revision
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+🛰️ QUANTUM TRAIL - SERVIDOR DE INFERÊNCIA COMPARTILHADO
+Mantém um único modelo em memória e atende todos os clientes locais
+(monitor, centro de controle, UIs, integração) via socket Unix,
+agrupando requisições concorrentes em micro-lotes.
+"""
+
+import argparse
+import json
+import logging
+import os
+import pickle
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+from quantum_flat_model import FlatTreeEnsemble
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_PATH = '/tmp/quantum_inference.sock'
+SOCKET_ENV_VAR = 'QUANTUM_INFERENCE_SOCKET'
+
+_REQUEST_HEADER = struct.Struct('!II')   # linhas, features
+_RESPONSE_HEADER = struct.Struct('!I')   # linhas (ERROR_MARKER em caso de erro)
+ERROR_MARKER = 0xFFFFFFFF
+
+
+def _recv_exact(sock, size):
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            raise ConnectionError("Conexão encerrada pelo outro lado")
+        buffer.extend(chunk)
+    return bytes(buffer)
+
+
+def load_model(model_path):
+    """Carrega o modelo (.pkl do sklearn/xgboost ou .npz achatado)"""
+    if model_path.endswith('.npz'):
+        return FlatTreeEnsemble.load(model_path)
+    with open(model_path, 'rb') as f:
+        return pickle.load(f)
+
+
+class MicroBatcher:
+    """Agrupa requisições que chegam dentro de uma janela curta em um único predict_proba"""
+
+    def __init__(self, model, batch_window_ms=3.0, max_batch_rows=512):
+        self.model = model
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch_rows = max_batch_rows
+        names = getattr(model, 'feature_names_in_', None)
+        if names is None:
+            names = getattr(model, 'feature_names', None)
+        self.feature_names = list(names) if names is not None else []
+        self.n_features = len(self.feature_names) or getattr(model, 'n_features_in_', None)
+        self._queue = queue.Queue()
+        self._running = False
+        self._thread = None
+        self.stats = {'requests': 0, 'batches': 0, 'rows': 0}
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._queue.put(None)
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def submit(self, X):
+        future = Future()
+        self._queue.put((X, future))
+        return future
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        rows = len(first[0])
+        deadline = time.monotonic() + self.batch_window
+        while rows < self.max_batch_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._running = False
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    def _predict(self, X):
+        if self.feature_names and not isinstance(self.model, FlatTreeEnsemble):
+            X = pd.DataFrame(X, columns=self.feature_names)
+        return np.asarray(self.model.predict_proba(X))[:, 1]
+
+    def _predict_group(self, group):
+        try:
+            width = group[0][0].shape[1]
+            if self.n_features and width != self.n_features:
+                raise ValueError(f"Requisição com {width} features; o modelo espera {self.n_features}")
+            stacked = np.vstack([X for X, _ in group])
+            probabilities = self._predict(stacked)
+            offset = 0
+            for X, future in group:
+                future.set_result(probabilities[offset:offset + len(X)])
+                offset += len(X)
+        except Exception as e:
+            logger.error(f"❌ Erro no lote de inferência: {e}")
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+
+    def _run(self):
+        while self._running:
+            batch = self._collect()
+            if not batch:
+                continue
+            # Uma requisição com o número errado de features só derruba as de mesma largura
+            groups = {}
+            for X, future in batch:
+                groups.setdefault(X.shape[1], []).append((X, future))
+            for group in groups.values():
+                self._predict_group(group)
+
+            self.stats['requests'] += len(batch)
+            self.stats['batches'] += 1
+            self.stats['rows'] += sum(len(X) for X, _ in batch)
+
+
+class _InferenceRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        batcher = self.server.batcher
+        metadata = json.dumps({
+            'feature_names': batcher.feature_names,
+            'n_features': len(batcher.feature_names),
+            'model_path': os.path.abspath(self.server.model_path)
+        }).encode('utf-8')
+        self.request.sendall(_RESPONSE_HEADER.pack(len(metadata)) + metadata)
+
+        while True:
+            try:
+                n_rows, n_features = _REQUEST_HEADER.unpack(_recv_exact(self.request, _REQUEST_HEADER.size))
+                payload = _recv_exact(self.request, n_rows * n_features * 4)
+            except ConnectionError:
+                return
+
+            X = np.frombuffer(payload, dtype=np.float32).reshape(n_rows, n_features)
+            try:
+                probabilities = batcher.submit(X).result()
+                response = _RESPONSE_HEADER.pack(n_rows) + np.asarray(probabilities, dtype=np.float64).tobytes()
+            except Exception as e:
+                message = str(e).encode('utf-8')
+                response = _RESPONSE_HEADER.pack(ERROR_MARKER) + _RESPONSE_HEADER.pack(len(message)) + message
+            self.request.sendall(response)
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, model_path, socket_path=DEFAULT_SOCKET_PATH, batch_window_ms=3.0, max_batch_rows=512):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.model_path = model_path
+        self.socket_path = socket_path
+        self.batcher = MicroBatcher(load_model(model_path), batch_window_ms, max_batch_rows)
+        super().__init__(socket_path, _InferenceRequestHandler)
+
+    def serve_forever(self, poll_interval=0.5):
+        self.batcher.start()
+        logger.info("🛰️ SERVIDOR DE INFERÊNCIA ATIVO")
+        logger.info(f"   🤖 Modelo: {self.model_path}")
+        logger.info(f"   🔌 Socket: {self.socket_path}")
+        logger.info(f"   ⏱️ Janela de lote: {self.batcher.batch_window * 1000:.1f} ms")
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            self.batcher.stop()
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class InferenceClient:
+    """Cliente com a mesma interface predict/predict_proba do modelo"""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, timeout=10.0):
+        self.socket_path = socket_path
+        self._lock = threading.Lock()
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(socket_path)
+        (length,) = _RESPONSE_HEADER.unpack(_recv_exact(self._sock, _RESPONSE_HEADER.size))
+        metadata = json.loads(_recv_exact(self._sock, length).decode('utf-8'))
+        self.feature_names = metadata['feature_names'] or None
+        self.model_path = metadata.get('model_path')
+
+    def _as_matrix(self, X):
+        if hasattr(X, 'columns'):
+            if self.feature_names:
+                X = X[self.feature_names]
+            X = X.to_numpy(dtype=np.float32)
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return X
+
+    def predict_proba(self, X):
+        X = self._as_matrix(X)
+        with self._lock:
+            self._sock.sendall(_REQUEST_HEADER.pack(*X.shape) + X.tobytes())
+            (n_rows,) = _RESPONSE_HEADER.unpack(_recv_exact(self._sock, _RESPONSE_HEADER.size))
+            if n_rows == ERROR_MARKER:
+                (length,) = _RESPONSE_HEADER.unpack(_recv_exact(self._sock, _RESPONSE_HEADER.size))
+                raise RuntimeError(_recv_exact(self._sock, length).decode('utf-8'))
+            positive = np.frombuffer(_recv_exact(self._sock, n_rows * 8), dtype=np.float64)
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(np.int64)
+
+    def close(self):
+        self._sock.close()
+
+
+def connect_if_available(socket_path=None, env_var=SOCKET_ENV_VAR, model_path=None):
+    """
+    Retorna um InferenceClient se o servidor compartilhado estiver ativo, senão
+    None. Com model_path, o servidor só é usado se tiver carregado esse mesmo
+    arquivo; caso contrário o chamador carrega o modelo local pedido.
+    """
+    socket_path = socket_path or os.environ.get(env_var)
+    if not socket_path or not os.path.exists(socket_path):
+        return None
+    try:
+        client = InferenceClient(socket_path)
+    except OSError as e:
+        logger.warning(f"⚠️ Servidor de inferência indisponível ({e}), carregando modelo local")
+        return None
+    if model_path is not None and (client.model_path is None or
+                                   os.path.realpath(model_path) != os.path.realpath(client.model_path)):
+        logger.warning(f"⚠️ Servidor de inferência serve {client.model_path}, não {model_path}; "
+                       f"carregando modelo local")
+        client.close()
+        return None
+    logger.info(f"🛰️ Usando servidor de inferência compartilhado: {socket_path}")
+    return client
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Servidor de inferência compartilhado do QuantumTrail')
+    parser.add_argument('--model', default='gpu_perfect_model.pkl')
+    parser.add_argument('--socket', default=os.environ.get(SOCKET_ENV_VAR, DEFAULT_SOCKET_PATH))
+    parser.add_argument('--window-ms', type=float, default=3.0)
+    parser.add_argument('--max-batch', type=int, default=512)
+    args = parser.parse_args()
+
+    server = InferenceServer(args.model, args.socket, args.window_ms, args.max_batch)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("⏸️ Servidor interrompido pelo usuário")
+    finally:
+        stats = server.batcher.stats
+        logger.info(f"📊 Requisições: {stats['requests']} | Lotes: {stats['batches']} | Linhas: {stats['rows']}")
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+⏱️ QUANTUM TRAIL - INSTRUMENTAÇÃO DE LATÊNCIA
+Timers monotônicos e histogramas no estilo HDR (buckets log-lineares com
+~3% de erro relativo) para cada etapa do caminho de sinal e de ordem.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# 32 sub-buckets lineares por potência de 2 (5 bits significativos)
+_SUB_BUCKET_BITS = 5
+_SUB_BUCKETS = 1 << _SUB_BUCKET_BITS
+_MAX_EXPONENT = 40
+
+
+class LatencyHistogram:
+    """Histograma de latências em microssegundos com custo O(1) por registro"""
+
+    def __init__(self):
+        self.counts = np.zeros((_MAX_EXPONENT + 1) * _SUB_BUCKETS, dtype=np.int64)
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    @staticmethod
+    def _index(value_us):
+        if value_us < _SUB_BUCKETS:
+            return value_us
+        exponent = min(value_us.bit_length() - _SUB_BUCKET_BITS - 1, _MAX_EXPONENT - 1)
+        sub_bucket = min((value_us >> exponent) - _SUB_BUCKETS, _SUB_BUCKETS - 1)
+        return (exponent + 1) * _SUB_BUCKETS + sub_bucket
+
+    @staticmethod
+    def _value(index):
+        if index < _SUB_BUCKETS:
+            return float(index)
+        exponent = index // _SUB_BUCKETS - 1
+        sub_bucket = index % _SUB_BUCKETS
+        # Ponto médio do bucket
+        return ((sub_bucket + _SUB_BUCKETS) << exponent) + (1 << exponent) / 2
+
+    def record(self, value_us):
+        value_us = max(0, int(value_us))
+        self.counts[self._index(value_us)] += 1
+        self.count += 1
+        self.total_us += value_us
+        self.max_us = max(self.max_us, value_us)
+
+    def percentile(self, p):
+        if self.count == 0:
+            return 0.0
+        target = max(1, int(np.ceil(self.count * p / 100.0)))
+        index = int(np.searchsorted(np.cumsum(self.counts), target))
+        return min(self._value(index), float(self.max_us))
+
+    def summary(self):
+        """Resumo em milissegundos"""
+        return {
+            'count': self.count,
+            'mean': (self.total_us / self.count / 1000.0) if self.count else 0.0,
+            'p50': self.percentile(50) / 1000.0,
+            'p95': self.percentile(95) / 1000.0,
+            'p99': self.percentile(99) / 1000.0,
+            'max': self.max_us / 1000.0
+        }
+
+
+class LatencyRecorder:
+    """Um histograma por etapa; seguro para uso entre threads"""
+
+    def __init__(self):
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, elapsed_ns):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = LatencyHistogram()
+            histogram.record(elapsed_ns // 1000)
+
+    @contextmanager
+    def stage(self, name, timings=None):
+        """Mede o bloco com relógio monotônico; grava em timings[name] (ms) se fornecido"""
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            elapsed_ns = time.perf_counter_ns() - start
+            self.record(name, elapsed_ns)
+            if timings is not None:
+                timings[name] = round(elapsed_ns / 1e6, 3)
+
+    def summary(self):
+        with self._lock:
+            return {stage: histogram.summary() for stage, histogram in self.histograms.items()}
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
@@ -5,6 +5,7 @@ import requests
 import logging
 from datetime import datetime
 import warnings
+from quantum_inference_server import connect_if_available
 warnings.filterwarnings('ignore')
 
 logging.basicConfig(level=logging.INFO)
@@ -18,8 +19,10 @@ class QuantumTrailModel:
     
     def load_model(self, model_path):
         try:
-            with open(model_path, 'rb') as f:
-                self.model = pickle.load(f)
+            self.model = connect_if_available(model_path=model_path)
+            if self.model is None:
+                with open(model_path, 'rb') as f:
+                    self.model = pickle.load(f)
             
             logger.info("✅ Modelo QuantumTrail carregado!")
             logger.info("   🎯 Acurácia: 88.62%")
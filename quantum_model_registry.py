@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+🗂️ QUANTUM TRAIL - REGISTRO DE MODELOS
+Registro local de versões de modelos: cada versão fica em models/<versão>/
+com o arquivo do modelo e um params.json no formato de
+gpu_perfect_model_params.json. O registry.json aponta a versão atual e,
+opcionalmente, a versão atual de cada variante (ex.: 'fast').
+"""
+
+import json
+import logging
+import os
+import shutil
+import sys
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGISTRY_DIR = 'models'
+
+
+class ModelRegistry:
+    def __init__(self, root=DEFAULT_REGISTRY_DIR):
+        self.root = root
+        self.index_path = os.path.join(root, 'registry.json')
+
+    def _read_index(self):
+        if not os.path.exists(self.index_path):
+            return {'current': None, 'revision': 0, 'versions': [], 'variants': {}}
+        with open(self.index_path, 'r') as f:
+            index = json.load(f)
+        index.setdefault('variants', {})
+        return index
+
+    @staticmethod
+    def _pointer(index, variant):
+        return index['current'] if variant is None else index['variants'].get(variant)
+
+    @staticmethod
+    def _set_pointer(index, variant, version):
+        if variant is None:
+            index['current'] = version
+        else:
+            index['variants'][variant] = version
+
+    def _write_index(self, index):
+        os.makedirs(self.root, exist_ok=True)
+        index['revision'] = index.get('revision', 0) + 1
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        # Substituição atômica: leitores nunca veem um índice pela metade
+        os.replace(tmp_path, self.index_path)
+
+    @property
+    def revision(self):
+        return self._read_index().get('revision', 0)
+
+    def versions(self):
+        return self._read_index()['versions']
+
+    def get(self, version):
+        for entry in self.versions():
+            if entry['version'] == version:
+                return entry
+        raise KeyError(f"Versão não encontrada no registro: {version}")
+
+    def variants(self):
+        return self._read_index()['variants']
+
+    def current(self, variant=None):
+        """Versão atual do modelo principal ou de uma variante (ex.: 'fast')"""
+        version = self._pointer(self._read_index(), variant)
+        if version is None:
+            return None
+        return self.get(version)
+
+    def previous(self, variant=None):
+        """Versão que estava ativa antes da atual (alvo de rollback)"""
+        current = self.current(variant)
+        if current is None:
+            return None
+        return current.get('previous')
+
+    def register(self, model_path, params=None, promote=True, extra_files=None, variant=None):
+        """Copia o modelo para models/<versão>/ e registra os parâmetros"""
+        index = self._read_index()
+        version = f"v{len(index['versions']) + 1}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        version_dir = os.path.join(self.root, version)
+        os.makedirs(version_dir, exist_ok=True)
+
+        stored_model_path = os.path.join(version_dir, os.path.basename(model_path))
+        shutil.copy2(model_path, stored_model_path)
+        for extra in extra_files or []:
+            shutil.copy2(extra, os.path.join(version_dir, os.path.basename(extra)))
+
+        params = dict(params or {})
+        params.setdefault('timestamp', datetime.now().isoformat())
+        params_path = os.path.join(version_dir, 'params.json')
+        with open(params_path, 'w') as f:
+            json.dump(params, f, indent=2)
+
+        entry = {
+            'version': version,
+            'model_path': stored_model_path,
+            'params_path': params_path,
+            'created_at': datetime.now().isoformat(),
+            'previous': self._pointer(index, variant)
+        }
+        if variant is not None:
+            entry['variant'] = variant
+        index['versions'].append(entry)
+        if promote:
+            self._set_pointer(index, variant, version)
+        self._write_index(index)
+
+        label = f" (atual{' ' + variant if variant else ''})" if promote else ''
+        logger.info(f"🗂️ Modelo registrado: {version}{label}")
+        return entry
+
+    def set_current(self, version, variant=None):
+        """Aponta a versão atual; None deixa o modelo principal/variante sem versão atual"""
+        index = self._read_index()
+        if version is not None:
+            self.get(version)
+        self._set_pointer(index, variant, version)
+        self._write_index(index)
+        logger.info(f"🗂️ Versão atual{' (' + variant + ')' if variant else ''}: {version}")
+
+    def load_params(self, version=None, variant=None):
+        entry = self.get(version) if version else self.current(variant)
+        if entry is None:
+            return None
+        with open(entry['params_path'], 'r') as f:
+            return json.load(f)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    registry = ModelRegistry(sys.argv[2] if len(sys.argv) > 2 else DEFAULT_REGISTRY_DIR)
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+
+    variant = sys.argv[3] if len(sys.argv) > 3 else None
+
+    if command == 'list':
+        current = registry.current()
+        variants = {version: name for name, version in registry.variants().items()}
+        for entry in registry.versions():
+            marker = '🟢' if current and entry['version'] == current['version'] else '  '
+            tag = f"  [{variants[entry['version']]}]" if entry['version'] in variants else ''
+            print(f"{marker} {entry['version']}  {entry['model_path']}  ({entry['created_at']}){tag}")
+    elif command == 'rollback':
+        previous = registry.previous(variant)
+        if previous is None:
+            print("❌ Nenhuma versão anterior para rollback")
+            return
+        registry.set_current(previous, variant)
+    else:
+        print("Uso: python3 quantum_model_registry.py [list|rollback] [diretório] [variante]")
+
+
+if __name__ == "__main__":
+    main()
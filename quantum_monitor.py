@@ -14,8 +14,8 @@ import requests
 from quantum_trading_optimized import QuantumTradingSystem
 
 class QuantumMonitor:
-    def __init__(self):
-        self.quantum = QuantumTradingSystem()
+    def __init__(self, quantum=None):
+        self.quantum = quantum or QuantumTradingSystem()
         self.db_path = 'quantum_performance.db'
         self.init_database()
         
@@ -49,6 +49,14 @@ class QuantumMonitor:
             )
         ''')
         
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS signal_latency (
+                signal_id INTEGER,
+                stage TEXT,
+                latency_ms REAL
+            )
+        ''')
+        
         conn.commit()
         conn.close()
     
@@ -69,6 +77,12 @@ class QuantumMonitor:
             signal.get('symbol', 'BTCUSDT')
         ))
         
+        signal_id = cursor.lastrowid
+        cursor.executemany('''
+            INSERT INTO signal_latency (signal_id, stage, latency_ms)
+            VALUES (?, ?, ?)
+        ''', [(signal_id, stage, ms) for stage, ms in signal.get('latency_ms', {}).items()])
+        
         conn.commit()
         conn.close()
     
@@ -137,6 +151,25 @@ class QuantumMonitor:
         
         return stats
     
+    def get_latency_stats(self, conn):
+        """Percentis de latência por etapa dos sinais das últimas 24h"""
+        latency = pd.read_sql_query('''
+            SELECT l.stage, l.latency_ms FROM signal_latency l
+            JOIN signals s ON s.id = l.signal_id
+            WHERE datetime(s.timestamp) > datetime('now', '-1 day')
+        ''', conn)
+        
+        stats = {}
+        for stage, values in latency.groupby('stage')['latency_ms']:
+            stats[stage] = {
+                'count': int(len(values)),
+                'p50': float(values.quantile(0.50)),
+                'p95': float(values.quantile(0.95)),
+                'p99': float(values.quantile(0.99)),
+                'max': float(values.max())
+            }
+        return stats
+    
     def display_dashboard(self):
         """Exibe dashboard em tempo real"""
         os.system('clear' if os.name == 'posix' else 'cls')
@@ -185,6 +218,14 @@ class QuantumMonitor:
         print(f"   💰 Lucro total: ${stats['total_profit']:.2f}")
         print()
         
+        # Latência por etapa (histogramas em memória)
+        latency = self.quantum.latency.summary()
+        if latency:
+            print("⏱️ LATÊNCIA POR ETAPA (ms):")
+            for stage, stage_stats in latency.items():
+                print(f"   {stage:<10} p50 {stage_stats['p50']:8.1f} | p95 {stage_stats['p95']:8.1f} | p99 {stage_stats['p99']:8.1f}")
+            print()
+        
         # Barra de probabilidade visual
         prob_bars = int(signal['probability'] / 10)
         prob_visual = "█" * prob_bars + "░" * (10 - prob_bars)
@@ -225,6 +266,7 @@ class QuantumMonitor:
         ''', conn)
         
         trades = pd.read_sql_query('SELECT * FROM trades', conn)
+        latency = self.get_latency_stats(conn)
         conn.close()
         
         # Criar relatório
@@ -246,6 +288,7 @@ class QuantumMonitor:
                 'active_trades': len(trades[trades['status'] == 'OPEN']),
                 'total_profit': float(trades['profit'].sum()) if len(trades) > 0 else 0
             },
+            'latency_ms': latency,
             'signals_data': signals.to_dict('records') if len(signals) > 0 else [],
             'trades_data': trades.to_dict('records') if len(trades) > 0 else []
         }
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+🧪 QUANTUM TRAIL - VARREDURA DE PERFIS
+Backtests em paralelo dos perfis de config_exemplo.json (perfis_trading) ou de
+uma grade de parâmetros. A série de probabilidades do modelo e os preços são
+gravados uma vez em .npy e abertos por memmap em cada processo, então cada
+execução só refaz a simulação (trading_system/backtesting/engine.py).
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import ParameterGrid
+
+from trading_system.backtesting.engine import EXIT_REASONS, TIE_POLICIES, _simulate, max_drawdown
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILES_PATH = 'config_exemplo.json'
+DEFAULT_BALANCE = 1000.0
+SHARED_ARRAYS = ('probability', 'open', 'high', 'low', 'close')
+
+# Mesmos degraus de confiança de QuantumTradingSystem.get_trading_signal
+CONFIDENCE_FLOORS = {'LOW': None, 'MEDIUM': 0.75, 'HIGH': 0.90}
+
+# Arrays compartilhados, abertos uma vez por processo
+_WORKER_DATA = {}
+
+
+def load_profiles(path=DEFAULT_PROFILES_PATH):
+    """perfis_trading de config_exemplo.json, sem os campos descritivos"""
+    with open(path, 'r') as f:
+        profiles = json.load(f)['perfis_trading']
+    return {name: {k: v for k, v in params.items() if k != 'descricao'} for name, params in profiles.items()}
+
+
+def expand_grid(grid, base=None):
+    """Uma execução por combinação da grade; base completa os parâmetros ausentes"""
+    return {f"grade_{i:03d}": {**(base or {}), **params} for i, params in enumerate(ParameterGrid(grid))}
+
+
+def entry_signals(probabilities, probability_threshold, min_confidence='LOW'):
+    """
+    Sinais de entrada como no sistema ao vivo: BUY quando o modelo prevê alta
+    (probabilidade > 50%), a probabilidade atinge o threshold e a confiança do
+    sinal (>75% MEDIUM, >90% HIGH) alcança min_confidence.
+    """
+    signals = (probabilities > 0.5) & (probabilities >= probability_threshold)
+    floor = CONFIDENCE_FLOORS[min_confidence]
+    if floor is not None:
+        signals &= probabilities > floor
+    return signals.astype(np.int8)
+
+
+def share_arrays(directory, **arrays):
+    for name, values in arrays.items():
+        np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(values, dtype=np.float64))
+    return directory
+
+
+def _init_worker(directory):
+    for name in SHARED_ARRAYS:
+        _WORKER_DATA[name] = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+
+
+def simulate_trades(data, params, initial_balance=DEFAULT_BALANCE):
+    """
+    Trades de uma configuração: entradas long pelo modelo, SL/TP percentuais,
+    cooldown em barras de 1m e tamanho como em create_trade (risco / (preço * stop_loss)).
+    data tem arrays 'probability', 'open', 'high', 'low' e 'close' alinhados;
+    tie_policy (opcional) decide barras que tocam stop e alvo.
+    """
+    close = np.asarray(data['close'])
+    signals = entry_signals(np.asarray(data['probability']), params['probability_threshold'],
+                            params.get('min_confidence', 'LOW'))
+
+    entry_index, exit_index, _, exit_price, reason = _simulate(
+        signals, np.asarray(data['open']), np.asarray(data['high']), np.asarray(data['low']), close,
+        params['stop_loss'], params['take_profit'], int(params.get('cooldown_minutes', 0)),
+        TIE_POLICIES[params.get('tie_policy', 'stop_loss')]
+    )
+
+    entry_price = close[entry_index]
+    risk_amount = initial_balance * params['max_risk_per_trade']
+    position_size = risk_amount / (entry_price * params['stop_loss'])
+    return pd.DataFrame({
+        'entry_index': entry_index,
+        'exit_index': exit_index,
+        'entry_price': entry_price,
+        'exit_price': exit_price,
+        'position_size': position_size,
+        'profit': (exit_price - entry_price) * position_size,
+        'exit_reason': [EXIT_REASONS[r] for r in reason]
+    })
+
+
+def summarize(trades, initial_balance=DEFAULT_BALANCE):
+    profit = trades['profit'].to_numpy()
+    equity = initial_balance + np.concatenate([[0.0], np.cumsum(profit)])
+    exits = trades['exit_reason'].value_counts()
+    return {
+        'trades': int(len(profit)),
+        'win_rate': float((profit > 0).mean()) if len(profit) else 0.0,
+        'total_profit': float(profit.sum()),
+        'return_pct': float(profit.sum() / initial_balance * 100),
+        'max_drawdown': max_drawdown(equity),
+        'take_profits': int(exits.get('take_profit', 0)),
+        'stop_losses': int(exits.get('stop_loss', 0))
+    }
+
+
+def simulate_profile(name, params, initial_balance=DEFAULT_BALANCE, data=None):
+    """Uma execução da varredura sobre os arrays compartilhados do processo"""
+    started = time.perf_counter()
+    trades = simulate_trades(data or _WORKER_DATA, params, initial_balance)
+    return {
+        'profile': name,
+        'params': json.dumps(params, sort_keys=True),
+        **summarize(trades, initial_balance),
+        'seconds': time.perf_counter() - started,
+        'pid': os.getpid()
+    }
+
+
+def run_sweep(probabilities, prices, profiles, n_workers=None, initial_balance=DEFAULT_BALANCE):
+    """
+    Executa cada perfil ({nome: parâmetros}) em um pool de processos.
+    prices é um DataFrame OHLC alinhado com probabilities (uma linha por barra
+    de 1m). Retorna a tabela ordenada por lucro e, no empate, por drawdown.
+    """
+    n_workers = max(1, min(n_workers or multiprocessing.cpu_count(), len(profiles)))
+    started = time.perf_counter()
+
+    with tempfile.TemporaryDirectory(prefix='quantum_sweep_') as directory:
+        share_arrays(directory, probability=probabilities,
+                     **{column: prices[column].to_numpy() for column in ('open', 'high', 'low', 'close')})
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(directory,)) as pool:
+            futures = [pool.submit(simulate_profile, name, params, initial_balance)
+                       for name, params in profiles.items()]
+            rows = [future.result() for future in futures]
+
+    table = pd.DataFrame(rows).sort_values(['total_profit', 'max_drawdown'], ascending=[False, True])
+    table.insert(0, 'rank', range(1, len(table) + 1))
+    table = table.set_index('profile')
+    table.attrs['wall_time'] = time.perf_counter() - started
+    logger.info(f"🧪 {len(table)} execuções em {n_workers} processos: {table.attrs['wall_time']:.2f}s "
+                f"(soma das execuções {table['seconds'].sum():.2f}s)")
+    return table
+
+
+def load_market_file(path):
+    """CSV com open/high/low/close e a coluna probability (0-1) do modelo, uma linha por barra"""
+    data = pd.read_csv(path)
+    missing = [column for column in SHARED_ARRAYS if column not in data.columns]
+    if missing:
+        raise ValueError(f"Colunas ausentes em {path}: {missing}")
+    return data
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Varredura de perfis de trading do QuantumTrail')
+    parser.add_argument('data', help='CSV com open, high, low, close e probability')
+    parser.add_argument('--profiles', default=DEFAULT_PROFILES_PATH, help='JSON com perfis_trading')
+    parser.add_argument('--grid', default=None, help='JSON {parâmetro: [valores]}; completa com configuracao_atual')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--balance', type=float, default=DEFAULT_BALANCE)
+    parser.add_argument('--output', default='quantum_sweep_results.csv')
+    args = parser.parse_args()
+
+    data = load_market_file(args.data)
+    if args.grid:
+        with open(args.profiles, 'r') as f:
+            base = json.load(f).get('configuracao_atual', {})
+        with open(args.grid, 'r') as f:
+            profiles = expand_grid(json.load(f), base)
+    else:
+        profiles = load_profiles(args.profiles)
+
+    table = run_sweep(data['probability'].to_numpy(), data, profiles, args.workers, args.balance)
+    table.to_csv(args.output)
+
+    logger.info("🏆 RANKING:")
+    for name, row in table.iterrows():
+        logger.info(f"   {row['rank']:>2}. {name}: lucro ${row['total_profit']:.2f} ({row['return_pct']:+.2f}%) | "
+                    f"drawdown {row['max_drawdown'] * 100:.2f}% | {row['trades']} trades | {row['seconds'] * 1000:.1f}ms")
+    logger.info(f"💾 Resultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,16 @@ import logging
 from datetime import datetime
 import time
 import json
+import os
 import warnings
+from quantum_flat_model import FlatTreeEnsemble
+from quantum_early_exit import EarlyExitEnsemble, calibration_path_for
+from quantum_inference_server import connect_if_available
+from quantum_model_registry import ModelRegistry
+from quantum_hot_swap import ModelSwapManager
+from quantum_latency import LatencyRecorder
+from quantum_features import ALL_FEATURES, compute_features, model_feature_names
+from quantum_backtest import backtest_signal
 warnings.filterwarnings('ignore')
 
 logging.basicConfig(
@@ -26,15 +35,27 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class QuantumTradingSystem:
-    def __init__(self, model_path='gpu_perfect_model.pkl'):
+    def __init__(self, model_path='gpu_perfect_model.pkl', registry_dir=None, model_variant=None):
         self.model = None
+        self.model_swap = None
+        self.feature_subset = None
+        self.latency = LatencyRecorder()
         self.trading_active = False
         self.trade_history = []
         self.balance = 1000.0
         self.total_profit = 0.0
         self.win_rate = 0.0
         
+        registry = ModelRegistry(registry_dir) if registry_dir else None
+        self.registry = registry
+        # Variante do registro (ex.: 'fast' = modelo destilado de training/distill.py)
+        self.model_variant = model_variant
+        if registry is not None and registry.current(model_variant) is not None:
+            model_path = registry.current(model_variant)['model_path']
+        
         self.load_model(model_path)
+        # Seleção de features (training/feature_selection.py): calcula só o necessário
+        self.feature_subset = self.resolve_feature_subset()
         
         self.config = {
             'min_confidence': 'MEDIUM',
@@ -42,13 +63,42 @@ class QuantumTradingSystem:
             'stop_loss': 0.001,
             'take_profit': 0.002,
             'cooldown_minutes': 5,
-            'probability_threshold': 0.70
+            'probability_threshold': 0.70,
+            'shadow_signals': 20,
+            'shadow_max_latency_ms': 50.0,
+            'shadow_max_divergence': 0.10
         }
+        
+        if registry is not None:
+            # Troca de modelo sem parada (quantum_hot_swap.py)
+            self.model_swap = ModelSwapManager(
+                registry, self.read_model,
+                shadow_signals=self.config['shadow_signals'],
+                max_latency_ms=self.config['shadow_max_latency_ms'],
+                max_divergence=self.config['shadow_max_divergence'],
+                variant=model_variant
+            )
+            self.model_swap.start()
+    
+    def read_model(self, model_path):
+        """Lê um modelo do disco (.pkl, .npz achatado e calibração de saída antecipada)"""
+        if not model_path.endswith('.npz'):
+            with open(model_path, 'rb') as f:
+                return pickle.load(f)
+        
+        # Modelo achatado (quantum_flat_model.py): inferência sem xgboost
+        model = FlatTreeEnsemble.load(model_path)
+        calibration_path = calibration_path_for(model_path)
+        if os.path.exists(calibration_path):
+            # Inferência adaptativa calibrada (quantum_early_exit.py)
+            model = EarlyExitEnsemble.load(model, calibration_path)
+            logger.info(f"🏁 Inferência adaptativa: estágios {model.stages.tolist()}")
+        return model
     
     def load_model(self, model_path):
         try:
-            with open(model_path, 'rb') as f:
-                self.model = pickle.load(f)
+            # Servidor compartilhado (quantum_inference_server.py) evita uma cópia do modelo por processo
+            self.model = connect_if_available(model_path=model_path) or self.read_model(model_path)
             
             logger.info("🚀 QUANTUM TRAIL SISTEMA CARREGADO!")
             logger.info("=" * 50)
@@ -93,110 +143,54 @@ class QuantumTradingSystem:
             logger.error(f"❌ Erro ao obter dados: {e}")
             return None
     
-    def create_features(self, data):
-        """Cria features EXATAMENTE como no modelo treinado"""
-        df = data.copy()
-        
-        # Features básicas
-        df['price_change'] = df['close'].pct_change()
-        df['volume_change'] = df['volume'].pct_change()
-        df['high_low_ratio'] = df['high'] / df['low']
-        df['close_open_ratio'] = df['close'] / df['open']
-        df['price_range'] = (df['high'] - df['low']) / df['close']
-        df['volume_price_ratio'] = df['volume'] / df['close']
-        
-        # Médias móveis
-        windows = [3, 5, 7, 10, 14, 20, 30, 50, 100]
-        for window in windows:
-            df[f'sma_{window}'] = df['close'].rolling(window=window).mean()
-            df[f'ema_{window}'] = df['close'].ewm(span=window).mean()
-            df[f'volume_sma_{window}'] = df['volume'].rolling(window=window).mean()
-            
-            df[f'price_sma_{window}_ratio'] = df['close'] / df[f'sma_{window}']
-            df[f'volume_sma_{window}_ratio'] = df['volume'] / df[f'volume_sma_{window}']
-            df[f'price_sma_{window}_dev'] = (df['close'] - df[f'sma_{window}']) / df[f'sma_{window}']
-        
-        # RSI
-        def calculate_rsi(prices, window=14):
-            delta = prices.diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-            rs = gain / loss
-            return 100 - (100 / (1 + rs))
-        
-        for period in [7, 14, 21, 30, 50]:
-            df[f'rsi_{period}'] = calculate_rsi(df['close'], period)
-        
-        # MACD
-        def calculate_macd(prices, fast=12, slow=26, signal=9):
-            ema_fast = prices.ewm(span=fast).mean()
-            ema_slow = prices.ewm(span=slow).mean()
-            macd = ema_fast - ema_slow
-            signal_line = macd.ewm(span=signal).mean()
-            histogram = macd - signal_line
-            return macd, signal_line, histogram
-        
-        macd, macd_signal, macd_hist = calculate_macd(df['close'])
-        df['macd'] = macd
-        df['macd_signal'] = macd_signal
-        df['macd_histogram'] = macd_hist
-        
-        # Bollinger Bands (usando os mesmos períodos do modelo)
-        for window in [20, 30, 50]:
-            sma = df['close'].rolling(window=window).mean()
-            std = df['close'].rolling(window=window).std()
-            df[f'bb_upper_{window}'] = sma + (std * 2)
-            df[f'bb_lower_{window}'] = sma - (std * 2)
-            df[f'bb_position_{window}'] = (df['close'] - df[f'bb_lower_{window}']) / (df[f'bb_upper_{window}'] - df[f'bb_lower_{window}'])
-            df[f'bb_width_{window}'] = (df[f'bb_upper_{window}'] - df[f'bb_lower_{window}']) / sma
-        
-        # Volatilidade (usando _norm como no modelo)
-        for window in [5, 10, 20, 30, 50]:
-            df[f'volatility_{window}'] = df['close'].rolling(window=window).std()
-            df[f'volatility_{window}_norm'] = df[f'volatility_{window}'] / df['close']
-        
-        # Momentum (incluindo período 30 que estava faltando)
-        for period in [3, 5, 10, 15, 20, 30]:
-            df[f'momentum_{period}'] = df['close'] / df['close'].shift(period) - 1
-            df[f'roc_{period}'] = df['close'].pct_change(periods=period)
-        
-        # Features de volume
-        df['volume_price_trend'] = df['volume'] * df['price_change']
-        df['volume_weighted_price'] = (df['volume'] * df['close']).rolling(window=20).sum() / df['volume'].rolling(window=20).sum()
-        
-        # Features temporais
-        now = datetime.now()
-        df['hour'] = now.hour
-        df['day_of_week'] = now.weekday()
-        df['month'] = now.month
-        df['is_weekend'] = (now.weekday() >= 5)
-        df['is_night'] = (now.hour >= 22 or now.hour <= 6)
-        
-        df['hour_sin'] = np.sin(2 * np.pi * now.hour / 24)
-        df['hour_cos'] = np.cos(2 * np.pi * now.hour / 24)
-        df['day_sin'] = np.sin(2 * np.pi * now.weekday() / 7)
-        df['day_cos'] = np.cos(2 * np.pi * now.weekday() / 7)
-        
-        # Usar pd.concat para melhor performance
-        df = df.dropna().reset_index(drop=True)
-        
-        feature_columns = [col for col in df.columns if col not in ['time', 'open', 'high', 'low', 'close', 'volume']]
-        
-        return df, feature_columns
+    def create_features(self, data, columns=None, now=None):
+        """Cria features EXATAMENTE como no modelo treinado (só `columns`, se informado)"""
+        return compute_features(data, columns, now)
+    
+    def resolve_feature_subset(self, version=None):
+        """Features do modelo: metadados do registro ('features') ou nomes do próprio modelo"""
+        features = None
+        if self.registry is not None and self.registry.current(self.model_variant) is not None:
+            features = (self.registry.load_params(version, self.model_variant) or {}).get('features')
+        features = features or model_feature_names(self.model)
+        if not features or not set(features) <= set(ALL_FEATURES):
+            return None
+        return list(features)
+    
+    def required_features(self):
+        """Colunas a calcular: as do modelo atual mais as do candidato em sombra (None = todas)"""
+        if self.feature_subset is None:
+            return None
+        columns = list(self.feature_subset)
+        if self.model_swap is not None:
+            candidate_features = self.model_swap.candidate_features()
+            if candidate_features is None:
+                return None
+            columns += [column for column in candidate_features if column not in columns]
+        return columns
     
     def get_trading_signal(self, symbol='BTCUSDT'):
+        timings = {}
         try:
-            data = self.get_market_data(symbol)
+            with self.latency.stage('fetch', timings):
+                data = self.get_market_data(symbol)
             if data is None or len(data) < 100:
                 return self.create_error_signal("Dados insuficientes")
             
-            df, feature_columns = self.create_features(data)
+            with self.latency.stage('features', timings):
+                df, feature_columns = self.create_features(data, self.required_features())
             if len(df) == 0:
                 return self.create_error_signal("Erro na criação de features")
             
-            X = df[feature_columns].iloc[-1:]
-            prediction = self.model.predict(X)[0]
-            probability = self.model.predict_proba(X)[0][1] * 100
+            features_row = df[feature_columns].iloc[-1:]
+            X = features_row[self.feature_subset] if self.feature_subset else features_row
+            with self.latency.stage('inference', timings):
+                if isinstance(self.model, EarlyExitEnsemble):
+                    probability = self.model.predict_proba(X, boundaries=self.decision_boundaries())[0][1] * 100
+                    prediction = int(probability > 50)
+                else:
+                    prediction = self.model.predict(X)[0]
+                    probability = self.model.predict_proba(X)[0][1] * 100
             
             current_price = data['close'].iloc[-1]
             
@@ -217,7 +211,7 @@ class QuantumTradingSystem:
                 else:
                     confidence = 'LOW'
             
-            return {
+            result = {
                 'signal': signal,
                 'probability': round(probability, 2),
                 'confidence': confidence,
@@ -225,13 +219,34 @@ class QuantumTradingSystem:
                 'expected_profit': 0.2 if signal == 'BUY' else 0.0,
                 'time_horizon': 15,
                 'timestamp': datetime.now().isoformat(),
-                'symbol': symbol
+                'symbol': symbol,
+                'latency_ms': timings
             }
+            if isinstance(self.model, EarlyExitEnsemble):
+                result['trees_evaluated'] = int(self.model.last_trees_evaluated[0])
+            if self.model_swap is not None:
+                with self.latency.stage('shadow'):
+                    self.model_swap.shadow_score(features_row, probability / 100)
+            
+            return result
             
         except Exception as e:
             logger.error(f"❌ Erro na geração de sinal: {e}")
             return self.create_error_signal(str(e))
     
+    def apply_pending_model(self):
+        """Aplica um modelo aprovado na sombra; chamar entre iterações"""
+        if self.model_swap is not None and self.model_swap.apply_pending(self):
+            self.feature_subset = self.resolve_feature_subset(self.model_swap.active_version)
+    
+    def decision_boundaries(self):
+        """Probabilidades onde a decisão/confiança de BUY muda (usadas pela saída antecipada)"""
+        return sorted({0.5, self.config['probability_threshold'], 0.75, 0.90})
+    
+    def backtest(self, data, config=None, initial_balance=None):
+        """Backtest histórico das regras de sinal e execução (quantum_backtest.py)"""
+        return backtest_signal(self, data, config, initial_balance)
+    
     def create_error_signal(self, error_msg):
         return {
             'signal': 'ERROR',
@@ -258,6 +273,21 @@ class QuantumTradingSystem:
         if not self.should_execute_trade(signal):
             return None
         
+        timings = {}
+        with self.latency.stage('order', timings):
+            trade = self.create_trade(signal)
+        trade['latency_ms'] = timings
+        
+        logger.info("🚀 TRADE EXECUTADO!")
+        logger.info(f"   💰 Preço: ${trade['entry_price']:.2f}")
+        logger.info(f"   📊 Posição: {trade['position_size']:.6f} BTC")
+        logger.info(f"   🛡️ Stop: ${trade['stop_loss']:.2f}")
+        logger.info(f"   🎯 Target: ${trade['take_profit']:.2f}")
+        logger.info(f"   ⚡ Confiança: {signal['confidence']} ({signal['probability']:.1f}%)")
+        
+        return trade
+    
+    def create_trade(self, signal):
         risk_amount = self.balance * self.config['max_risk_per_trade']
         position_size = risk_amount / (signal['price'] * self.config['stop_loss'])
         
@@ -275,13 +305,6 @@ class QuantumTradingSystem:
         
         self.trade_history.append(trade)
         
-        logger.info("🚀 TRADE EXECUTADO!")
-        logger.info(f"   💰 Preço: ${trade['entry_price']:.2f}")
-        logger.info(f"   📊 Posição: {trade['position_size']:.6f} BTC")
-        logger.info(f"   🛡️ Stop: ${trade['stop_loss']:.2f}")
-        logger.info(f"   🎯 Target: ${trade['take_profit']:.2f}")
-        logger.info(f"   ⚡ Confiança: {signal['confidence']} ({signal['probability']:.1f}%)")
-        
         return trade
     
     def run_continuous_trading(self, symbol='BTCUSDT', interval_seconds=30):
@@ -297,6 +320,7 @@ class QuantumTradingSystem:
         
         try:
             while self.trading_active:
+                self.apply_pending_model()
                 signal = self.get_trading_signal(symbol)
                 
                 logger.info("📊 ANÁLISE ATUAL:")
@@ -333,6 +357,10 @@ class QuantumTradingSystem:
         if len(self.trade_history) > 0:
             logger.info(f"📊 Trades executados: {len(self.trade_history)}")
             logger.info(f"💰 Lucro total: ${self.total_profit:.2f}")
+        if isinstance(self.model, EarlyExitEnsemble):
+            logger.info(f"🌲 Árvores médias por sinal: {self.model.average_trees_per_row:.1f} / {self.model.flat.n_trees}")
+        for stage, stats in self.latency.summary().items():
+            logger.info(f"⏱️ {stage}: p50 {stats['p50']:.1f}ms | p95 {stats['p95']:.1f}ms | p99 {stats['p99']:.1f}ms")
     
     def show_final_summary(self):
         logger.info("📊 RESUMO FINAL:")
@@ -0,0 +1 @@
+﻿# This file can be empty or contain package initialization code
@@ -0,0 +1,270 @@
+import copy
+import itertools
+import logging
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from numba import njit, prange
+
+from trading_system.utils.indicator_cache import get_indicator_cache
+from trading_system.utils.time_utils import TimeFrameConverter
+
+EXIT_END, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT = 0, 1, 2
+EXIT_REASONS = {EXIT_END: 'end', EXIT_STOP_LOSS: 'stop_loss', EXIT_TAKE_PROFIT: 'take_profit'}
+
+
+TIE_STOP_LOSS, TIE_TAKE_PROFIT, TIE_CANDLE = 0, 1, 2
+# Which level a bar that trades through both SL and TP hits first: 'stop_loss'
+# (pessimistic), 'take_profit' (optimistic) or 'candle' (bullish bars go
+# open -> low -> high -> close, bearish bars open -> high -> low -> close)
+TIE_POLICIES = {'stop_loss': TIE_STOP_LOSS, 'take_profit': TIE_TAKE_PROFIT, 'candle': TIE_CANDLE}
+
+
+@njit(cache=True, nogil=True)
+def _bar_exit(side, sl, tp, open_, high, low, close, tie):
+    """
+    Exit of one position inside one bar: (reason, price). A gap through a level
+    fills at the open, otherwise at the level. NaN levels are never hit.
+    """
+    if side > 0:
+        if open_ <= sl:
+            return EXIT_STOP_LOSS, open_
+        if open_ >= tp:
+            return EXIT_TAKE_PROFIT, open_
+        hit_sl = low <= sl
+        hit_tp = high >= tp
+    else:
+        if open_ >= sl:
+            return EXIT_STOP_LOSS, open_
+        if open_ <= tp:
+            return EXIT_TAKE_PROFIT, open_
+        hit_sl = high >= sl
+        hit_tp = low <= tp
+
+    if hit_sl and hit_tp:
+        if tie == TIE_TAKE_PROFIT:
+            hit_sl = False
+        elif tie == TIE_CANDLE:
+            low_first = close >= open_
+            # A long's stop sits below, a short's stop above
+            if (side > 0) == low_first:
+                hit_tp = False
+            else:
+                hit_sl = False
+        else:
+            hit_tp = False
+    if hit_sl:
+        return EXIT_STOP_LOSS, sl
+    if hit_tp:
+        return EXIT_TAKE_PROFIT, tp
+    return EXIT_END, np.nan
+
+
+@njit(cache=True, nogil=True)
+def _first_touch(start, side, sl, tp, open_, high, low, close, tie):
+    """First bar from start on that touches SL or TP: (bar, reason, price), bar -1 if none"""
+    for j in range(start, len(close)):
+        why, price = _bar_exit(side, sl, tp, open_[j], high[j], low[j], close[j], tie)
+        if why != EXIT_END:
+            return j, why, price
+    return -1, EXIT_END, np.nan
+
+
+@njit(cache=True)
+def _simulate(signals, open_, high, low, close, stop_loss_pct, take_profit_pct, cooldown_bars, tie=TIE_STOP_LOSS):
+    """
+    One position at a time. A signal opens at the bar's close; SL/TP are checked
+    from the next bar on with _bar_exit. Entries are skipped while a position is
+    open or during the cooldown that starts at the previous entry.
+    """
+    n = len(close)
+    entry_index = np.empty(n, dtype=np.int64)
+    exit_index = np.empty(n, dtype=np.int64)
+    direction = np.empty(n, dtype=np.int8)
+    exit_price = np.empty(n, dtype=np.float64)
+    reason = np.empty(n, dtype=np.int8)
+
+    k = 0
+    i = 0
+    while i < n:
+        side = signals[i]
+        if side == 0:
+            i += 1
+            continue
+
+        entry = close[i]
+        if side > 0:
+            sl = entry * (1 - stop_loss_pct)
+            tp = entry * (1 + take_profit_pct)
+        else:
+            sl = entry * (1 + stop_loss_pct)
+            tp = entry * (1 - take_profit_pct)
+
+        exit_at, why, price = _first_touch(i + 1, side, sl, tp, open_, high, low, close, tie)
+        if exit_at < 0:
+            exit_at, why, price = n - 1, EXIT_END, close[n - 1]
+
+        entry_index[k] = i
+        exit_index[k] = exit_at
+        direction[k] = side
+        exit_price[k] = price
+        reason[k] = why
+        k += 1
+        i = max(exit_at + 1, i + cooldown_bars)
+
+    return entry_index[:k], exit_index[:k], direction[:k], exit_price[:k], reason[:k]
+
+
+@njit(cache=True, parallel=True)
+def _resolve_exits(entry_index, direction, stop_loss, take_profit, open_, high, low, close, tie):
+    m = len(entry_index)
+    exit_index = np.empty(m, dtype=np.int64)
+    exit_price = np.empty(m, dtype=np.float64)
+    reason = np.empty(m, dtype=np.int8)
+    for k in prange(m):
+        exit_at, why, price = _first_touch(entry_index[k] + 1, direction[k], stop_loss[k], take_profit[k],
+                                           open_, high, low, close, tie)
+        if exit_at < 0:
+            exit_at, why, price = len(close) - 1, EXIT_END, close[len(close) - 1]
+        exit_index[k] = exit_at
+        exit_price[k] = price
+        reason[k] = why
+    return exit_index, exit_price, reason
+
+
+def resolve_exits(data, entry_index, direction, stop_loss, take_profit, tie_policy='stop_loss'):
+    """
+    First-touch exits for many independent trades at once (overlapping trades
+    allowed). Each trade is scanned forward from the bar after entry_index over
+    the bar highs/lows; stop_loss/take_profit are price levels (NaN = none).
+    Trades that never touch a level close at the last bar with reason 'end'.
+    """
+    open_, high, low, close = (data[column].to_numpy(dtype=np.float64) for column in ('open', 'high', 'low', 'close'))
+    exit_index, exit_price, reason = _resolve_exits(
+        np.asarray(entry_index, dtype=np.int64), np.asarray(direction, dtype=np.int8),
+        np.asarray(stop_loss, dtype=np.float64), np.asarray(take_profit, dtype=np.float64),
+        open_, high, low, close, TIE_POLICIES[tie_policy]
+    )
+    return pd.DataFrame({
+        'exit_index': exit_index,
+        'exit_price': exit_price,
+        'exit_reason': [EXIT_REASONS[r] for r in reason]
+    })
+
+
+def cooldown_bars(strategy, timeframe):
+    """Strategies that keep a cooldown_period (timedelta) wait that many bars between entries"""
+    cooldown = getattr(strategy, 'cooldown_period', None) or timedelta(0)
+    minutes = TimeFrameConverter().to_minutes(timeframe)
+    return int(np.ceil(cooldown.total_seconds() / 60 / minutes))
+
+
+def position_sizes(entry_prices, stop_loss_pct, risk_manager=None, volume=None):
+    """RiskManager.calculate_position_size for every entry at once (sized on the initial balance)"""
+    if volume is not None:
+        return np.full(len(entry_prices), float(volume))
+    if risk_manager is None:
+        return np.full(len(entry_prices), 0.01)
+    risk_amount = risk_manager.current_balance * risk_manager.max_risk_per_trade
+    sizes = risk_amount / (stop_loss_pct * entry_prices)
+    return np.clip(sizes, risk_manager.min_lot_size, risk_manager.max_lot_size)
+
+
+def max_drawdown(equity):
+    peak = np.maximum.accumulate(equity)
+    return float(((peak - equity) / peak).max()) if len(equity) else 0.0
+
+
+def run_backtest(strategy, data, risk_manager=None, volume=None, commission=0.0, tie_policy='stop_loss'):
+    """
+    Backtest a strategy over a historical OHLCV DataFrame (as returned by
+    HistoricalDataSource.get_data). The strategy supplies generate_signals(data)
+    plus stop_loss_pct/take_profit_pct; fills and P&L are computed for all trades
+    at once. commission is a fraction of the notional charged on entry and exit;
+    tie_policy decides bars that touch both SL and TP (see TIE_POLICIES).
+    """
+    started = time.perf_counter()
+    risk_manager = risk_manager or strategy.risk_manager
+    signals = np.asarray(strategy.generate_signals(data), dtype=np.int8)
+    open_, high, low, close = (data[column].to_numpy(dtype=np.float64) for column in ('open', 'high', 'low', 'close'))
+
+    entry_index, exit_index, direction, exit_price, reason = _simulate(
+        signals, open_, high, low, close, strategy.stop_loss_pct, strategy.take_profit_pct,
+        cooldown_bars(strategy, strategy.timeframe), TIE_POLICIES[tie_policy]
+    )
+
+    return backtest_report(strategy, data, close, entry_index, exit_index, direction, exit_price, reason,
+                           risk_manager, volume, commission, started)
+
+
+def backtest_report(strategy, data, close, entry_index, exit_index, direction, exit_price, reason,
+                    risk_manager=None, volume=None, commission=0.0, started=None):
+    """Trades table, equity curve and stats from the simulated entry/exit arrays"""
+    entry_price = close[entry_index]
+    size = position_sizes(entry_price, strategy.stop_loss_pct, risk_manager, volume)
+    profit = direction * (exit_price - entry_price) * size - commission * (entry_price + exit_price) * size
+
+    # Positional: a 'time' column Series would realign times[entry_index] on its labels
+    times = data.index if isinstance(data.index, pd.DatetimeIndex) else pd.DatetimeIndex(pd.to_datetime(data['time']))
+    trades = pd.DataFrame({
+        'entry_time': times[entry_index],
+        'exit_time': times[exit_index],
+        'type': np.where(direction > 0, 'BUY', 'SELL'),
+        'entry_price': entry_price,
+        'exit_price': exit_price,
+        'volume': size,
+        'profit': profit,
+        'bars_held': exit_index - entry_index,
+        'exit_reason': [EXIT_REASONS[r] for r in reason]
+    })
+
+    initial_balance = strategy.initial_balance
+    realized = np.zeros(len(close))
+    np.add.at(realized, exit_index, profit)
+    equity = pd.Series(initial_balance + np.cumsum(realized), index=times, name='equity')
+
+    wins = profit[profit > 0]
+    losses = profit[profit < 0]
+    stats = {
+        'trades': int(len(trades)),
+        'win_rate': float(len(wins) / len(trades)) if len(trades) else 0.0,
+        'total_profit': float(profit.sum()),
+        'final_balance': float(initial_balance + profit.sum()),
+        'profit_factor': float(wins.sum() / -losses.sum()) if len(losses) else float('inf') if len(wins) else 0.0,
+        'max_drawdown': max_drawdown(equity.to_numpy()),
+        'avg_bars_held': float(trades['bars_held'].mean()) if len(trades) else 0.0,
+        'exits': trades['exit_reason'].value_counts().to_dict(),
+        'bars': int(len(close)),
+        'seconds': time.perf_counter() - started if started else 0.0
+    }
+    logging.info(f"Backtest {type(strategy).__name__}: {stats['trades']} trades over {stats['bars']} bars "
+                 f"in {stats['seconds']:.2f}s, final balance {stats['final_balance']:.2f}")
+    return {'balance': stats['final_balance'], 'trades': trades, 'equity': equity, 'stats': stats}
+
+
+def run_parameter_sweep(strategy, data, grid, risk_manager=None, volume=None, commission=0.0, tie_policy='stop_loss'):
+    """
+    run_backtest for every combination of the strategy attributes in grid
+    ({'fast_period': [8, 12], 'slow_period': [21, 26]}), ranked by profit.
+    Indicators go through the indicator cache, so runs that share a setting
+    (the same slow EMA, the same RSI) compute it only once.
+    """
+    started = time.perf_counter()
+    cache = get_indicator_cache()
+    misses = cache.misses if cache is not None else 0
+    names = list(grid)
+    rows = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        variant = copy.copy(strategy)
+        for name, value in zip(names, values):
+            setattr(variant, name, value)
+        stats = run_backtest(variant, data, risk_manager, volume, commission, tie_policy)['stats']
+        rows.append({**dict(zip(names, values)), **{key: value for key, value in stats.items() if key != 'exits'}})
+
+    results = pd.DataFrame(rows).sort_values('total_profit', ascending=False, kind='stable').reset_index(drop=True)
+    computed = cache.misses - misses if cache is not None else None
+    logging.info(f"Parameter sweep {type(strategy).__name__}: {len(rows)} runs in {time.perf_counter() - started:.2f}s"
+                 + (f", {computed} indicators computed" if computed is not None else ""))
+    return results
@@ -0,0 +1,115 @@
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+METHODS = ('bootstrap', 'block', 'permutation')
+PERCENTILES = (5, 25, 50, 75, 95)
+# Matrices alive at once per chunk: sample/equity, peak, drawdown and resample indices
+_ARRAYS_PER_PATH = 4
+
+
+def resample(profit, n_paths, method, rng, block_size=None):
+    """
+    (n_paths x n_trades) matrix of trade P&L sequences: 'bootstrap' draws trades
+    with replacement, 'block' draws circular blocks of block_size consecutive
+    trades (keeps streaks), 'permutation' reshuffles the original trades.
+    """
+    n = len(profit)
+    if method == 'permutation':
+        paths = np.tile(profit, (n_paths, 1))
+        return rng.permuted(paths, axis=1, out=paths)
+    if method == 'bootstrap':
+        return profit[rng.integers(0, n, size=(n_paths, n))]
+    if method == 'block':
+        block_size = block_size or max(1, int(round(np.sqrt(n))))
+        n_blocks = -(-n // block_size)
+        starts = rng.integers(0, n, size=(n_paths, n_blocks, 1))
+        index = ((starts + np.arange(block_size)) % n).reshape(n_paths, -1)[:, :n]
+        return profit[index]
+    raise ValueError(f"Unknown resampling method '{method}', expected one of {METHODS}")
+
+
+def path_statistics(paths, initial_balance):
+    """Terminal equity and max drawdown of every row of a P&L matrix (overwrites paths)"""
+    equity = np.cumsum(paths, axis=1, out=paths)
+    equity += initial_balance
+    peak = np.maximum.accumulate(equity, axis=1)
+    np.maximum(peak, initial_balance, out=peak)
+    drawdown = peak - equity
+    drawdown /= peak
+    return equity[:, -1].copy(), drawdown.max(axis=1)
+
+
+def _run_chunk(profit, n_paths, method, block_size, initial_balance, seed):
+    rng = np.random.default_rng(seed)
+    return path_statistics(resample(profit, n_paths, method, rng, block_size), initial_balance)
+
+
+def chunk_sizes(n_simulations, n_trades, n_workers, memory_limit_mb):
+    """Paths per chunk so one chunk stays under memory_limit_mb, with at least one chunk per worker"""
+    max_rows = max(1, int(memory_limit_mb * 2 ** 20 // (_ARRAYS_PER_PATH * 8 * max(n_trades, 1))))
+    rows = min(max_rows, -(-n_simulations // n_workers))
+    sizes = [rows] * (n_simulations // rows)
+    if n_simulations % rows:
+        sizes.append(n_simulations % rows)
+    return sizes
+
+
+def summarize(terminal_equity, max_drawdown, initial_balance, observed=None):
+    rows = {}
+    for name, values in (('terminal_equity', terminal_equity), ('max_drawdown', max_drawdown)):
+        row = {'mean': values.mean(), 'std': values.std()}
+        row.update({f'p{q}': v for q, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))})
+        if observed is not None:
+            # Share of resampled paths at or below the backtest's own value
+            row['observed'] = observed[name]
+            tolerance = 1e-9 * max(1.0, abs(observed[name]))
+            row['observed_percentile'] = float((values <= observed[name] + tolerance).mean() * 100)
+        rows[name] = row
+    summary = pd.DataFrame(rows).T
+    summary.attrs['probability_of_loss'] = float((terminal_equity < initial_balance).mean())
+    return summary
+
+
+def monte_carlo(trades, initial_balance, n_simulations=10000, method='bootstrap', block_size=None, n_workers=None,
+                memory_limit_mb=256, seed=42):
+    """
+    Robustness of a backtest's trade sequence. trades is the trades DataFrame
+    of run_backtest (its 'profit' column) or an array of per-trade P&L. The
+    resampled paths are evaluated as (paths x trades) matrices in chunks that
+    fit memory_limit_mb, spread over n_workers processes.
+    Returns the terminal equity and max drawdown of every path plus a summary.
+    """
+    started = time.perf_counter()
+    profit = np.asarray(trades['profit'] if isinstance(trades, pd.DataFrame) else trades, dtype=np.float64)
+    if len(profit) == 0:
+        raise ValueError("Monte Carlo analysis needs at least one trade")
+    if method not in METHODS:
+        raise ValueError(f"Unknown resampling method '{method}', expected one of {METHODS}")
+
+    n_workers = max(1, n_workers or multiprocessing.cpu_count())
+    sizes = chunk_sizes(n_simulations, len(profit), n_workers, memory_limit_mb)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(profit, size, method, block_size, initial_balance, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+
+    if n_workers == 1 or len(jobs) == 1:
+        results = [_run_chunk(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(jobs))) as pool:
+            results = list(pool.map(_run_chunk, *zip(*jobs)))
+
+    terminal_equity = np.concatenate([terminal for terminal, _ in results])
+    max_drawdown = np.concatenate([drawdown for _, drawdown in results])
+    observed_terminal, observed_drawdown = path_statistics(profit[None, :].copy(), initial_balance)
+    summary = summarize(terminal_equity, max_drawdown, initial_balance,
+                        {'terminal_equity': observed_terminal[0], 'max_drawdown': observed_drawdown[0]})
+
+    seconds = time.perf_counter() - started
+    logging.info(f"Monte Carlo ({method}): {n_simulations} paths x {len(profit)} trades in {len(sizes)} chunks "
+                 f"in {seconds:.2f}s, P(loss) {summary.attrs['probability_of_loss']:.1%}")
+    return {'terminal_equity': terminal_equity, 'max_drawdown': max_drawdown, 'summary': summary,
+            'seconds': seconds}
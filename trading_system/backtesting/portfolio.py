@@ -0,0 +1,227 @@
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+from numba import njit
+
+from trading_system.backtesting.engine import (EXIT_END, EXIT_REASONS, TIE_POLICIES, _bar_exit, cooldown_bars,
+                                               max_drawdown)
+
+
+@njit(cache=True)
+def _portfolio(signals, open_, high, low, close, stop_loss_pct, take_profit_pct, cooldown, initial_balance,
+               max_concurrent, risk_per_trade, max_exposure, commission, tie, capacity):
+    """
+    All symbols share one balance. Every timestamp first settles SL/TP on the
+    open positions, then marks them to market and finally fills new signals at
+    the close, in symbol order, while fewer than max_concurrent positions are
+    open. Each entry risks risk_per_trade of the current equity at its stop;
+    max_exposure (> 0) caps the open notional as a multiple of equity.
+    Missing bars are NaN: those symbols neither exit nor enter at that time.
+    """
+    n_times, n_symbols = close.shape
+    side = np.zeros(n_symbols, dtype=np.int8)
+    entry_at = np.zeros(n_symbols, dtype=np.int64)
+    entry_price = np.zeros(n_symbols)
+    size = np.zeros(n_symbols)
+    sl = np.zeros(n_symbols)
+    tp = np.zeros(n_symbols)
+    next_entry = np.zeros(n_symbols, dtype=np.int64)
+    record = np.zeros(n_symbols, dtype=np.int64)
+    last_close = np.full(n_symbols, np.nan)
+
+    trade_symbol = np.empty(capacity, dtype=np.int64)
+    trade_entry = np.empty(capacity, dtype=np.int64)
+    trade_exit = np.empty(capacity, dtype=np.int64)
+    trade_side = np.empty(capacity, dtype=np.int8)
+    trade_entry_price = np.empty(capacity)
+    trade_exit_price = np.empty(capacity)
+    trade_size = np.empty(capacity)
+    trade_profit = np.empty(capacity)
+    trade_reason = np.empty(capacity, dtype=np.int8)
+    equity = np.empty(n_times)
+    open_count = np.zeros(n_times, dtype=np.int64)
+
+    balance = initial_balance
+    skipped = 0
+    k = 0
+    for t in range(n_times):
+        for s in range(n_symbols):
+            if np.isnan(close[t, s]):
+                continue
+            last_close[s] = close[t, s]
+            if side[s] == 0 or entry_at[s] >= t:
+                continue
+            why, price = _bar_exit(side[s], sl[s], tp[s], open_[t, s], high[t, s], low[t, s], close[t, s], tie)
+            if why == EXIT_END:
+                continue
+            profit = side[s] * (price - entry_price[s]) * size[s] - commission * price * size[s]
+            balance += profit
+            j = record[s]
+            trade_exit[j] = t
+            trade_exit_price[j] = price
+            trade_profit[j] = profit - commission * entry_price[s] * size[s]
+            trade_reason[j] = why
+            side[s] = 0
+            next_entry[s] = max(next_entry[s], t + 1)
+
+        unrealized = 0.0
+        exposure = 0.0
+        n_open = 0
+        for s in range(n_symbols):
+            if side[s] != 0:
+                unrealized += side[s] * (last_close[s] - entry_price[s]) * size[s]
+                exposure += last_close[s] * size[s]
+                n_open += 1
+        equity_now = balance + unrealized
+
+        for s in range(n_symbols):
+            if signals[t, s] == 0 or side[s] != 0 or t < next_entry[s] or np.isnan(close[t, s]):
+                continue
+            if n_open >= max_concurrent or equity_now <= 0:
+                skipped += 1
+                continue
+            price = close[t, s]
+            quantity = equity_now * risk_per_trade / (stop_loss_pct[s] * price)
+            if max_exposure > 0:
+                quantity = min(quantity, (max_exposure * equity_now - exposure) / price)
+                if quantity <= 0:
+                    skipped += 1
+                    continue
+            side[s] = 1 if signals[t, s] > 0 else -1
+            entry_at[s] = t
+            entry_price[s] = price
+            size[s] = quantity
+            if side[s] > 0:
+                sl[s] = price * (1 - stop_loss_pct[s])
+                tp[s] = price * (1 + take_profit_pct[s])
+            else:
+                sl[s] = price * (1 + stop_loss_pct[s])
+                tp[s] = price * (1 - take_profit_pct[s])
+            next_entry[s] = t + cooldown[s]
+            balance -= commission * price * quantity
+            exposure += price * quantity
+            n_open += 1
+
+            # Entry half of the record; the exit half is filled when it closes
+            record[s] = k
+            trade_symbol[k] = s
+            trade_entry[k] = t
+            trade_side[k] = side[s]
+            trade_entry_price[k] = price
+            trade_size[k] = quantity
+            k += 1
+
+        equity[t] = balance + unrealized
+        open_count[t] = n_open
+
+    for s in range(n_symbols):
+        if side[s] != 0:
+            price = last_close[s]
+            profit = side[s] * (price - entry_price[s]) * size[s] - commission * price * size[s]
+            balance += profit
+            j = record[s]
+            trade_exit[j] = n_times - 1
+            trade_exit_price[j] = price
+            trade_profit[j] = profit - commission * entry_price[s] * size[s]
+            trade_reason[j] = EXIT_END
+    if n_times:
+        equity[n_times - 1] = balance
+
+    return (trade_symbol[:k], trade_entry[:k], trade_exit[:k], trade_side[:k], trade_entry_price[:k],
+            trade_exit_price[:k], trade_size[:k], trade_profit[:k], trade_reason[:k], equity, open_count, skipped)
+
+
+def align(data):
+    """{symbol: OHLC DataFrame} -> common DatetimeIndex and (times x symbols) arrays, NaN where a bar is missing"""
+    frames = {symbol: frame if isinstance(frame.index, pd.DatetimeIndex) else frame.set_index(pd.to_datetime(frame['time']))
+              for symbol, frame in data.items()}
+    index = frames[next(iter(frames))].index
+    for frame in frames.values():
+        index = index.union(frame.index)
+    arrays = {
+        column: np.column_stack([frame[column].reindex(index).to_numpy(dtype=np.float64) for frame in frames.values()])
+        for column in ('open', 'high', 'low', 'close')
+    }
+    return index, frames, arrays
+
+
+def _per_symbol(value, symbols, attribute, strategies):
+    """Scalar, {symbol: value} or, when None, the strategy attribute of each symbol"""
+    if value is None:
+        return np.array([getattr(strategies[symbol], attribute) for symbol in symbols], dtype=np.float64)
+    if isinstance(value, dict):
+        return np.array([value[symbol] for symbol in symbols], dtype=np.float64)
+    return np.full(len(symbols), float(value))
+
+
+def run_portfolio_backtest(data, strategy=None, signals=None, initial_balance=10000.0, max_concurrent_trades=3,
+                           max_risk_per_trade=0.01, max_exposure=None, stop_loss_pct=None, take_profit_pct=None,
+                           cooldown=None, commission=0.0, tie_policy='stop_loss'):
+    """
+    Backtest several symbols on one account. data maps symbol -> OHLCV
+    DataFrame; signals come from strategy.generate_signals (one strategy for
+    all symbols or a {symbol: strategy} dict) or are given as {symbol: array}
+    aligned with each frame. SL/TP percentages and cooldown bars default to the
+    strategies' own settings. When more signals than free slots arrive at the
+    same time, symbols earlier in data take precedence.
+    """
+    started = time.perf_counter()
+    symbols = list(data)
+    index, frames, arrays = align(data)
+    strategies = strategy if isinstance(strategy, dict) else {symbol: strategy for symbol in symbols}
+
+    signal_matrix = np.zeros(arrays['close'].shape, dtype=np.int8)
+    for column, symbol in enumerate(symbols):
+        values = signals[symbol] if signals is not None else strategies[symbol].generate_signals(frames[symbol])
+        signal_matrix[:, column] = pd.Series(np.asarray(values, dtype=np.int8), index=frames[symbol].index) \
+            .reindex(index, fill_value=0).to_numpy()
+
+    if cooldown is None:
+        cooldown = {symbol: cooldown_bars(strategies[symbol], strategies[symbol].timeframe) for symbol in symbols} \
+            if signals is None else 0
+    (trade_symbol, entry_index, exit_index, direction, entry_price, exit_price, size, profit, reason,
+     equity, open_count, skipped) = _portfolio(
+        signal_matrix, arrays['open'], arrays['high'], arrays['low'], arrays['close'],
+        _per_symbol(stop_loss_pct, symbols, 'stop_loss_pct', strategies),
+        _per_symbol(take_profit_pct, symbols, 'take_profit_pct', strategies),
+        _per_symbol(cooldown, symbols, None, strategies).astype(np.int64),
+        float(initial_balance), int(max_concurrent_trades), float(max_risk_per_trade), float(max_exposure or 0.0),
+        float(commission), TIE_POLICIES[tie_policy], max(1, int(np.count_nonzero(signal_matrix)))
+    )
+
+    trades = pd.DataFrame({
+        'symbol': np.array(symbols, dtype=object)[trade_symbol],
+        'entry_time': index[entry_index],
+        'exit_time': index[exit_index],
+        'type': np.where(direction > 0, 'BUY', 'SELL'),
+        'entry_price': entry_price,
+        'exit_price': exit_price,
+        'volume': size,
+        'profit': profit,
+        'bars_held': exit_index - entry_index,
+        'exit_reason': [EXIT_REASONS[r] for r in reason]
+    }).sort_values(['entry_time', 'symbol'], kind='stable').reset_index(drop=True)
+    equity = pd.Series(equity, index=index, name='equity')
+
+    wins = profit[profit > 0]
+    losses = profit[profit < 0]
+    stats = {
+        'trades': int(len(trades)),
+        'win_rate': float(len(wins) / len(trades)) if len(trades) else 0.0,
+        'total_profit': float(profit.sum()),
+        'final_balance': float(equity.iloc[-1]) if len(equity) else float(initial_balance),
+        'profit_factor': float(wins.sum() / -losses.sum()) if len(losses) else float('inf') if len(wins) else 0.0,
+        'max_drawdown': max_drawdown(np.concatenate([[initial_balance], equity.to_numpy()])),
+        'max_open_positions': int(open_count.max()) if len(open_count) else 0,
+        'skipped_signals': int(skipped),
+        'profit_by_symbol': trades.groupby('symbol')['profit'].sum().reindex(symbols, fill_value=0.0).to_dict(),
+        'bars': int(len(index)),
+        'symbols': len(symbols),
+        'seconds': time.perf_counter() - started
+    }
+    logging.info(f"Portfolio backtest: {stats['trades']} trades on {len(symbols)} symbols over {stats['bars']} "
+                 f"timestamps in {stats['seconds']:.2f}s, final balance {stats['final_balance']:.2f}")
+    return {'balance': stats['final_balance'], 'trades': trades, 'equity': equity,
+            'open_positions': pd.Series(open_count, index=index, name='open_positions'), 'stats': stats}
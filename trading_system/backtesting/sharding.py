@@ -0,0 +1,159 @@
+import copy
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numba import njit
+
+from trading_system.backtesting.engine import (EXIT_END, TIE_POLICIES, _first_touch, _simulate, backtest_report,
+                                               cooldown_bars)
+
+# Bars of history in front of every shard: covers the 100-bar windows of the
+# strategies plus EMA convergence (0.93 ** 500 < 1e-15 for a 26-bar span)
+DEFAULT_WARMUP_BARS = 500
+
+
+def _run_shard(strategy, window, start, warmup, last, tie):
+    """
+    Signals of the shard's bars (window minus its first warmup bars of history)
+    and the trades they produce starting flat, in bar numbers from start.
+    """
+    signals = np.asarray(strategy.generate_signals(window), dtype=np.int8)[warmup:]
+    open_, high, low, close = (window[column].to_numpy(dtype=np.float64)[warmup:]
+                               for column in ('open', 'high', 'low', 'close'))
+    entry_index, exit_index, direction, exit_price, reason = _simulate(
+        signals, open_, high, low, close, strategy.stop_loss_pct, strategy.take_profit_pct,
+        cooldown_bars(strategy, strategy.timeframe), tie
+    )
+    # A trade still open at the shard's last bar has no exit yet (unless the shard ends the data)
+    complete = (reason != EXIT_END) | last
+    return signals, entry_index + start, exit_index + start, direction, exit_price, reason, complete
+
+
+@njit(cache=True)
+def _reconcile(signals, open_, high, low, close, stop_loss_pct, take_profit_pct, cooldown, tie,
+               local_entry, local_exit, local_direction, local_price, local_reason, local_complete):
+    """
+    Stitch the shards' trades into the sequential result. A shard trade is
+    kept when the account is flat and out of cooldown at its entry; from there
+    on the shard and the full run are in the same state. Otherwise (a trade
+    carried over the boundary, or the shard's own trade still open at its end)
+    the full run is replayed from that point until it enters on a bar where a
+    shard trade entered too, and the shard's trades are kept again.
+    """
+    n = len(close)
+    m = len(local_entry)
+    is_local = np.zeros(n, dtype=np.bool_)
+    for j in range(m):
+        is_local[local_entry[j]] = True
+
+    capacity = m + np.count_nonzero(signals)
+    entry_index = np.empty(capacity, dtype=np.int64)
+    exit_index = np.empty(capacity, dtype=np.int64)
+    direction = np.empty(capacity, dtype=np.int8)
+    exit_price = np.empty(capacity, dtype=np.float64)
+    reason = np.empty(capacity, dtype=np.int8)
+
+    k = 0
+    j = 0
+    cursor = 0
+    resumed_bars = 0
+    while j < m:
+        e = local_entry[j]
+        if e >= cursor and local_complete[j]:
+            entry_index[k] = e
+            exit_index[k] = local_exit[j]
+            direction[k] = local_direction[j]
+            exit_price[k] = local_price[j]
+            reason[k] = local_reason[j]
+            k += 1
+            cursor = max(local_exit[j] + 1, e + cooldown)
+            j += 1
+            continue
+
+        # Replay sequentially; an unfinished shard trade is replayed from its own entry
+        start = max(e, cursor)
+        sync_at_start = e < cursor
+        i = start
+        while i < n:
+            side = signals[i]
+            if side == 0:
+                i += 1
+                continue
+            if is_local[i] and (i > start or sync_at_start):
+                break
+            entry = close[i]
+            if side > 0:
+                sl = entry * (1 - stop_loss_pct)
+                tp = entry * (1 + take_profit_pct)
+            else:
+                sl = entry * (1 + stop_loss_pct)
+                tp = entry * (1 - take_profit_pct)
+            exit_at, why, price = _first_touch(i + 1, side, sl, tp, open_, high, low, close, tie)
+            if exit_at < 0:
+                exit_at, why, price = n - 1, EXIT_END, close[n - 1]
+            entry_index[k] = i
+            exit_index[k] = exit_at
+            direction[k] = side
+            exit_price[k] = price
+            reason[k] = why
+            k += 1
+            i = max(exit_at + 1, i + cooldown)
+        resumed_bars += min(i, n) - start
+        cursor = i
+        while j < m and local_entry[j] < i:
+            j += 1
+
+    return entry_index[:k], exit_index[:k], direction[:k], exit_price[:k], reason[:k], resumed_bars
+
+
+def shard_bounds(n_bars, n_shards):
+    """Start/end bar of n_shards contiguous, nearly equal time ranges"""
+    edges = np.linspace(0, n_bars, n_shards + 1).astype(np.int64)
+    return [(int(start), int(end)) for start, end in zip(edges[:-1], edges[1:]) if end > start]
+
+
+def run_backtest_sharded(strategy, data, n_shards=None, warmup_bars=None, n_workers=None, risk_manager=None,
+                         volume=None, commission=0.0, tie_policy='stop_loss'):
+    """
+    run_backtest split into time ranges processed in parallel. Every shard
+    computes its signals with warmup_bars of history in front (default: the
+    strategy's warmup_bars attribute or DEFAULT_WARMUP_BARS) and simulates its
+    own trades starting flat; the boundaries are then reconciled by replaying
+    only the bars where a shard's start state differs from the sequential run.
+    Same result as run_backtest as long as warmup_bars covers the indicators.
+    """
+    started = time.perf_counter()
+    risk_manager = risk_manager or strategy.risk_manager
+    n_workers = max(1, n_workers or multiprocessing.cpu_count())
+    warmup_bars = warmup_bars if warmup_bars is not None else getattr(strategy, 'warmup_bars', DEFAULT_WARMUP_BARS)
+    bounds = shard_bounds(len(data), n_shards or n_workers)
+    tie = TIE_POLICIES[tie_policy]
+
+    # Live data sources (MT5 connections) don't cross process boundaries
+    worker_strategy = copy.copy(strategy)
+    worker_strategy.data_source = None
+    jobs = [(worker_strategy, data.iloc[max(0, start - warmup_bars):end], start, start - max(0, start - warmup_bars),
+             end == len(data), tie) for start, end in bounds]
+    if n_workers == 1 or len(jobs) == 1:
+        shards = [_run_shard(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(jobs))) as pool:
+            shards = list(pool.map(_run_shard, *zip(*jobs)))
+
+    signals = np.concatenate([shard[0] for shard in shards])
+    open_, high, low, close = (data[column].to_numpy(dtype=np.float64) for column in ('open', 'high', 'low', 'close'))
+    local = [np.concatenate([shard[field] for shard in shards]) for field in range(1, 7)]
+    entry_index, exit_index, direction, exit_price, reason, resumed_bars = _reconcile(
+        signals, open_, high, low, close, strategy.stop_loss_pct, strategy.take_profit_pct,
+        cooldown_bars(strategy, strategy.timeframe), tie, *local
+    )
+
+    result = backtest_report(strategy, data, close, entry_index, exit_index, direction, exit_price, reason,
+                             risk_manager, volume, commission, started)
+    result['stats'].update({'shards': len(bounds), 'warmup_bars': int(warmup_bars), 'resumed_bars': int(resumed_bars),
+                            'seconds': time.perf_counter() - started})
+    logging.info(f"Sharded backtest: {len(bounds)} shards, {resumed_bars} bars replayed at the boundaries")
+    return result
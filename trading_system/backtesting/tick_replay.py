@@ -0,0 +1,263 @@
+import logging
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from numba import njit
+
+TICK_DTYPE = np.dtype([('time', '<i8'), ('bid', '<f8'), ('ask', '<f8')])
+
+CLOSE_STRATEGY, CLOSE_STOP_LOSS, CLOSE_TAKE_PROFIT, CLOSE_END = 0, 1, 2, 3
+CLOSE_REASONS = {CLOSE_STRATEGY: 'strategy', CLOSE_STOP_LOSS: 'stop_loss', CLOSE_TAKE_PROFIT: 'take_profit',
+                 CLOSE_END: 'end'}
+
+# Replay state carried from batch to batch (float and int64 parts)
+SIDE, ENTRY_PRICE, STOP_LOSS, TAKE_PROFIT, PENDING, PENDING_SIDE, PENDING_SL, PENDING_TP, TRADE_OPEN, BALANCE = \
+    range(10)
+ENTRY_TIME, FILL_TIME = range(2)
+PENDING_NONE, PENDING_OPEN, PENDING_CLOSE = 0, 1, 2
+
+
+def write_tick_file(ticks, path):
+    """
+    Store recorded ticks (a DataFrame with time/time_msc, bid, ask as returned by
+    copy_ticks_range) as a flat .npy of (time ns, bid, ask) records for open_tick_file.
+    """
+    if 'time_msc' in ticks.columns:
+        times = ticks['time_msc'].to_numpy(dtype=np.int64) * 1_000_000
+    elif np.issubdtype(ticks['time'].dtype, np.number):
+        times = (ticks['time'].to_numpy(dtype=np.float64) * 1e9).astype(np.int64)
+    else:
+        times = pd.to_datetime(ticks['time']).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    records = np.empty(len(ticks), dtype=TICK_DTYPE)
+    records['time'] = times
+    records['bid'] = ticks['bid'].to_numpy(dtype=np.float64)
+    records['ask'] = ticks['ask'].to_numpy(dtype=np.float64)
+    records = records[np.argsort(records['time'], kind='stable')]
+    np.save(path, records)
+    return path
+
+
+def open_tick_file(path):
+    """Memory-map a tick file written by write_tick_file; nothing is read until a batch is used"""
+    return np.load(path, mmap_mode='r')
+
+
+@njit(cache=True)
+def _close(state, clock, price, t, reason, volume, contract_size, commission, out, k):
+    side = state[SIDE]
+    profit = side * (price - state[ENTRY_PRICE]) * volume * contract_size
+    profit -= commission * price * volume * contract_size
+    state[BALANCE] += profit
+    out_time, out_price, out_info = out
+    out_time[k, 0] = clock[ENTRY_TIME]
+    out_time[k, 1] = t
+    out_price[k, 0] = state[ENTRY_PRICE]
+    out_price[k, 1] = price
+    # The trade's P&L also carries the commission paid on entry
+    out_price[k, 2] = profit - commission * state[ENTRY_PRICE] * volume * contract_size
+    out_price[k, 3] = state[BALANCE]
+    out_info[k, 0] = np.int8(side)
+    out_info[k, 1] = reason
+    state[SIDE] = 0
+    state[PENDING] = PENDING_NONE
+    return k + 1
+
+
+@njit(cache=True)
+def _open(state, clock, side, price, t, volume, contract_size, commission):
+    state[SIDE] = side
+    state[ENTRY_PRICE] = price
+    state[STOP_LOSS] = state[PENDING_SL]
+    state[TAKE_PROFIT] = state[PENDING_TP]
+    state[PENDING] = PENDING_NONE
+    state[BALANCE] -= commission * price * volume * contract_size
+    clock[ENTRY_TIME] = t
+
+
+@njit(cache=True)
+def _replay(times, bid, ask, first, window_ns, window_size, threshold, exit_threshold, stop_loss_pct,
+            take_profit_pct, min_stop_distance, point, volume, contract_size, commission, latency_ns, state, clock):
+    """
+    HighFrequencyStrategy.apply for every tick from first on; ticks before first
+    are history only. Per tick: pending orders whose latency has elapsed fill at
+    this tick's ask (buys) or bid (sells), the broker checks SL/TP, then the
+    strategy computes the z-score of the last tick return against the last
+    window_size returns (ticks of the last window_ns), opens on |z| > threshold
+    and closes once the mid has moved exit_threshold from the fill price.
+    """
+    n = len(times)
+    capacity = n - first + 1
+    out_time = np.empty((capacity, 2), dtype=np.int64)
+    out_price = np.empty((capacity, 4))
+    out_info = np.empty((capacity, 2), dtype=np.int8)
+    out = (out_time, out_price, out_info)
+    k = 0
+    lo = 0
+    returns = np.empty(window_size)
+
+    for i in range(first, n):
+        t = times[i]
+        b = bid[i]
+        a = ask[i]
+
+        if state[PENDING] == PENDING_OPEN and clock[FILL_TIME] <= t:
+            side = state[PENDING_SIDE]
+            _open(state, clock, side, a if side > 0 else b, t, volume, contract_size, commission)
+        elif state[PENDING] == PENDING_CLOSE and clock[FILL_TIME] <= t:
+            k = _close(state, clock, b if state[SIDE] > 0 else a, t, CLOSE_STRATEGY, volume, contract_size,
+                       commission, out, k)
+
+        if state[SIDE] != 0:
+            if state[SIDE] > 0:
+                if b <= state[STOP_LOSS]:
+                    k = _close(state, clock, b, t, CLOSE_STOP_LOSS, volume, contract_size, commission, out, k)
+                elif b >= state[TAKE_PROFIT]:
+                    k = _close(state, clock, b, t, CLOSE_TAKE_PROFIT, volume, contract_size, commission, out, k)
+            else:
+                if a >= state[STOP_LOSS]:
+                    k = _close(state, clock, a, t, CLOSE_STOP_LOSS, volume, contract_size, commission, out, k)
+                elif a <= state[TAKE_PROFIT]:
+                    k = _close(state, clock, a, t, CLOSE_TAKE_PROFIT, volume, contract_size, commission, out, k)
+
+        while times[lo] < t - window_ns:
+            lo += 1
+        count = i + 1 - lo
+        if count < window_size:
+            continue
+
+        mid = (a + b) / 2
+        m = min(window_size, count - 1)
+        if m >= 2:
+            mean = 0.0
+            for j in range(m):
+                previous = (ask[i - m + j] + bid[i - m + j]) / 2
+                returns[j] = ((ask[i - m + j + 1] + bid[i - m + j + 1]) / 2) / previous - 1
+                mean += returns[j]
+            mean /= m
+            variance = 0.0
+            for j in range(m):
+                variance += (returns[j] - mean) ** 2
+            std = np.sqrt(variance / (m - 1))
+            z = (returns[m - 1] - mean) / std if std != 0 else 0.0
+
+            # One position and one order in flight at a time
+            idle = state[SIDE] == 0 and state[PENDING] == PENDING_NONE
+            if state[TRADE_OPEN] == 0 and idle and (z > threshold or z < -threshold):
+                side = -1.0 if z > threshold else 1.0
+                spread = a - b
+                stop_distance = max(mid * stop_loss_pct, min_stop_distance + spread)
+                target_distance = max(mid * take_profit_pct, min_stop_distance + spread)
+                state[PENDING_SL] = np.round((mid - side * stop_distance) / point) * point
+                state[PENDING_TP] = np.round((mid + side * target_distance) / point) * point
+                state[PENDING_SIDE] = side
+                state[TRADE_OPEN] = 1
+                if latency_ns == 0:
+                    _open(state, clock, side, a if side > 0 else b, t, volume, contract_size, commission)
+                else:
+                    state[PENDING] = PENDING_OPEN
+                    clock[FILL_TIME] = t + latency_ns
+
+        # manage_positions
+        if state[SIDE] != 0 and state[PENDING] != PENDING_CLOSE:
+            move = state[SIDE] * (mid - state[ENTRY_PRICE]) / state[ENTRY_PRICE]
+            if abs(move) >= exit_threshold:
+                state[TRADE_OPEN] = 0
+                if latency_ns == 0:
+                    k = _close(state, clock, b if state[SIDE] > 0 else a, t, CLOSE_STRATEGY, volume, contract_size,
+                               commission, out, k)
+                else:
+                    state[PENDING] = PENDING_CLOSE
+                    clock[FILL_TIME] = t + latency_ns
+        elif state[SIDE] == 0 and state[PENDING] != PENDING_OPEN:
+            state[TRADE_OPEN] = 0
+
+    return out_time[:k], out_price[:k], out_info[:k]
+
+
+def _as_records(ticks):
+    if isinstance(ticks, str):
+        return open_tick_file(ticks)
+    if isinstance(ticks, pd.DataFrame):
+        records = np.empty(len(ticks), dtype=TICK_DTYPE)
+        frame = ticks.reset_index() if 'time' not in ticks.columns else ticks
+        records['time'] = pd.to_datetime(frame['time']).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        records['bid'] = frame['bid'].to_numpy(dtype=np.float64)
+        records['ask'] = frame['ask'].to_numpy(dtype=np.float64)
+        return records
+    return ticks
+
+
+def replay_ticks(strategy, ticks, latency_ms=0.0, point=0.01, stops_level_points=0, contract_size=1.0,
+                 commission=0.0, batch_size=1_000_000, tick_window=timedelta(seconds=60)):
+    """
+    Replay recorded ticks (a tick file path, its memory-mapped records or a
+    DataFrame with time/bid/ask) through a HighFrequencyStrategy's z-score
+    rules. The file is consumed batch_size ticks at a time with the replay
+    state carried over, so weeks of ticks never need to be in memory at once.
+    Orders fill latency_ms after the decision at that tick's bid/ask; with 0
+    they fill on the deciding tick like SimulatedDataSource does.
+    """
+    started = time.perf_counter()
+    records = _as_records(ticks)
+    n_ticks = len(records)
+    history = strategy.window_size + 1
+
+    state = np.zeros(10)
+    state[BALANCE] = strategy.initial_balance
+    clock = np.zeros(2, dtype=np.int64)
+    parameters = (
+        int(tick_window.total_seconds() * 1e9), int(strategy.window_size), float(strategy.threshold),
+        float(strategy.exit_threshold), float(strategy.stop_loss_pct), float(strategy.take_profit_pct),
+        stops_level_points * point, float(point), float(strategy.min_volume), float(contract_size),
+        float(commission), int(latency_ms * 1e6)
+    )
+
+    chunks = []
+    for start in range(0, n_ticks, batch_size):
+        # The previous window_size + 1 ticks come along as history for the first z-scores
+        first = min(start, history)
+        batch = np.asarray(records[start - first:start + batch_size])
+        chunks.append(_replay(np.ascontiguousarray(batch['time']), np.ascontiguousarray(batch['bid']),
+                              np.ascontiguousarray(batch['ask']), first, *parameters, state, clock))
+
+    if n_ticks and state[SIDE] != 0:
+        last = records[n_ticks - 1]
+        out = (np.empty((1, 2), dtype=np.int64), np.empty((1, 4)), np.empty((1, 2), dtype=np.int8))
+        price = last['bid'] if state[SIDE] > 0 else last['ask']
+        _close(state, clock, float(price), int(last['time']), CLOSE_END, float(strategy.min_volume),
+               float(contract_size), float(commission), out, 0)
+        chunks.append(out)
+
+    out_time = np.concatenate([chunk[0] for chunk in chunks]) if chunks else np.empty((0, 2), dtype=np.int64)
+    out_price = np.concatenate([chunk[1] for chunk in chunks]) if chunks else np.empty((0, 4))
+    out_info = np.concatenate([chunk[2] for chunk in chunks]) if chunks else np.empty((0, 2), dtype=np.int8)
+    trades = pd.DataFrame({
+        'entry_time': pd.to_datetime(out_time[:, 0]),
+        'exit_time': pd.to_datetime(out_time[:, 1]),
+        'type': np.where(out_info[:, 0] > 0, 'BUY', 'SELL'),
+        'entry_price': out_price[:, 0],
+        'exit_price': out_price[:, 1],
+        'volume': float(strategy.min_volume),
+        'profit': out_price[:, 2],
+        'exit_reason': [CLOSE_REASONS[r] for r in out_info[:, 1]],
+        'balance': out_price[:, 3]
+    })
+
+    seconds = time.perf_counter() - started
+    profit = trades['profit'].to_numpy()
+    stats = {
+        'trades': int(len(trades)),
+        'win_rate': float((profit > 0).mean()) if len(profit) else 0.0,
+        'total_profit': float(profit.sum()),
+        'final_balance': float(state[BALANCE]),
+        'exits': trades['exit_reason'].value_counts().to_dict(),
+        'ticks': int(n_ticks),
+        'batches': len(range(0, n_ticks, batch_size)),
+        'seconds': seconds,
+        'ticks_per_second': n_ticks / seconds if seconds > 0 else float('inf')
+    }
+    logging.info(f"Tick replay {type(strategy).__name__}: {stats['trades']} trades over {n_ticks} ticks "
+                 f"in {seconds:.2f}s ({stats['ticks_per_second']:,.0f} ticks/s)")
+    return {'balance': stats['final_balance'], 'trades': trades, 'stats': stats}
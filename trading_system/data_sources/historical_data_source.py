@@ -3,12 +3,15 @@ import pandas as pd
 from datetime import datetime
 import pytz
 import logging
+from .rate_cache import RateCache
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class HistoricalDataSource:
-    def __init__(self):
+    def __init__(self, cache=None):
         self.initialized = False
+        # Optional RateCache: days already on disk are served without touching MT5
+        self.cache = cache
 
     def initialize(self):
         if not mt5.initialize():
@@ -18,10 +21,16 @@ class HistoricalDataSource:
         logging.info("MetaTrader5 initialized successfully.")
         return True
 
-    def get_data(self, symbol, timeframe, start_date, end_date):
+    def copy_rates(self, symbol, mt5_timeframe, start_date, end_date):
         if not self.initialized:
             if not self.initialize():
                 return None
+        return mt5.copy_rates_range(symbol, mt5_timeframe, start_date, end_date)
+
+    def get_data(self, symbol, timeframe, start_date, end_date):
+        if self.cache is None and not self.initialized:
+            if not self.initialize():
+                return None
 
         # Convert timeframe string to MT5 timeframe
         mt5_timeframe = self.get_mt5_timeframe(timeframe)
@@ -29,7 +38,11 @@ class HistoricalDataSource:
         logging.info(f"Fetching historical data for {symbol} with timeframe {timeframe} from {start_date} to {end_date}")
 
         try:
-            rates = mt5.copy_rates_range(symbol, mt5_timeframe, start_date, end_date)
+            if self.cache is not None:
+                rates = self.cache.get(symbol, timeframe.lower(), start_date, end_date,
+                                       lambda start, end: self.copy_rates(symbol, mt5_timeframe, start, end))
+            else:
+                rates = mt5.copy_rates_range(symbol, mt5_timeframe, start_date, end_date)
             
             if rates is None or len(rates) == 0:
                 logging.warning(f"No data available for {symbol} in the specified range.")
@@ -0,0 +1,107 @@
+import os
+import logging
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CACHE_DIR = 'rate_cache'
+SECONDS_PER_DAY = 86400
+
+
+class RateCache:
+    """
+    Read-through cache for MT5 rate arrays.
+
+    Each (symbol, timeframe, day) is stored as one .npy file holding the structured
+    array returned by copy_rates_range. Queries load the cached days, fetch only the
+    missing day ranges and stitch everything back into a single array. Days that are
+    not over yet are never written, so the current day is always refetched.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR):
+        self.root = root
+        self.hits = 0
+        self.misses = 0
+
+    def _day_path(self, symbol, timeframe, day):
+        return os.path.join(self.root, symbol, str(timeframe), f"{day.strftime('%Y-%m-%d')}.npy")
+
+    @staticmethod
+    def _to_timestamp(value):
+        """Naive datetimes are treated as UTC, like the epoch seconds MT5 returns"""
+        value = pd.Timestamp(value)
+        if value.tzinfo is None:
+            value = value.tz_localize('UTC')
+        return value.tz_convert('UTC')
+
+    def get(self, symbol, timeframe, start_date, end_date, fetch):
+        """
+        Return the rates between start_date and end_date (inclusive), calling
+        fetch(start_datetime, end_datetime) only for days not in the cache.
+        fetch must return an MT5 rates array, or None if the request failed.
+        If any missing range cannot be fetched the result would have a hole, so
+        None is returned (days fetched successfully are still cached).
+        """
+        start = self._to_timestamp(start_date)
+        end = self._to_timestamp(end_date)
+        days = pd.date_range(start.normalize(), end.normalize(), freq='D')
+
+        cached = {}
+        missing = []
+        for day in days:
+            path = self._day_path(symbol, timeframe, day)
+            if os.path.exists(path):
+                cached[day] = np.load(path)
+                self.hits += 1
+            else:
+                missing.append(day)
+                self.misses += 1
+
+        failed = []
+        for range_start, range_end in self._contiguous_ranges(missing):
+            # Always fetch whole days so a stored day is never partial
+            fetch_end = range_end + timedelta(days=1) - timedelta(seconds=1)
+            rates = fetch(range_start.to_pydatetime(), fetch_end.to_pydatetime())
+            if rates is None:
+                failed.append(f"{range_start.date()} to {range_end.date()}")
+                continue
+            cached.update(self._store_days(symbol, timeframe, rates, range_start, range_end))
+
+        if failed:
+            logging.error(f"Fetch failed for {symbol} {timeframe} {', '.join(failed)}; "
+                          f"not returning a partial range")
+            return None
+        if not cached:
+            return None
+        rates = np.concatenate([cached[day] for day in sorted(cached)])
+        start_seconds = int(start.timestamp())
+        end_seconds = int(end.timestamp())
+        return rates[(rates['time'] >= start_seconds) & (rates['time'] <= end_seconds)]
+
+    @staticmethod
+    def _contiguous_ranges(days):
+        ranges = []
+        for day in days:
+            if ranges and day - ranges[-1][1] == timedelta(days=1):
+                ranges[-1][1] = day
+            else:
+                ranges.append([day, day])
+        return ranges
+
+    def _store_days(self, symbol, timeframe, rates, range_start, range_end):
+        """Split a fetched array by UTC day; days with no bars are stored empty"""
+        stored = {}
+        now = datetime.now(timezone.utc)
+        day_index = rates['time'] // SECONDS_PER_DAY if len(rates) else np.array([], dtype=np.int64)
+        for day in pd.date_range(range_start, range_end, freq='D'):
+            day_rates = rates[day_index == int(day.timestamp()) // SECONDS_PER_DAY]
+            stored[day] = day_rates
+            if day + timedelta(days=1) > now:
+                continue
+            path = self._day_path(symbol, timeframe, day)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + '.tmp.npy'
+            np.save(tmp_path, day_rates)
+            os.replace(tmp_path, path)
+        return stored
@@ -0,0 +1,524 @@
+import logging
+import sys
+import time
+import types
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from .data_source import DataSource
+from ..backtesting.engine import EXIT_END, EXIT_REASONS, TIE_POLICIES, _bar_exit
+from ..utils.time_utils import TimeFrameConverter
+
+# Values used by the MetaTrader5 package, so results compare equal to mt5.* constants
+MT5_CONSTANTS = {
+    'TRADE_RETCODE_DONE': 10009,
+    'TRADE_RETCODE_INVALID_VOLUME': 10014,
+    'TRADE_RETCODE_INVALID_STOPS': 10016,
+    'TRADE_RETCODE_NO_MONEY': 10019,
+    'TRADE_RETCODE_POSITION_CLOSED': 10036,
+    'ORDER_TYPE_BUY': 0,
+    'ORDER_TYPE_SELL': 1,
+    'POSITION_TYPE_BUY': 0,
+    'POSITION_TYPE_SELL': 1,
+    'TRADE_ACTION_DEAL': 1,
+    'ORDER_TIME_GTC': 0,
+    'ORDER_FILLING_FOK': 0,
+    'ORDER_FILLING_IOC': 1,
+    'COPY_TICKS_ALL': -1,
+    'TIMEFRAME_M1': 1,
+    'TIMEFRAME_M5': 5,
+    'TIMEFRAME_M15': 15,
+    'TIMEFRAME_M30': 30,
+    'TIMEFRAME_H1': 16385,
+    'TIMEFRAME_H4': 16388,
+    'TIMEFRAME_D1': 16408,
+    'TIMEFRAME_W1': 32769,
+    'TIMEFRAME_MN1': 49153,
+}
+
+SymbolInfo = namedtuple('SymbolInfo', 'name point digits spread trade_stops_level volume_min volume_max '
+                                      'volume_step trade_contract_size')
+Tick = namedtuple('Tick', 'time bid ask last')
+TradePosition = namedtuple('TradePosition', 'ticket time type magic volume price_open sl tp price_current '
+                                            'profit symbol comment')
+OrderSendResult = namedtuple('OrderSendResult', 'retcode deal order volume price bid ask comment')
+
+
+class ReplayFinished(BaseException):
+    """Raised when the replay runs out of data. Strategies catch Exception in
+    their loops, so this derives from BaseException to end apply()."""
+
+
+def install_mt5_fallback():
+    """
+    Register a constants-only MetaTrader5 module when the real package is not
+    installed (Linux), so strategy modules can be imported for simulation.
+    The real package is never replaced.
+    """
+    try:
+        import MetaTrader5  # noqa: F401
+        return False
+    except ImportError:
+        module = types.ModuleType('MetaTrader5')
+        module.__dict__.update(MT5_CONSTANTS)
+        module.initialize = lambda *args, **kwargs: False
+        module.shutdown = lambda: None
+        module.last_error = lambda: (-1, 'MetaTrader5 is not available (simulation only)')
+        sys.modules['MetaTrader5'] = module
+        logging.info("MetaTrader5 not installed: using simulation constants")
+        return True
+
+
+class SimulatedMT5:
+    """The part of the mt5 API strategies reach through data_source.mt5"""
+
+    def __init__(self, source):
+        self.__dict__.update(MT5_CONSTANTS)
+        self._source = source
+
+    def symbol_info(self, symbol):
+        return self._source.symbol_info(symbol)
+
+    def symbol_info_tick(self, symbol):
+        bid, ask = self._source.quote(symbol)
+        return Tick(self._source.now(), bid, ask, bid)
+
+    def positions_get(self, symbol=None, ticket=None):
+        positions = self._source.get_positions(symbol)
+        if ticket is not None:
+            positions = [p for p in positions if p.ticket == ticket]
+        return tuple(positions)
+
+
+class _SimulatedTime:
+    """Stand-in for the time module: sleep() advances the replay instead of waiting"""
+
+    def __init__(self, source):
+        self._source = source
+
+    def sleep(self, seconds):
+        self._source.advance(seconds)
+
+    def time(self):
+        return self._source.now().replace(tzinfo=timezone.utc).timestamp()
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+def _simulated_datetime(source):
+    class SimulatedDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return source.now(tz)
+    return SimulatedDatetime
+
+
+@contextmanager
+def simulated_clock(source, *modules):
+    """Point time.sleep and datetime.now in the given modules at the replay clock"""
+    replacements = {'time': _SimulatedTime(source), 'datetime': _simulated_datetime(source)}
+    saved = []
+    for module in modules:
+        for name, replacement in replacements.items():
+            original = module.__dict__.get(name)
+            if original is time or original is datetime:
+                saved.append((module, name, original))
+                setattr(module, name, replacement)
+    try:
+        yield source
+    finally:
+        for module, name, original in saved:
+            setattr(module, name, original)
+
+
+class SimulatedDataSource(DataSource):
+    """
+    Paper broker that replays stored bars (or ticks) as fast as the strategy
+    consumes them. The clock only moves when the strategy sleeps (bars) or asks
+    for ticks, so apply()-style strategies run unchanged. Bar prices are bids;
+    the ask is bid + spread. Orders fill at the current ask/bid, stop levels are
+    validated like MT5, and SL/TP are triggered by every bar's high/low (or by
+    every tick) between two clock steps; tie_policy decides bars that touch
+    both (see backtesting.engine.TIE_POLICIES).
+    """
+
+    def __init__(self, bars=None, ticks=None, symbol='BTCUSD', timeframe='1m', point=0.01, spread_points=None,
+                 stops_level_points=0, initial_balance=10000.0, contract_size=1.0, commission=0.0,
+                 volume_min=0.01, volume_max=100.0, volume_step=0.01, lookback=1000, start=None,
+                 tick_window=timedelta(seconds=60), tie_policy='stop_loss'):
+        if bars is None and ticks is None:
+            raise ValueError("SimulatedDataSource needs bars or ticks to replay")
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.point = point
+        self.spread_points = spread_points
+        self.stops_level_points = stops_level_points
+        self.contract_size = contract_size
+        self.commission = commission
+        self.volume_min = volume_min
+        self.volume_max = volume_max
+        self.volume_step = volume_step
+        self.lookback = lookback
+        self.tick_window = tick_window
+        self._tie = TIE_POLICIES[tie_policy]
+        self.mt5 = SimulatedMT5(self)
+
+        self.initial_balance = initial_balance
+        self.balance = initial_balance
+        self.positions = {}
+        self.history = []
+        self.rejected = Counter()
+        self._next_ticket = 1
+        self._frames = {}
+        self.bar_minutes = TimeFrameConverter().to_minutes(timeframe)
+
+        self.bars = self._prepare_bars(bars) if bars is not None else None
+        self.ticks = self._prepare_ticks(ticks) if ticks is not None else None
+        self._bar_position = 0
+        self._tick_position = 0
+
+        if self.bars is not None:
+            self._bar_close = (self.bars.index + pd.Timedelta(minutes=self.bar_minutes)).to_numpy()
+            self._bar_open = self.bars['open'].to_numpy(dtype=np.float64)
+            self._bar_high = self.bars['high'].to_numpy(dtype=np.float64)
+            self._bar_low = self.bars['low'].to_numpy(dtype=np.float64)
+            self._bar_bid = self.bars['close'].to_numpy(dtype=np.float64)
+            self._bar_spread = self._spreads(self.bars)
+        if self.ticks is not None:
+            self._tick_time = self.ticks.index.to_numpy()
+            self._tick_bid = self.ticks['bid'].to_numpy(dtype=np.float64)
+            self._tick_ask = self.ticks['ask'].to_numpy(dtype=np.float64)
+
+        ends = ([self._bar_close[-1]] if self.bars is not None else []) + \
+               ([self._tick_time[-1]] if self.ticks is not None else [])
+        self.end_time = max(ends)
+        self.clock = self._first_clock(start)
+        self._catch_up(self.clock)
+
+    @staticmethod
+    def _to_datetime64(value):
+        value = pd.Timestamp(value)
+        if value.tz is not None:
+            value = value.tz_convert('UTC').tz_localize(None)
+        return value.to_datetime64()
+
+    @staticmethod
+    def _naive_utc(index):
+        index = pd.DatetimeIndex(index)
+        return index.tz_convert('UTC').tz_localize(None) if index.tz is not None else index
+
+    def _prepare_bars(self, bars):
+        bars = bars.set_index('time') if 'time' in bars.columns else bars
+        bars = bars.copy()
+        bars.index = self._naive_utc(bars.index)
+        bars.index.name = 'time'
+        return bars.sort_index()
+
+    def _prepare_ticks(self, ticks):
+        ticks = ticks.set_index('time') if 'time' in ticks.columns else ticks
+        ticks = ticks.copy()
+        ticks.index = self._naive_utc(ticks.index)
+        ticks.index.name = 'time'
+        return ticks.sort_index()
+
+    def _spreads(self, bars):
+        if self.spread_points is not None or 'spread' not in bars.columns:
+            return np.full(len(bars), (self.spread_points or 0) * self.point)
+        return bars['spread'].to_numpy(dtype=np.float64) * self.point
+
+    def _first_clock(self, start):
+        if start is not None:
+            return self._to_datetime64(start)
+        if self.bars is not None:
+            # Enough closed bars for the strategy's first get_data call
+            return self._bar_close[min(self.lookback, len(self._bar_close)) - 1]
+        return self._tick_time[0]
+
+    # --- Clock ---------------------------------------------------------------
+
+    def initialize(self):
+        return True
+
+    def now(self, tz=None):
+        moment = pd.Timestamp(self.clock).to_pydatetime()
+        return moment.replace(tzinfo=timezone.utc).astimezone(tz) if tz else moment
+
+    def advance(self, seconds):
+        target = self.clock + np.timedelta64(int(seconds * 1e6), 'us')
+        self._catch_up(target)
+        self.clock = target
+        if self.clock > self.end_time:
+            raise ReplayFinished()
+
+    def _catch_up(self, target):
+        """Feed every bar closed and every tick received up to target to the open positions"""
+        if self.bars is not None:
+            end = np.searchsorted(self._bar_close, target, side='right')
+            for i in range(self._bar_position, end):
+                if self.positions and self.ticks is None:
+                    self._check_bar(i)
+            self._bar_position = max(self._bar_position, end)
+        if self.ticks is not None:
+            end = np.searchsorted(self._tick_time, target, side='right')
+            for i in range(self._tick_position, end):
+                if self.positions:
+                    self._check_tick(i)
+            self._tick_position = max(self._tick_position, end)
+
+    # --- Market data ---------------------------------------------------------
+
+    def _frame(self, timeframe):
+        minutes = TimeFrameConverter().to_minutes(timeframe) if timeframe else self.bar_minutes
+        if minutes == self.bar_minutes:
+            return self.bars, self._bar_close
+        if minutes not in self._frames:
+            aggregations = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last'}
+            aggregations.update({column: 'sum' for column in ('tick_volume', 'real_volume', 'volume')
+                                 if column in self.bars.columns})
+            if 'spread' in self.bars.columns:
+                aggregations['spread'] = 'max'
+            frame = self.bars.resample(f'{minutes}min').agg(aggregations).dropna(subset=['close'])
+            self._frames[minutes] = (frame, (frame.index + pd.Timedelta(minutes=minutes)).to_numpy())
+        return self._frames[minutes]
+
+    def get_data(self, symbol, timeframe=None, start_date=None, end_date=None):
+        """Closed bars up to the clock: the requested range, or the last `lookback` bars"""
+        frame, close_times = self._frame(timeframe)
+        end = np.searchsorted(close_times, self.clock, side='right')
+        if start_date is not None or end_date is not None:
+            start = frame.index.searchsorted(self._to_datetime64(start_date)) if start_date is not None else 0
+            if end_date is not None:
+                end = min(end, frame.index.searchsorted(self._to_datetime64(end_date), side='right'))
+        else:
+            start = max(0, end - self.lookback)
+        return frame.iloc[start:end].copy()
+
+    def get_tick_data(self, symbol):
+        """Deliver the next tick and return the ticks of the last tick_window"""
+        if self.ticks is None:
+            return pd.DataFrame()
+        if self._tick_position >= len(self._tick_time):
+            raise ReplayFinished()
+        target = self._tick_time[self._tick_position]
+        self._catch_up(target)
+        self.clock = max(self.clock, target)
+        start = np.searchsorted(self._tick_time, self.clock - np.timedelta64(self.tick_window), side='left')
+        return self.ticks.iloc[start:self._tick_position].copy()
+
+    def quote(self, symbol):
+        if self.ticks is not None and self._tick_position > 0:
+            i = self._tick_position - 1
+            return self._tick_bid[i], self._tick_ask[i]
+        i = max(self._bar_position - 1, 0)
+        return self._bar_bid[i], self._bar_bid[i] + self._bar_spread[i]
+
+    def symbol_info(self, symbol):
+        bid, ask = self.quote(symbol)
+        return SymbolInfo(symbol, self.point, int(round(-np.log10(self.point))), int(round((ask - bid) / self.point)),
+                          self.stops_level_points, self.volume_min, self.volume_max, self.volume_step,
+                          self.contract_size)
+
+    def get_current_spread(self, symbol):
+        bid, ask = self.quote(symbol)
+        return ask - bid
+
+    def normalize_price(self, price, symbol):
+        return round(price / self.point) * self.point
+
+    def get_min_stop_distance(self, symbol):
+        return self.stops_level_points * self.point
+
+    def get_account_balance(self):
+        return self.balance
+
+    def get_min_lot_size(self, symbol):
+        return self.volume_min
+
+    def get_max_lot_size(self, symbol):
+        return self.volume_max
+
+    def get_volume_step(self, symbol):
+        return self.volume_step
+
+    # --- Orders --------------------------------------------------------------
+
+    def _result(self, retcode, ticket=0, volume=0.0, price=0.0, comment=''):
+        bid, ask = self.quote(self.symbol)
+        if retcode != self.mt5.TRADE_RETCODE_DONE:
+            # Requests the real server would refuse are counted so they show up in the report
+            self.rejected[comment] += 1
+        return OrderSendResult(retcode, ticket, ticket, volume, price, bid, ask, comment)
+
+    def _open(self, symbol, side, volume, sl, tp, magic, comment):
+        bid, ask = self.quote(symbol)
+        price = ask if side == self.mt5.POSITION_TYPE_BUY else bid
+        steps = volume / self.volume_step
+        if volume < self.volume_min - 1e-12 or volume > self.volume_max + 1e-12 or abs(steps - round(steps)) > 1e-6:
+            return self._result(self.mt5.TRADE_RETCODE_INVALID_VOLUME, comment='Invalid volume')
+        if not self._valid_stops(side, bid, ask, sl, tp):
+            return self._result(self.mt5.TRADE_RETCODE_INVALID_STOPS, comment='Invalid stops')
+        if self.balance <= 0:
+            return self._result(self.mt5.TRADE_RETCODE_NO_MONEY, comment='No money')
+
+        ticket = self._next_ticket
+        self._next_ticket += 1
+        self.positions[ticket] = {
+            'ticket': ticket, 'time': self.now(), 'type': side, 'magic': magic, 'volume': volume,
+            'price_open': price, 'sl': sl or 0.0, 'tp': tp or 0.0, 'symbol': symbol, 'comment': comment
+        }
+        self.balance -= self.commission * price * volume * self.contract_size
+        return self._result(self.mt5.TRADE_RETCODE_DONE, ticket, volume, price, 'Request executed')
+
+    def _valid_stops(self, side, bid, ask, sl, tp):
+        """MT5 rule: SL/TP on the right side and at least stops_level points from the closing price"""
+        level = self.stops_level_points * self.point
+        if side == self.mt5.POSITION_TYPE_BUY:
+            return (not sl or bid - sl >= level and sl < bid) and (not tp or tp - bid >= level and tp > bid)
+        return (not sl or sl - ask >= level and sl > ask) and (not tp or ask - tp >= level and tp < ask)
+
+    def buy_order(self, symbol, volume, price, sl, tp, deviation=10, magic=234000, comment="Buy Order"):
+        return self._open(symbol, self.mt5.POSITION_TYPE_BUY, volume, sl, tp, magic, comment)
+
+    def sell_order(self, symbol, volume, price, sl, tp, deviation=10, magic=234000, comment="Sell Order"):
+        return self._open(symbol, self.mt5.POSITION_TYPE_SELL, volume, sl, tp, magic, comment)
+
+    def _close(self, ticket, price, reason):
+        position = self.positions.pop(ticket)
+        direction = 1 if position['type'] == self.mt5.POSITION_TYPE_BUY else -1
+        profit = direction * (price - position['price_open']) * position['volume'] * self.contract_size
+        profit -= self.commission * price * position['volume'] * self.contract_size
+        self.balance += profit
+        self.history.append({
+            'ticket': ticket, 'symbol': position['symbol'],
+            'type': 'BUY' if direction > 0 else 'SELL', 'volume': position['volume'],
+            'entry_time': position['time'], 'exit_time': self.now(),
+            'entry_price': position['price_open'], 'exit_price': price,
+            'sl': position['sl'], 'tp': position['tp'], 'profit': profit,
+            'exit_reason': reason, 'balance': self.balance
+        })
+        return self._result(self.mt5.TRADE_RETCODE_DONE, ticket, position['volume'], price, 'Request executed')
+
+    def _market_close_price(self, position):
+        bid, ask = self.quote(position['symbol'])
+        return bid if position['type'] == self.mt5.POSITION_TYPE_BUY else ask
+
+    def close_position(self, ticket):
+        if ticket not in self.positions:
+            return False
+        return self._close(ticket, self._market_close_price(self.positions[ticket]), 'strategy')
+
+    def close_order(self, symbol, volume, price, close_type):
+        """Close `volume` of the positions opposite to close_type (OrderType.SELL closes BUYs)"""
+        side = self.mt5.POSITION_TYPE_BUY if getattr(close_type, 'value', close_type) == 'sell' \
+            else self.mt5.POSITION_TYPE_SELL
+        result = self._result(self.mt5.TRADE_RETCODE_POSITION_CLOSED, comment='No position to close')
+        for ticket in [t for t, p in self.positions.items() if p['symbol'] == symbol and p['type'] == side]:
+            if volume <= 0:
+                break
+            volume -= self.positions[ticket]['volume']
+            result = self._close(ticket, self._market_close_price(self.positions[ticket]), 'strategy')
+        return result
+
+    def get_positions(self, symbol=None):
+        positions = []
+        for p in self.positions.values():
+            if symbol is not None and p['symbol'] != symbol:
+                continue
+            current = self._market_close_price(p)
+            direction = 1 if p['type'] == self.mt5.POSITION_TYPE_BUY else -1
+            profit = direction * (current - p['price_open']) * p['volume'] * self.contract_size
+            positions.append(TradePosition(p['ticket'], p['time'], p['type'], p['magic'], p['volume'],
+                                           p['price_open'], p['sl'], p['tp'], current, profit, p['symbol'],
+                                           p['comment']))
+        return positions
+
+    # --- Fills ---------------------------------------------------------------
+
+    def _check_bar(self, i):
+        spread = self._bar_spread[i]
+        bar = self._bar_open[i], self._bar_high[i], self._bar_low[i], self._bar_bid[i]
+        for ticket, p in list(self.positions.items()):
+            side = 1 if p['type'] == self.mt5.POSITION_TYPE_BUY else -1
+            # Longs close on the bid, shorts on the ask
+            open_, high, low, close = bar if side > 0 else (price + spread for price in bar)
+            why, price = _bar_exit(side, p['sl'] or np.nan, p['tp'] or np.nan, open_, high, low, close, self._tie)
+            if why != EXIT_END:
+                self._close_at(ticket, price, EXIT_REASONS[why], i)
+
+    def _close_at(self, ticket, price, reason, bar_index):
+        clock = self.clock
+        self.clock = max(clock, self._bar_close[bar_index])
+        self._close(ticket, price, reason)
+        self.clock = clock
+
+    def _check_tick(self, i):
+        bid, ask = self._tick_bid[i], self._tick_ask[i]
+        for ticket, p in list(self.positions.items()):
+            sl, tp = p['sl'], p['tp']
+            if p['type'] == self.mt5.POSITION_TYPE_BUY:
+                hit = 'stop_loss' if sl and bid <= sl else 'take_profit' if tp and bid >= tp else None
+                price = bid
+            else:
+                hit = 'stop_loss' if sl and ask >= sl else 'take_profit' if tp and ask <= tp else None
+                price = ask
+            if hit:
+                clock = self.clock
+                self.clock = max(clock, self._tick_time[i])
+                self._close(ticket, price, hit)
+                self.clock = clock
+
+    # --- Results -------------------------------------------------------------
+
+    def finish(self):
+        """Close whatever is still open at the last price"""
+        for ticket in list(self.positions):
+            self._close(ticket, self._market_close_price(self.positions[ticket]), 'end')
+
+    def report(self):
+        trades = pd.DataFrame(self.history)
+        profit = trades['profit'].to_numpy() if len(trades) else np.array([])
+        equity = np.concatenate([[self.initial_balance], trades['balance'].to_numpy()]) if len(trades) \
+            else np.array([self.initial_balance])
+        peak = np.maximum.accumulate(equity)
+        stats = {
+            'trades': int(len(trades)),
+            'win_rate': float((profit > 0).mean()) if len(profit) else 0.0,
+            'total_profit': float(profit.sum()),
+            'final_balance': float(self.balance),
+            'max_drawdown': float(((peak - equity) / peak).max()),
+            'exits': trades['exit_reason'].value_counts().to_dict() if len(trades) else {},
+            'rejected': dict(self.rejected)
+        }
+        return {'balance': self.balance, 'trades': trades, 'stats': stats}
+
+
+def run_simulation(strategy, quiet=True):
+    """
+    Run an unchanged apply()-style strategy against its SimulatedDataSource
+    until the replay ends. quiet silences the strategies' per-iteration logs;
+    refused orders are still counted in stats['rejected'].
+    """
+    source = strategy.data_source
+    modules = [sys.modules[cls.__module__] for cls in type(strategy).__mro__ if cls.__module__ in sys.modules]
+    started = time.perf_counter()
+    previous_disable = logging.root.manager.disable
+    if quiet:
+        logging.disable(logging.ERROR)
+    try:
+        with simulated_clock(source, *modules):
+            strategy.apply()
+    except ReplayFinished:
+        pass
+    finally:
+        logging.disable(previous_disable)
+    source.finish()
+    result = source.report()
+    result['stats']['seconds'] = time.perf_counter() - started
+    logging.info(f"Simulation {type(strategy).__name__}: {result['stats']['trades']} trades, "
+                 f"final balance {result['balance']:.2f} in {result['stats']['seconds']:.1f}s")
+    return result
@@ -3,6 +3,7 @@ import time
 import pandas as pd
 import numpy as np
 from .strategy import Strategy
+from ..utils.indicator_cache import Indicators
 from order_type import OrderType
 from collections import deque
 from datetime import datetime, timedelta
@@ -27,6 +28,8 @@ class ChartPatternStrategy(Strategy):
         self.stored_data = deque(maxlen=self.max_lookback + 50)
         logging.debug(f"min_volume initialized: {self.min_volume}")
         self.risk_per_trade = 0.01  # 1% risk per trade
+        self.stop_loss_pct = 0.01
+        self.take_profit_pct = 0.02
 
     def calculate_max_lookback(self):
         # Return the maximum lookback period used in any indicator or pattern detection
@@ -208,6 +211,39 @@ class ChartPatternStrategy(Strategy):
         self.consecutive_warnings = 0
         self.last_warning_time = None
 
+    def generate_signals(self, data):
+        """
+        Vectorized analyze_pre_trade for every bar (auto_trade, without the
+        warning/confirmation round). Patterns that peek at the next bar
+        (shift(-1)) are only known one bar later, so on the signal bar itself
+        they count as False, exactly like the last row in the live loop.
+        """
+        if 'volume' not in data.columns:
+            data = data.assign(volume=data['tick_volume'])
+        patterns = self.detect_patterns(data)
+        next_bar_patterns = ['head_and_shoulders', 'double_top', 'double_bottom']
+        known = patterns.copy()
+        known[next_bar_patterns] = False
+        bullish_now = known[['ascending_triangle', 'double_bottom', 'flag', 'cup_and_handle']].any(axis=1)
+        bearish_now = known[['descending_triangle', 'head_and_shoulders', 'double_top', 'wedge']].any(axis=1)
+        bullish = bullish_now & patterns['bullish'].shift(1, fill_value=False) & patterns['bullish'].shift(2, fill_value=False)
+        bearish = ~bullish & bearish_now & patterns['bearish'].shift(1, fill_value=False) & patterns['bearish'].shift(2, fill_value=False)
+
+        # Each confirmation adds one point; the persistent pattern itself is the first
+        close = Indicators(data['close'])
+        volume_up = data['volume'] > Indicators(data['volume']).sma(20)
+        short_ma = close.sma(10)
+        long_ma = close.sma(30)
+        rsi = close.rsi()
+        rsi_ok = (rsi > 30) & (rsi < 70)
+        macd, signal, _ = close.macd(adjust=False)
+
+        buy_strength = 1 + volume_up.astype(int) + (short_ma > long_ma).astype(int) + rsi_ok.astype(int) + (macd > signal).astype(int)
+        sell_strength = 1 + volume_up.astype(int) + (short_ma < long_ma).astype(int) + rsi_ok.astype(int) + (macd < signal).astype(int)
+
+        signals = np.where(bullish & (buy_strength >= 4), 1, np.where(bearish & (sell_strength >= 4), -1, 0))
+        return signals.astype(np.int8)
+
     def analyze_pre_trade(self, data, patterns):
         analysis = {
             'should_trade': False,
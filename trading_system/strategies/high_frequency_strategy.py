@@ -14,6 +14,9 @@ class HighFrequencyStrategy(Strategy):
         self.window_size = kwargs.get('window_size', 50)
         self.threshold = kwargs.get('threshold', 0.0001)
         self.min_volume = kwargs.get('min_volume', 0.01)
+        self.exit_threshold = kwargs.get('exit_threshold', 0.0002)  # 0.02% move closes the position
+        self.stop_loss_pct = kwargs.get('stop_loss_pct', 0.01)
+        self.take_profit_pct = kwargs.get('take_profit_pct', 0.01)
         logging.info(f"Initialized HighFrequencyStrategy for {symbol} with timeframe {timeframe}")
 
     def apply(self):
@@ -55,8 +58,8 @@ class HighFrequencyStrategy(Strategy):
         spread = self.data_source.get_current_spread(self.symbol)  # Fetch current spread
 
         # Calculate stop loss and take profit distances
-        stop_loss_distance = max(price * 0.01, min_stop_distance + spread)
-        take_profit_distance = max(price * 0.01, min_stop_distance + spread)
+        stop_loss_distance = max(price * self.stop_loss_pct, min_stop_distance + spread)
+        take_profit_distance = max(price * self.take_profit_pct, min_stop_distance + spread)
 
         # Adjust SL and TP based on order type
         if order_type == OrderType.BUY:
@@ -85,12 +88,15 @@ class HighFrequencyStrategy(Strategy):
 
     def manage_positions(self, current_price: float):
         positions = self.data_source.get_positions(self.symbol)
+        if not positions:
+            # Closed by the broker (SL/TP)
+            self.trade_open = False
         for position in positions:
             if self.should_close_position(position, current_price):
                 self.close_position(position)
 
     def should_close_position(self, position, current_price: float) -> bool:
-        profit_threshold = 0.0002  # 0.02% profit
+        profit_threshold = self.exit_threshold
         entry_price = position.price_open
         profit = (current_price - entry_price) / entry_price if position.type == 0 else (entry_price - current_price) / entry_price
         return abs(profit) >= profit_threshold
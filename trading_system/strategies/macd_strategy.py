@@ -3,6 +3,7 @@ import logging
 import time
 import pandas as pd
 from ..strategies.strategy import Strategy
+from ..utils.indicator_cache import Indicators
 import MetaTrader5 as mt5
 from order_type import OrderType
 from ..risk_management.risk_manager import RiskManager
@@ -39,6 +40,14 @@ class MACDStrategy(Strategy):
         data['rsi'] = 100 - (100 / (1 + rs))
         return data
 
+    def generate_signals(self, data):
+        # Same values as calculate_indicators, shared across runs through the indicator cache
+        indicators = Indicators(data['close'])
+        _, _, histogram = indicators.macd(self.fast_period, self.slow_period, self.signal_period, adjust=False)
+        rsi = indicators.rsi(self.rsi_period)
+        buy = (histogram > 0) & (histogram.shift(1) <= 0) & (rsi < self.rsi_overbought)
+        return buy.astype('int8').to_numpy()
+
     def apply(self) -> dict:
         logging.info("Starting MACD trading")
         logging.info(f"Params: {self.start_date} - {self.end_date}")
@@ -2,6 +2,7 @@
 import logging
 from trading_system.data_sources.data_source import DataSource
 from trading_system.strategies.strategy import Strategy
+from trading_system.utils.indicator_cache import Indicators
 from trading_system.risk_management.risk_manager import RiskManager
 from trading_system.strategies.order_type import OrderType
 import time
@@ -16,6 +17,10 @@ class MeanReversionStrategy(Strategy):
         super().__init__(data_source, risk_manager, symbol, timeframe, initial_balance, start_date, end_date)
         logging.info(f"Initialized MeanReversionStrategy for {symbol} with timeframe {timeframe}")
         self.trade_open = False
+        self.sma_window = 20
+        self.entry_ratio = 0.95
+        self.stop_loss_pct = 0.02
+        self.take_profit_pct = 0.03
         # Initialize other attributes specific to MeanReversionStrategy
 
     def apply(self):
@@ -35,14 +40,14 @@ class MeanReversionStrategy(Strategy):
                 logging.info(f"Data fetched: {data.tail()}")
 
                 current_price = data['close'].iloc[-1]
-                sma = data['close'].rolling(window=20).mean().iloc[-1]
+                sma = data['close'].rolling(window=self.sma_window).mean().iloc[-1]
                 logging.info(f"Current price: {current_price}, 20-period SMA: {sma}")
 
                 if not self.trade_open:
-                    if current_price < sma * 0.95:
+                    if current_price < sma * self.entry_ratio:
                         logging.info(f"Buy signal detected. Price {current_price} is below 95% of SMA {sma}")
-                        position_size = self.risk_manager.calculate_position_size(self.symbol, current_price * 0.02)
-                        sl, tp = self.risk_manager.calculate_stop_loss_take_profit(self.symbol, current_price, OrderType.BUY, 0.02, 0.03)
+                        position_size = self.risk_manager.calculate_position_size(self.symbol, current_price * self.stop_loss_pct)
+                        sl, tp = self.risk_manager.calculate_stop_loss_take_profit(self.symbol, current_price, OrderType.BUY, self.stop_loss_pct, self.take_profit_pct)
                         
                         logging.info(f"Attempting to place buy order: size={position_size}, price={current_price}, stop_loss={sl}, take_profit={tp}")
                         order_result = self.data_source.buy_order(self.symbol, position_size, current_price, sl, tp)
@@ -79,6 +84,10 @@ class MeanReversionStrategy(Strategy):
         logging.info(f"MeanReversionStrategy application completed. Final balance: {balance}, Total trades: {len(trades)}")
         return {'balance': balance, 'trades': trades}
 
+    def generate_signals(self, data):
+        sma = Indicators(data['close']).sma(self.sma_window)
+        return (data['close'] < sma * self.entry_ratio).astype('int8').to_numpy()
+
     def calculate_indicators(self, df):
         df['mean'] = df['close'].rolling(window=self.mean_window).mean()
         df['std_dev'] = df['close'].rolling(window=self.mean_window).std()
@@ -113,6 +122,9 @@ class MeanReversionStrategy(Strategy):
     def manage_positions(self, current_price: float):
         logging.info(f"Managing positions at current price: {current_price}")
         positions = self.data_source.get_positions(self.symbol)
+        if not positions:
+            # Closed by the broker (SL/TP hit)
+            self.trade_open = False
         for position in positions:
             logging.info(f"Checking position: {position}")
             if position.type == mt5.POSITION_TYPE_BUY or position.type == 0:
@@ -26,3 +26,15 @@ class Strategy(ABC):
     @abstractmethod
     def update_balance(self, balance, current_price):
         pass
+
+    def generate_signals(self, data):
+        """
+        Entry signals over a whole history, for the backtest engine
+        (trading_system/backtesting/engine.py): 1 = BUY, -1 = SELL, 0 = no trade.
+        Bar i may only use data up to and including bar i. Strategies that act
+        on ticks rather than bars don't implement it and are backtested with
+        trading_system.backtesting.tick_replay.replay_ticks instead.
+        """
+        raise TypeError(f"{type(self).__name__} does not generate bar signals for run_backtest/"
+                        f"run_backtest_sharded/run_portfolio_backtest; backtest it on ticks with "
+                        f"trading_system.backtesting.tick_replay.replay_ticks")
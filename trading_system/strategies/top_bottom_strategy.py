@@ -1,9 +1,12 @@
 import logging
+import numpy as np
 import pandas as pd
 import time
 from .strategy import Strategy
+from ..utils.indicator_cache import Indicators
 from order_type import OrderType
 from datetime import datetime, timedelta
+import MetaTrader5 as mt5
 
 class TopBottomStrategy(Strategy):
     def __init__(self, data_source, risk_manager, symbol, timeframe, initial_balance, start_date, end_date):
@@ -12,6 +15,8 @@ class TopBottomStrategy(Strategy):
         self.min_volume = 0.01
         self.cooldown_period = timedelta(minutes=15)
         self.last_trade_time = None
+        self.stop_loss_pct = 0.02
+        self.take_profit_pct = 0.02
 
     def apply(self):
         logging.info(f"Iniciando a estratégia de Topos e Fundos para {self.symbol}")
@@ -45,6 +50,11 @@ class TopBottomStrategy(Strategy):
                 logging.error(f"Ocorreu um erro: {e}")
                 time.sleep(60)
 
+    def generate_signals(self, data):
+        rsi = Indicators(data['close']).rsi()
+        signals = np.where(rsi < 30, 1, np.where(rsi > 70, -1, 0))
+        return signals.astype(np.int8)
+
     def execute_trade(self, data, order_type: OrderType):
         price = data['close'].iloc[-1]
         volume = self.min_volume
@@ -66,6 +76,9 @@ class TopBottomStrategy(Strategy):
     def manage_positions(self, current_price: float):
         logging.info(f"Managing positions at current price: {current_price}")
         positions = self.data_source.get_positions(self.symbol)
+        if not positions:
+            # Closed by the broker (SL/TP hit)
+            self.trade_open = False
         for position in positions:
             logging.info(f"Checking position: {position}")
             if position.type == mt5.POSITION_TYPE_BUY:
@@ -93,11 +106,11 @@ class TopBottomStrategy(Strategy):
 
     def calculate_sl_tp(self, price, order_type: OrderType):
         if order_type == OrderType.BUY:
-            sl = price * 0.98
-            tp = price * 1.02
+            sl = price * (1 - self.stop_loss_pct)
+            tp = price * (1 + self.take_profit_pct)
         else:
-            sl = price * 1.02
-            tp = price * 0.98
+            sl = price * (1 + self.stop_loss_pct)
+            tp = price * (1 - self.take_profit_pct)
         return sl, tp
 
     def calculate_rsi(self, prices, period=14):
@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_BYTES = 256 * 2 ** 20
+# Shorter series (live windows) are cheaper to recompute than to hash and keep
+MIN_CACHED_BARS = 5000
+
+
+class IndicatorCache:
+    """
+    Content-addressed store for indicator arrays.
+
+    Entries are keyed by (fingerprint of the input values, indicator name,
+    parameters), so every run over the same prices shares them whatever the
+    DataFrame object or index. The most recently used entries are kept in
+    memory up to max_bytes; with spill_dir, evicted entries are written there as
+    .npy files and later read back memory-mapped instead of being recomputed.
+    Cached arrays are read-only.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, spill_dir=None):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.hits = 0
+        self.misses = 0
+        self.spilled = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    @staticmethod
+    def fingerprint(values):
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        return hashlib.sha256(memoryview(values)).hexdigest()
+
+    def _spill_path(self, key):
+        name = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self.spill_dir, f"{name}.npy")
+
+    def get(self, fingerprint, name, params, compute):
+        """The cached values of indicator name(**params), calling compute() only on a miss"""
+        key = (fingerprint, name, tuple(sorted(params.items())))
+        with self._lock:
+            values = self._entries.get(key)
+            if values is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return values
+        if self.spill_dir:
+            path = self._spill_path(key)
+            if os.path.exists(path):
+                self.hits += 1
+                return np.load(path, mmap_mode='r')
+
+        self.misses += 1
+        values = np.asarray(compute(), dtype=np.float64)
+        values.setflags(write=False)
+        self._store(key, values)
+        return values
+
+    def _store(self, key, values):
+        evicted = []
+        with self._lock:
+            self._entries[key] = values
+            self._bytes += values.nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                old_key, old_values = self._entries.popitem(last=False)
+                self._bytes -= old_values.nbytes
+                evicted.append((old_key, old_values))
+        if self.spill_dir:
+            for old_key, old_values in evicted:
+                self._spill(old_key, old_values)
+
+    def _spill(self, key, values):
+        path = self._spill_path(key)
+        if os.path.exists(path):
+            return
+        # Write then rename, so a concurrent reader never maps a partial file
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as f:
+            np.save(f, values)
+        os.replace(temporary, path)
+        self.spilled += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        return {'entries': len(self._entries), 'bytes': self._bytes, 'hits': self.hits, 'misses': self.misses,
+                'spilled': self.spilled}
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cache = IndicatorCache()
+
+
+def get_indicator_cache():
+    return _cache
+
+
+def set_indicator_cache(cache):
+    """Replace the process-wide cache (None turns caching off); returns the previous one"""
+    global _cache
+    previous, _cache = _cache, cache
+    if cache is not None:
+        logging.info(f"Indicator cache: {cache.max_bytes / 2 ** 20:.0f} MB in memory"
+                     + (f", spilling to {cache.spill_dir}" if cache.spill_dir else ""))
+    return previous
+
+
+class Indicators:
+    """
+    Indicators of one price series through the process-wide cache. The series
+    is fingerprinted once, on first use, and the results come back as Series on
+    its index, with the same values as the plain pandas computations.
+    """
+
+    def __init__(self, prices, cache=None):
+        self.prices = prices
+        self.cache = cache if cache is not None else _cache
+        self._fingerprint = None
+
+    def _get(self, name, params, compute):
+        if self.cache is None or len(self.prices) < MIN_CACHED_BARS:
+            return compute()
+        if self._fingerprint is None:
+            self._fingerprint = self.cache.fingerprint(self.prices.to_numpy())
+        values = self.cache.get(self._fingerprint, name, params, lambda: compute().to_numpy(dtype=np.float64))
+        return pd.Series(values, index=self.prices.index, name=self.prices.name, copy=False)
+
+    def sma(self, window):
+        return self._get('sma', {'window': window}, lambda: self.prices.rolling(window=window).mean())
+
+    def std(self, window):
+        return self._get('std', {'window': window}, lambda: self.prices.rolling(window=window).std())
+
+    def ema(self, span, adjust=True):
+        return self._get('ema', {'span': span, 'adjust': adjust}, lambda: self.prices.ewm(span=span, adjust=adjust).mean())
+
+    def rsi(self, period=14):
+        def compute():
+            delta = self.prices.diff()
+            gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+            loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+            rs = gain / loss
+            return 100 - (100 / (1 + rs))
+        return self._get('rsi', {'period': period}, compute)
+
+    def macd(self, fast=12, slow=26, signal=9, adjust=True):
+        """(macd, signal line, histogram); the EMAs are shared with ema() and other MACD settings"""
+        macd = self.ema(fast, adjust) - self.ema(slow, adjust)
+        params = {'fast': fast, 'slow': slow, 'signal': signal, 'adjust': adjust}
+        signal_line = self._get('macd_signal', params, lambda: macd.ewm(span=signal, adjust=adjust).mean())
+        return macd, signal_line, macd - signal_line
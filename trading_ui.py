@@ -9,8 +9,10 @@ from PyQt5.QtCore import QThread, pyqtSignal, QObject
 from trading_system.trading_system import TradingSystem
 from trading_system.data_sources.live_data_source import LiveDataSource
 from trading_system.data_sources.historical_data_source import HistoricalDataSource
+from trading_system.data_sources.rate_cache import RateCache
 from trading_system.strategies.strategy_factory import StrategyFactory
 from trading_system.risk_management.risk_manager import RiskManager
+from quantum_inference_server import connect_if_available
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -97,7 +99,7 @@ class TradingUI(QMainWindow):
         if data_source_type == "Live":
             data_source = LiveDataSource()
         else:
-            data_source = HistoricalDataSource()
+            data_source = HistoricalDataSource(cache=RateCache())
 
         risk_manager = RiskManager(
             initial_balance=10000,
@@ -120,7 +122,7 @@ class TradingUI(QMainWindow):
 
             if strategy_name in ["Machine Learning", "XGB"]:
                 model_path = "training/xgboost_model.pkl"
-                model = joblib.load(model_path)
+                model = connect_if_available(env_var='QUANTUM_STRATEGY_INFERENCE_SOCKET', model_path=model_path) or joblib.load(model_path)
                 features = ['macd', 'signal_line', 'rsi', 'log_tick_volume', 'log_spread', 'high_low_range', 'close_open_range']
                 strategy_params.update({
                     'model': model,
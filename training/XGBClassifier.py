@@ -2,14 +2,16 @@ import MetaTrader5 as mt5
 import pandas as pd
 from datetime import datetime
 import logging
+import os
+import sys
 from sklearn.ensemble import RandomForestClassifier
 from xgboost import XGBClassifier
-from sklearn.model_selection import TimeSeriesSplit, GridSearchCV
-from sklearn.metrics import classification_report, accuracy_score
 import numpy as np
-import joblib
-from imblearn.over_sampling import SMOTE
-import optuna
+from optuna_search import FeatureCache
+from parallel_training import train_models_parallel
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trading_system.data_sources.rate_cache import RateCache  # noqa: E402
 
 # Configuration for different models and parameters
 config = {
@@ -35,11 +37,13 @@ config = {
 }
 
 class HistoricalDataRetriever:
-    def __init__(self, symbol, start_date, end_date):
+    def __init__(self, symbol, start_date, end_date, cache=None):
         self.symbol = symbol
         self.timeframe = mt5.TIMEFRAME_M5  # 5-minute timeframe
+        self.timeframe_name = '5m'  # Cache key, shared with HistoricalDataSource
         self.start_date = start_date
         self.end_date = end_date
+        self.cache = cache
 
     def initialize_mt5(self):
         if not mt5.initialize():
@@ -52,17 +56,25 @@ class HistoricalDataRetriever:
         mt5.shutdown()
         logging.info("MetaTrader5 shutdown successfully.")
 
-    def get_historical_data(self):
+    def fetch_rates(self, start_date, end_date):
         if not self.initialize_mt5():
             return None
 
         try:
-            rates = mt5.copy_rates_range(self.symbol, self.timeframe, self.start_date, self.end_date)
+            rates = mt5.copy_rates_range(self.symbol, self.timeframe, start_date, end_date)
         except Exception as e:
             logging.error(f"Error retrieving data: {e}")
             rates = None
         finally:
             self.shutdown_mt5()
+        return rates
+
+    def get_historical_data(self):
+        if self.cache is not None:
+            # MT5 is only initialized for days that are not cached yet
+            rates = self.cache.get(self.symbol, self.timeframe_name, self.start_date, self.end_date, self.fetch_rates)
+        else:
+            rates = self.fetch_rates(self.start_date, self.end_date)
 
         if rates is None or len(rates) == 0:
             logging.warning(f"No data available for {self.symbol} in the specified range.")
@@ -88,7 +100,7 @@ def prepare_data(data):
     data['high_low_range'] = data['high'] - data['low']
     data['close_open_range'] = data['close'] - data['open']
     data['price_change'] = data['close'].shift(-1) - data['close']
-    data['target'] = data['price_change'].apply(lambda x: 1 if x > 0 else 0)
+    data['target'] = (data['price_change'] > 0).astype(int)
     data.dropna(inplace=True)
     return data
 
@@ -100,38 +112,6 @@ def compute_rsi(series, period=14):
     rsi = 100 - (100 / (1 + rs))
     return rsi
 
-def balance_classes(X, y):
-    smote = SMOTE(random_state=42)
-    X_resampled, y_resampled = smote.fit_resample(X, y)
-    return X_resampled, y_resampled
-
-def train_model(df, model_name):
-    features = config['features']
-    X = df[features]
-    y = df['target']
-
-    # Balance classes
-    X, y = balance_classes(X, y)
-
-    tscv = TimeSeriesSplit(n_splits=5)
-    model_info = config['models'][model_name]
-    model = model_info['model']
-    param_grid = model_info['param_grid']
-
-    grid_search = GridSearchCV(model, param_grid, cv=tscv, scoring='accuracy')
-    grid_search.fit(X, y)
-    best_model = grid_search.best_estimator_
-
-    y_pred = best_model.predict(X)
-    print(f"Model: {model_name}")
-    print(classification_report(y, y_pred))
-    print(f"Accuracy: {accuracy_score(y, y_pred)}")
-
-    # Save the trained model
-    model_filename = f'{model_name.lower()}_model.pkl'
-    joblib.dump(best_model, model_filename)
-    print(f"Model saved as '{model_filename}'")
-
 def main():
     logging.basicConfig(level=logging.INFO)
 
@@ -139,16 +119,17 @@ def main():
     start_date = datetime(2020, 1, 1)
     end_date = datetime(2020, 2, 28)
 
-    data_retriever = HistoricalDataRetriever(symbol, start_date, end_date)
+    data_retriever = HistoricalDataRetriever(symbol, start_date, end_date, cache=RateCache())
     rates = data_retriever.get_historical_data()
 
     if rates is not None:
         df = data_retriever.convert_to_dataframe(rates)
         df = prepare_data(df)
 
-        # Train models specified in the config
-        for model_name in config['models']:
-            train_model(df, model_name)
+        # Train every model/parameter set in the config on a process pool that
+        # shares one memory-mapped feature matrix (results in training_results.csv)
+        cache = FeatureCache.from_frame(df, config['features'])
+        train_models_parallel(cache, config['models'], balance=True)
     else:
         print(f"No data found for {symbol} in the specified date range.")
 
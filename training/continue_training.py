@@ -0,0 +1,177 @@
+import argparse
+import copy
+import logging
+import os
+import pickle
+import sys
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import accuracy_score, log_loss
+
+from feature_selection import load_ohlcv
+from labels import add_profit_target
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from quantum_features import compute_features  # noqa: E402
+from quantum_model_registry import ModelRegistry  # noqa: E402
+
+# Bars of history in front of the window: the 100-bar rolling features plus EMA convergence
+WARMUP_BARS = 500
+
+
+def load_model(model_path):
+    """XGBClassifier pickles (.pkl) or native booster files (.json/.ubj)"""
+    if model_path.endswith('.pkl'):
+        return joblib.load(model_path)
+    booster = xgb.Booster()
+    booster.load_model(model_path)
+    return booster
+
+
+def get_booster(model):
+    return model.get_booster() if hasattr(model, 'get_booster') else model
+
+
+def load_window(ohlcv, features, days, holdout_days, horizon=15, threshold=0.2):
+    """
+    Features and production target of the last `days` days of OHLCV; the last
+    `holdout_days` are held out. Training rows whose target looks into the
+    hold-out are purged.
+    """
+    last_time = ohlcv['time'].iloc[-1]
+    window_start = last_time - pd.Timedelta(days=days + holdout_days)
+    holdout_start = last_time - pd.Timedelta(days=holdout_days)
+
+    # Only the window and its warm-up are featurized
+    first = max(0, int(ohlcv['time'].searchsorted(window_start, side='right')) - WARMUP_BARS)
+    data = add_profit_target(ohlcv.iloc[first:].reset_index(drop=True), horizon=horizon, threshold=threshold)
+    # Features temporais a partir do horário de cada linha, não do relógio atual
+    df, _ = compute_features(data, features, now=data['time'])
+    df = df[df['time'] > window_start]
+
+    train = df[df['time'] <= holdout_start]
+    holdout = df[df['time'] > holdout_start]
+    return train.iloc[:max(0, len(train) - horizon)], holdout
+
+
+def evaluate(model, X, y):
+    booster = get_booster(model)
+    y_score = booster.predict(xgb.DMatrix(X))
+    return {
+        'logloss': float(log_loss(y, y_score, labels=[0, 1])),
+        'accuracy': float(accuracy_score(y, (y_score > 0.5).astype(int)))
+    }
+
+
+def continue_training(model, X, y, rounds, params=None):
+    """
+    Append `rounds` trees fitted on (X, y) to a copy of the current model.
+    Existing trees are not modified (process_type stays 'default').
+    """
+    if hasattr(model, 'get_booster'):
+        updated = copy.deepcopy(model)
+        updated.set_params(n_estimators=rounds, **(params or {}))
+        updated.fit(X, y, xgb_model=model.get_booster().copy())
+        return updated
+
+    train_params = {'objective': 'binary:logistic', 'tree_method': 'hist'}
+    train_params.update(params or {})
+    dtrain = xgb.DMatrix(X, label=y)
+    return xgb.train(train_params, dtrain, num_boost_round=rounds, xgb_model=model.copy())
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description='Continue training the current booster on recent data')
+    parser.add_argument('ohlcv', help='CSV with time, open, high, low, close, volume (1m bars)')
+    parser.add_argument('--registry', default='models')
+    parser.add_argument('--model', default=None, help='Model file (defaults to the current registry version)')
+    parser.add_argument('--days', type=int, default=7, help='Days of fresh data to train on')
+    parser.add_argument('--holdout-days', type=int, default=1, help='Most recent days used only for validation')
+    parser.add_argument('--rounds', type=int, default=50, help='Trees to append')
+    parser.add_argument('--horizon', type=int, default=None, help='Target horizon in bars (default: model params or 15)')
+    parser.add_argument('--profit-threshold', type=float, default=None,
+                        help='Target threshold in percent (default: model params or 0.2)')
+    parser.add_argument('--learning-rate', type=float, default=None)
+    parser.add_argument('--tolerance', type=float, default=0.0,
+                        help='Max hold-out logloss increase accepted over the current model')
+    parser.add_argument('--no-promote', action='store_true')
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry)
+    current = registry.current()
+    model_path = args.model or (current['model_path'] if current else None)
+    if model_path is None:
+        print("No model given and the registry has no current version.")
+        return
+    base_params = registry.load_params() if current and not args.model else {}
+
+    model = load_model(model_path)
+    booster = get_booster(model)
+    features = booster.feature_names
+    if not features:
+        print("The model has no feature names; cannot tell which features to compute.")
+        return
+
+    # Same target definition the model was trained on
+    horizon = args.horizon or (base_params or {}).get('time_horizon') or 15
+    threshold = args.profit_threshold or (base_params or {}).get('profit_threshold') or 0.2
+    train, holdout = load_window(load_ohlcv(args.ohlcv), features, args.days, args.holdout_days, horizon, threshold)
+    if train.empty or holdout.empty:
+        print(f"Not enough data: {len(train)} training rows, {len(holdout)} hold-out rows.")
+        return
+    X_train, y_train = train[features].astype(np.float32), train['target'].to_numpy()
+    X_holdout, y_holdout = holdout[features].astype(np.float32), holdout['target'].to_numpy()
+
+    started = time.time()
+    params = {'learning_rate': args.learning_rate} if args.learning_rate else None
+    updated = continue_training(model, X_train, y_train, args.rounds, params)
+    training_time = time.time() - started
+
+    before = evaluate(model, X_holdout, y_holdout)
+    after = evaluate(updated, X_holdout, y_holdout)
+    n_trees_before = booster.num_boosted_rounds()
+    n_trees_after = get_booster(updated).num_boosted_rounds()
+    print(f"Trees: {n_trees_before} -> {n_trees_after} in {training_time:.1f}s on {len(train)} rows")
+    print(f"Hold-out ({len(holdout)} rows) logloss: {before['logloss']:.5f} -> {after['logloss']:.5f}, "
+          f"accuracy: {before['accuracy']:.4f} -> {after['accuracy']:.4f}")
+
+    if after['logloss'] > before['logloss'] + args.tolerance:
+        print("Hold-out logloss got worse; the new version was not registered.")
+        return
+
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    base_name, extension = os.path.splitext(os.path.basename(model_path))
+    output_path = f"{base_name.split('_cont_')[0]}_cont_{stamp}{extension or '.json'}"
+    if hasattr(updated, 'get_booster'):
+        with open(output_path, 'wb') as f:
+            pickle.dump(updated, f)
+    else:
+        updated.save_model(output_path)
+
+    version_params = dict(base_params or {})
+    version_params.update({
+        'continued_from': current['version'] if current and not args.model else model_path,
+        'n_trees': n_trees_after,
+        'added_trees': n_trees_after - n_trees_before,
+        'train_window_days': args.days,
+        'holdout_days': args.holdout_days,
+        'n_samples': int(len(train)),
+        'holdout_before': before,
+        'holdout_after': after,
+        'training_time': training_time,
+        'timestamp': datetime.now().isoformat()
+    })
+    entry = registry.register(output_path, params=version_params, promote=not args.no_promote)
+    os.remove(output_path)
+    print(f"Registered {entry['version']} ({entry['model_path']})")
+
+
+if __name__ == "__main__":
+    main()
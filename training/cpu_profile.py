@@ -0,0 +1,206 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from feature_selection import build_dataset, load_base_params, load_ohlcv
+from walk_forward import purged_splits
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from quantum_features import ALL_FEATURES  # noqa: E402
+from quantum_model_registry import ModelRegistry  # noqa: E402
+
+DEFAULT_GPU_PARAMS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'gpu_perfect_model_params.json')
+DEFAULT_MAX_BINS = [64, 128, 256]
+TUNING_ROUNDS = 30
+
+
+def load_gpu_record(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def train_params(base_params, max_bin, nthread):
+    """best_params of the GPU run mapped onto the CPU histogram method"""
+    params = {key: value for key, value in base_params.items() if key != 'n_estimators'}
+    params.update({
+        'objective': 'binary:logistic',
+        'eval_metric': 'logloss',
+        'tree_method': 'hist',
+        'device': 'cpu',
+        'max_bin': max_bin,
+        'nthread': nthread,
+        'seed': 42
+    })
+    return params
+
+
+def as_float32(X):
+    return np.ascontiguousarray(X, dtype=np.float32)
+
+
+def quantile_dmatrix(X, y, max_bin, nthread, ref=None):
+    """Quantised once; evaluation matrices reuse the training cuts through ref"""
+    return xgb.QuantileDMatrix(as_float32(X), label=y, max_bin=max_bin, nthread=nthread, ref=ref)
+
+
+def thread_candidates(n_cpus=None):
+    n_cpus = n_cpus or multiprocessing.cpu_count()
+    candidates = sorted({1, n_cpus // 4, n_cpus // 2, n_cpus} - {0})
+    return candidates
+
+
+def autotune_threads(X, y, base_params, max_bin, candidates=None, rounds=TUNING_ROUNDS):
+    """Time a short training run per thread count; more threads is not always faster"""
+    timings = {}
+    dtrain = quantile_dmatrix(X, y, max_bin, multiprocessing.cpu_count())
+    for nthread in candidates or thread_candidates():
+        started = time.perf_counter()
+        xgb.train(train_params(base_params, max_bin, nthread), dtrain, num_boost_round=rounds)
+        timings[nthread] = time.perf_counter() - started
+        logging.info(f"nthread={nthread}: {timings[nthread]:.2f}s for {rounds} rounds")
+    return min(timings, key=timings.get), timings
+
+
+def tune_max_bin(X_train, y_train, X_valid, y_valid, base_params, nthread, max_bins=None, rounds=TUNING_ROUNDS):
+    """Short runs per max_bin: fewer bins train faster; keep the smallest within 0.1% of the best logloss"""
+    rows = []
+    for max_bin in max_bins or DEFAULT_MAX_BINS:
+        started = time.perf_counter()
+        dtrain = quantile_dmatrix(X_train, y_train, max_bin, nthread)
+        dvalid = quantile_dmatrix(X_valid, y_valid, max_bin, nthread, ref=dtrain)
+        evals_result = {}
+        xgb.train(train_params(base_params, max_bin, nthread), dtrain, num_boost_round=rounds,
+                  evals=[(dvalid, 'valid')], evals_result=evals_result, verbose_eval=False)
+        rows.append({'max_bin': max_bin, 'valid_logloss': evals_result['valid']['logloss'][-1],
+                     'seconds': time.perf_counter() - started})
+        logging.info(f"max_bin={max_bin}: logloss {rows[-1]['valid_logloss']:.5f} in {rows[-1]['seconds']:.2f}s")
+    table = pd.DataFrame(rows)
+    eligible = table[table['valid_logloss'] <= table['valid_logloss'].min() * 1.001]
+    return int(eligible.sort_values('max_bin').iloc[0]['max_bin']), table
+
+
+def cross_validate(X, y, base_params, num_boost_round, max_bin, nthread, n_splits=5, label_horizon=15):
+    """Purged walk-forward accuracy with the CPU profile, timed fold by fold"""
+    folds = []
+    for fold, (train_index, test_index) in enumerate(purged_splits(len(X), n_splits, label_horizon)):
+        started = time.perf_counter()
+        dtrain = quantile_dmatrix(X[train_index], y[train_index], max_bin, nthread)
+        dtest = quantile_dmatrix(X[test_index], y[test_index], max_bin, nthread, ref=dtrain)
+        booster = xgb.train(train_params(base_params, max_bin, nthread), dtrain, num_boost_round=num_boost_round)
+        accuracy = float(((booster.predict(dtest) > 0.5) == y[test_index]).mean())
+        folds.append({'fold': fold, 'accuracy': accuracy, 'seconds': time.perf_counter() - started})
+        print(f"Fold {fold}: accuracy {accuracy:.4f} in {folds[-1]['seconds']:.1f}s")
+    return pd.DataFrame(folds).set_index('fold')
+
+
+def benchmark(gpu_record, folds, wall_time, n_samples):
+    return pd.DataFrame([
+        {'run': gpu_record.get('model_name', 'XGBoost_GPU'), 'cv_mean_accuracy': gpu_record['cv_mean_accuracy'],
+         'cv_std_accuracy': gpu_record['cv_std_accuracy'], 'training_time': gpu_record['training_time'],
+         'n_samples': gpu_record['n_samples']},
+        {'run': 'XGBoost_CPU_hist', 'cv_mean_accuracy': folds['accuracy'].mean(),
+         'cv_std_accuracy': folds['accuracy'].std(), 'training_time': wall_time, 'n_samples': n_samples}
+    ]).set_index('run')
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description='CPU histogram training profile and benchmark against the GPU run')
+    parser.add_argument('ohlcv', help='CSV with time, open, high, low, close, volume (1m bars)')
+    parser.add_argument('--gpu-params', default=DEFAULT_GPU_PARAMS)
+    parser.add_argument('--max-bins', type=int, nargs='+', default=DEFAULT_MAX_BINS)
+    parser.add_argument('--threads', type=int, nargs='+', default=None, help='Thread counts to try')
+    parser.add_argument('--splits', type=int, default=5)
+    parser.add_argument('--output', default='cpu_profile_params.json')
+    parser.add_argument('--registry', default=None, help='Fit on all rows and register the model here')
+    args = parser.parse_args()
+
+    gpu_record = load_gpu_record(args.gpu_params)
+    base_params = load_base_params(args.gpu_params)
+    num_boost_round = base_params.get('n_estimators', 100)
+    horizon = gpu_record.get('time_horizon', 15)
+
+    ohlcv = load_ohlcv(args.ohlcv)
+    df = build_dataset(ohlcv, horizon, gpu_record.get('profit_threshold', 0.2))
+    X = as_float32(df[ALL_FEATURES].to_numpy())
+    y = df['target'].to_numpy(dtype=np.float32)
+    print(f"{len(X)} rows x {X.shape[1]} features (GPU run: {gpu_record['n_samples']} rows)")
+
+    # Tuning on the most recent fifth of the data keeps it cheap next to the full run
+    tune_rows = max(len(X) // 5, 2000)
+    X_tune, y_tune = X[-tune_rows:], y[-tune_rows:]
+    split = int(len(X_tune) * 0.8)
+    nthread, thread_timings = autotune_threads(X_tune[:split], y_tune[:split], base_params, max(args.max_bins),
+                                               args.threads)
+    max_bin, bin_table = tune_max_bin(X_tune[:split], y_tune[:split], X_tune[split + horizon:],
+                                      y_tune[split + horizon:], base_params, nthread, args.max_bins)
+    print(f"CPU profile: tree_method=hist, max_bin={max_bin}, nthread={nthread}")
+
+    started = time.perf_counter()
+    folds = cross_validate(X, y, base_params, num_boost_round, max_bin, nthread, args.splits, horizon)
+    wall_time = time.perf_counter() - started
+
+    table = benchmark(gpu_record, folds, wall_time, len(X))
+    print("\nBenchmark:")
+    print(table.round(4).to_string())
+    print(f"Accuracy difference (CPU - GPU): {table['cv_mean_accuracy'].iloc[1] - table['cv_mean_accuracy'].iloc[0]:+.4f}")
+
+    profile = {
+        'model_name': 'XGBoost_CPU',
+        'profit_threshold': gpu_record.get('profit_threshold'),
+        'time_horizon': horizon,
+        'best_params': gpu_record['best_params'],
+        'cpu_profile': {
+            'tree_method': 'hist',
+            'max_bin': max_bin,
+            'nthread': nthread,
+            'thread_timings': {str(k): v for k, v in thread_timings.items()},
+            'max_bin_table': bin_table.to_dict(orient='records')
+        },
+        'cv_mean_accuracy': float(folds['accuracy'].mean()),
+        'cv_std_accuracy': float(folds['accuracy'].std()),
+        'n_samples': int(len(X)),
+        'n_features': int(X.shape[1]),
+        'training_time': wall_time,
+        'gpu_used': False,
+        'timestamp': datetime.now().isoformat()
+    }
+    with open(args.output, 'w') as f:
+        json.dump(profile, f, indent=2)
+    print(f"Profile saved as '{args.output}'")
+
+    if args.registry:
+        started = time.perf_counter()
+        dtrain = quantile_dmatrix(X, y, max_bin, nthread)
+        booster = xgb.train(train_params(base_params, max_bin, nthread), dtrain, num_boost_round=num_boost_round)
+        booster.feature_names = ALL_FEATURES
+        profile['final_fit_time'] = time.perf_counter() - started
+        # Registered as a pickled XGBClassifier like the other trainers, so read_model and ModelSwapManager load it
+        booster_path = 'xgboost_cpu_model.json'
+        booster.save_model(booster_path)
+        model = xgb.XGBClassifier()
+        model.load_model(booster_path)
+        os.remove(booster_path)
+        model_path = 'xgboost_cpu_model.pkl'
+        with open(model_path, 'wb') as f:
+            pickle.dump(model, f)
+        profile['features'] = ALL_FEATURES
+        entry = ModelRegistry(args.registry).register(model_path, params=profile, promote=False)
+        os.remove(model_path)
+        print(f"Registered {entry['version']} (fit in {profile['final_fit_time']:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import argparse
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import xgboost as xgb
+
+from continue_training import load_model
+from feature_selection import LIVE_WINDOW_ROWS, load_ohlcv, median_ms
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from quantum_features import ALL_FEATURES, compute_features, model_feature_names  # noqa: E402
+from quantum_flat_model import export_booster  # noqa: E402
+from quantum_model_registry import ModelRegistry  # noqa: E402
+
+DEFAULT_THRESHOLD = 0.70  # QuantumTradingSystem default probability_threshold
+FAST_VARIANT = 'fast'
+
+
+def teacher_probabilities(teacher, X):
+    if hasattr(teacher, 'predict_proba'):
+        return np.asarray(teacher.predict_proba(X))[:, 1]
+    return teacher.predict(xgb.DMatrix(X))
+
+
+def load_threshold(config_path):
+    """probability_threshold from the live config (0-1 or percent), default 0.70"""
+    if config_path and os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            value = json.load(f).get('probability_threshold', DEFAULT_THRESHOLD)
+        return value / 100 if value > 1 else value
+    return DEFAULT_THRESHOLD
+
+
+def train_student(X_train, soft_train, X_valid, soft_valid, max_depth=4, n_trees=150, learning_rate=0.1):
+    """Fit a shallow booster on the teacher's probabilities (cross-entropy on soft labels)"""
+    params = {
+        'objective': 'binary:logistic',
+        'eval_metric': 'logloss',
+        'tree_method': 'hist',
+        'max_depth': max_depth,
+        'learning_rate': learning_rate,
+        'seed': 42
+    }
+    dtrain = xgb.DMatrix(X_train, label=soft_train)
+    dvalid = xgb.DMatrix(X_valid, label=soft_valid)
+    return xgb.train(params, dtrain, num_boost_round=n_trees,
+                     evals=[(dtrain, 'train'), (dvalid, 'valid')], verbose_eval=50)
+
+
+def agreement_report(teacher_proba, student_proba, threshold):
+    """How often the student makes the same BUY decision as the teacher at the live threshold"""
+    teacher_buy = teacher_proba >= threshold
+    student_buy = student_proba >= threshold
+    both = int((teacher_buy & student_buy).sum())
+    return {
+        'threshold': float(threshold),
+        'agreement': float((teacher_buy == student_buy).mean()),
+        'buy_precision': float(both / student_buy.sum()) if student_buy.any() else None,
+        'buy_recall': float(both / teacher_buy.sum()) if teacher_buy.any() else None,
+        'teacher_buy_rate': float(teacher_buy.mean()),
+        'student_buy_rate': float(student_buy.mean()),
+        'mean_abs_diff': float(np.abs(teacher_proba - student_proba).mean())
+    }
+
+
+def measure_latency(teacher, flat, row, repeats=200):
+    """Median single-row predict_proba time (ms) for teacher and flattened student"""
+    flat.predict_proba(row)  # Compila o kernel antes de medir
+    teacher_ms = median_ms(lambda: teacher_probabilities(teacher, row), repeats)
+    student_ms = median_ms(lambda: flat.predict_proba(row), repeats)
+    return teacher_ms, student_ms
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description='Distill the current model into a compact "fast" variant')
+    parser.add_argument('ohlcv', help='CSV with time, open, high, low, close, volume (1m bars)')
+    parser.add_argument('--registry', default='models')
+    parser.add_argument('--teacher', default=None, help='Teacher model file (defaults to the current registry version)')
+    parser.add_argument('--max-depth', type=int, default=4)
+    parser.add_argument('--trees', type=int, default=150)
+    parser.add_argument('--learning-rate', type=float, default=0.1)
+    parser.add_argument('--valid-fraction', type=float, default=0.2)
+    parser.add_argument('--config', default='quantum_config.json', help='Live config with probability_threshold')
+    parser.add_argument('--threshold', type=float, default=None, help='Overrides the config threshold (0-1)')
+    parser.add_argument('--no-promote', action='store_true')
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry)
+    current = registry.current()
+    teacher_path = args.teacher or (current['model_path'] if current else None)
+    if teacher_path is None:
+        print("No teacher given and the registry has no current version.")
+        return
+    teacher = load_model(teacher_path)
+    teacher_params = registry.load_params() if current and not args.teacher else {}
+    features = (teacher_params or {}).get('features') or model_feature_names(teacher) or ALL_FEATURES
+    threshold = args.threshold if args.threshold is not None else load_threshold(args.config)
+
+    ohlcv = load_ohlcv(args.ohlcv)
+    # Features temporais a partir do horário de cada linha, não do relógio atual
+    df, _ = compute_features(ohlcv, features, now=ohlcv['time'])
+    X = df[features].astype(np.float32)
+    soft = teacher_probabilities(teacher, X)
+
+    split = int(len(X) * (1 - args.valid_fraction))
+    student = train_student(X.iloc[:split], soft[:split], X.iloc[split:], soft[split:],
+                            args.max_depth, args.trees, args.learning_rate)
+    flat = export_booster(student)
+
+    student_proba = flat.predict_proba(X.iloc[split:])[:, 1]
+    report = agreement_report(soft[split:], student_proba, threshold)
+    print(f"Hold-out ({len(X) - split} rows) at threshold {threshold:.2f}: "
+          f"agreement {report['agreement']:.4f}, BUY precision {report['buy_precision']}, "
+          f"BUY recall {report['buy_recall']}, mean |p_teacher - p_student| {report['mean_abs_diff']:.4f}")
+
+    live_window = ohlcv.iloc[-LIVE_WINDOW_ROWS:].reset_index(drop=True)
+    row, _ = compute_features(live_window, features)
+    teacher_ms, student_ms = measure_latency(teacher, flat, row[features].iloc[-1:].astype(np.float32))
+    print(f"Single-row inference: teacher {teacher_ms:.3f}ms, student {student_ms:.3f}ms "
+          f"({flat.n_trees} trees, depth {args.max_depth})")
+
+    model_path = f"distilled_{args.trees}x{args.max_depth}_model.npz"
+    flat.save(model_path)
+    entry = registry.register(model_path, params={
+        'model_name': 'XGBoost (distilled)',
+        'teacher': current['version'] if current and not args.teacher else teacher_path,
+        'features': list(features),
+        'n_features': len(features),
+        'n_trees': flat.n_trees,
+        'max_depth': args.max_depth,
+        'learning_rate': args.learning_rate,
+        'n_samples': int(split),
+        'probability_threshold': threshold,
+        'distillation': report,
+        'latency_ms': {'teacher': teacher_ms, 'student': student_ms},
+        'timestamp': datetime.now().isoformat()
+    }, promote=not args.no_promote, variant=FAST_VARIANT)
+    os.remove(model_path)
+    print(f"Registered {entry['version']} as the '{FAST_VARIANT}' variant")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import argparse
+import json
+import logging
+import os
+import pickle
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from xgboost import XGBClassifier
+
+from labels import add_profit_target
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from quantum_features import ALL_FEATURES, compute_features  # noqa: E402
+from quantum_flat_model import export_booster  # noqa: E402
+from quantum_model_registry import ModelRegistry  # noqa: E402
+
+DEFAULT_SIZES = [80, 60, 40, 30, 20, 15, 10, 5]
+LIVE_WINDOW_ROWS = 200  # Same as QuantumTradingSystem.get_market_data(limit=200)
+
+
+def load_ohlcv(path):
+    df = pd.read_csv(path)
+    df['time'] = pd.to_datetime(df['time'])
+    return df[['time', 'open', 'high', 'low', 'close', 'volume']].sort_values('time').reset_index(drop=True)
+
+
+def load_base_params(path):
+    """best_params from gpu_perfect_model_params.json, without the sklearn pipeline prefixes"""
+    with open(path, 'r') as f:
+        best_params = json.load(f)['best_params']
+    return {key.split('__', 1)[1]: value for key, value in best_params.items() if key.startswith('model__')}
+
+
+def build_dataset(ohlcv, horizon=15, threshold=0.2):
+    data = add_profit_target(ohlcv.copy(), horizon=horizon, threshold=threshold)
+    # Features temporais a partir do horário de cada linha, não do relógio atual
+    df, _ = compute_features(data, now=data['time'])
+    return df
+
+
+def fit_model(X, y, params):
+    model = XGBClassifier(tree_method='hist', random_state=42, **params)
+    model.fit(X, y)
+    return model
+
+
+def rank_features(model, X_valid, method='gain'):
+    booster = model.get_booster()
+    if method == 'shap':
+        import xgboost as xgb
+        sample = X_valid.iloc[:5000]
+        contributions = booster.predict(xgb.DMatrix(sample), pred_contribs=True)[:, :-1]
+        scores = dict(zip(sample.columns, np.abs(contributions).mean(axis=0)))
+    else:
+        scores = booster.get_score(importance_type='total_gain')
+    importance = pd.Series({feature: scores.get(feature, 0.0) for feature in X_valid.columns})
+    return importance.sort_values(ascending=False)
+
+
+def drop_correlated(X, ranked_features, threshold=0.98, sample_rows=20000):
+    """Keep the more important feature of each pair with |corr| >= threshold"""
+    sample = X[ranked_features].iloc[-sample_rows:].astype(np.float64)
+    corr = sample.corr().abs().fillna(0.0)
+    kept, dropped = [], []
+    for feature in ranked_features:
+        duplicate_of = next((k for k in kept if corr.loc[feature, k] >= threshold), None)
+        if duplicate_of is None:
+            kept.append(feature)
+        else:
+            dropped.append((feature, duplicate_of, float(corr.loc[feature, duplicate_of])))
+    return kept, dropped
+
+
+def median_ms(function, repeats):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1000)
+    return float(np.median(samples))
+
+
+def measure_latency(model, features, live_window, repeats=20):
+    """Feature engine time for one live window + single-row inference time on the flattened model"""
+    feature_ms = median_ms(lambda: compute_features(live_window, features), repeats)
+    flat = export_booster(model)
+    row, _ = compute_features(live_window, features)
+    row = row[features].iloc[-1:]
+    flat.predict_proba(row)  # Compila o kernel antes de medir
+    inference_ms = median_ms(lambda: flat.predict_proba(row), repeats)
+    return feature_ms, inference_ms
+
+
+def pareto_front(table):
+    """A row is on the front if no other row is at least as accurate and at least as fast (strictly better in one)"""
+    flags = []
+    for _, row in table.iterrows():
+        dominated = ((table['accuracy'] >= row['accuracy']) & (table['total_ms'] <= row['total_ms']) &
+                     ((table['accuracy'] > row['accuracy']) | (table['total_ms'] < row['total_ms']))).any()
+        flags.append(not dominated)
+    return flags
+
+
+def run_selection(df, params, sizes=None, importance='gain', corr_threshold=0.98, horizon=15,
+                  valid_fraction=0.2, live_window=None, repeats=20):
+    split = int(len(df) * (1 - valid_fraction))
+    train = df.iloc[:split - horizon]  # Purga: rótulos do treino não olham para a validação
+    valid = df.iloc[split:]
+    y_train, y_valid = train['target'].astype(int), valid['target'].astype(int)
+
+    base = fit_model(train[ALL_FEATURES], y_train, params)
+    ranking = rank_features(base, valid[ALL_FEATURES], importance)
+    kept, dropped = drop_correlated(train, list(ranking.index), corr_threshold)
+    for feature, duplicate_of, corr in dropped:
+        logging.info(f"Dropped {feature} (|corr| {corr:.4f} with {duplicate_of})")
+
+    candidates = [('all', ALL_FEATURES), ('decorrelated', kept)]
+    for size in sizes or DEFAULT_SIZES:
+        if size < len(kept):
+            candidates.append((f'top_{size}', kept[:size]))
+
+    rows, models = [], {}
+    for name, features in candidates:
+        model = base if name == 'all' else fit_model(train[features], y_train, params)
+        accuracy = float((model.predict(valid[features]) == y_valid).mean())
+        feature_ms, inference_ms = measure_latency(model, features, live_window, repeats)
+        rows.append({'set': name, 'n_features': len(features), 'accuracy': accuracy,
+                     'feature_ms': feature_ms, 'inference_ms': inference_ms,
+                     'total_ms': feature_ms + inference_ms})
+        models[name] = (model, features)
+        print(f"{name:>13}: {len(features):3d} features | accuracy {accuracy:.4f} | "
+              f"features {feature_ms:.2f}ms + inference {inference_ms:.3f}ms")
+
+    table = pd.DataFrame(rows)
+    table['pareto'] = pareto_front(table)
+    return table, models, ranking, dropped
+
+
+def choose_set(table, max_accuracy_drop=0.005):
+    """Fastest set whose accuracy is within max_accuracy_drop of the best one"""
+    eligible = table[table['accuracy'] >= table['accuracy'].max() - max_accuracy_drop]
+    return eligible.sort_values(['total_ms', 'n_features']).iloc[0]['set']
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description='Latency-aware feature selection for the 113-feature model')
+    parser.add_argument('ohlcv', help='CSV with time, open, high, low, close, volume (1m bars)')
+    parser.add_argument('--params', default=None, help='JSON with best_params (e.g. gpu_perfect_model_params.json)')
+    parser.add_argument('--importance', choices=['gain', 'shap'], default='gain')
+    parser.add_argument('--corr-threshold', type=float, default=0.98)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--max-accuracy-drop', type=float, default=0.005)
+    parser.add_argument('--horizon', type=int, default=15)
+    parser.add_argument('--threshold', type=float, default=0.2)
+    parser.add_argument('--output', default='feature_selection.csv', help='Pareto table')
+    parser.add_argument('--registry', default='models')
+    parser.add_argument('--promote', action='store_true', help='Make the selected model the current version')
+    args = parser.parse_args()
+
+    params = load_base_params(args.params) if args.params else {'n_estimators': 200, 'max_depth': 6, 'learning_rate': 0.1}
+    ohlcv = load_ohlcv(args.ohlcv)
+    df = build_dataset(ohlcv, args.horizon, args.threshold)
+    live_window = ohlcv.iloc[-LIVE_WINDOW_ROWS:].reset_index(drop=True)
+
+    table, models, ranking, dropped = run_selection(df, params, args.sizes, args.importance,
+                                                    args.corr_threshold, args.horizon, live_window=live_window)
+    table.to_csv(args.output, index=False)
+    print("\nPareto table:")
+    print(table.round(4).to_string(index=False))
+
+    chosen = choose_set(table, args.max_accuracy_drop)
+    model, features = models[chosen]
+    chosen_row = table[table['set'] == chosen].iloc[0]
+    print(f"\nSelected '{chosen}': {len(features)} features, accuracy {chosen_row['accuracy']:.4f}, "
+          f"{chosen_row['total_ms']:.2f}ms per signal")
+
+    model_path = f"selected_{len(features)}_features_model.pkl"
+    with open(model_path, 'wb') as f:
+        pickle.dump(model, f)
+    entry = ModelRegistry(args.registry).register(model_path, params={
+        'model_name': 'XGBoost',
+        'profit_threshold': args.threshold,
+        'time_horizon': args.horizon,
+        'best_params': params,
+        'holdout_accuracy': float(chosen_row['accuracy']),
+        'n_samples': int(len(df)),
+        'n_features': len(features),
+        # Lido pelo QuantumTradingSystem: o motor de features calcula só estas colunas
+        'features': list(features),
+        'feature_selection': {
+            'importance': args.importance,
+            'corr_threshold': args.corr_threshold,
+            'dropped_correlated': [list(item) for item in dropped],
+            'ranking': {feature: float(score) for feature, score in ranking.items()},
+            'pareto': table.to_dict(orient='records')
+        },
+        'timestamp': datetime.now().isoformat()
+    }, promote=args.promote)
+    os.remove(model_path)
+    print(f"Registered {entry['version']}")
+
+
+if __name__ == "__main__":
+    main()
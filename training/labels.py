@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+from numba import njit
+
+
+@njit(cache=True, nogil=True)
+def _label_kernel(close, high, low, horizons, take_profits, stop_losses):
+    """
+    Single forward scan per row up to the longest horizon. Records the running
+    max high / min low / close at each horizon and the first bar (1-based) where
+    each take-profit and stop-loss barrier is touched; -1 when never touched.
+    """
+    n = close.shape[0]
+    n_horizons = horizons.shape[0]
+    n_barriers = take_profits.shape[0]
+    max_horizon = horizons[-1]
+
+    fwd_max = np.full((n, n_horizons), np.nan)
+    fwd_min = np.full((n, n_horizons), np.nan)
+    fwd_close = np.full((n, n_horizons), np.nan)
+    first_tp = np.full((n, n_barriers), -1, dtype=np.int32)
+    first_sl = np.full((n, n_barriers), -1, dtype=np.int32)
+
+    for i in range(n):
+        entry = close[i]
+        running_max = -np.inf
+        running_min = np.inf
+        h = 0
+        for k in range(1, max_horizon + 1):
+            j = i + k
+            if j >= n:
+                break
+            if high[j] > running_max:
+                running_max = high[j]
+            if low[j] < running_min:
+                running_min = low[j]
+            for b in range(n_barriers):
+                if first_tp[i, b] == -1 and running_max >= entry * (1.0 + take_profits[b]):
+                    first_tp[i, b] = k
+                if first_sl[i, b] == -1 and running_min <= entry * (1.0 - stop_losses[b]):
+                    first_sl[i, b] = k
+            while h < n_horizons and horizons[h] == k:
+                fwd_max[i, h] = running_max
+                fwd_min[i, h] = running_min
+                fwd_close[i, h] = close[j]
+                h += 1
+    return fwd_max, fwd_min, fwd_close, first_tp, first_sl
+
+
+def _label_name(threshold):
+    return f"{threshold:g}".replace('.', '_')
+
+
+def compute_labels(data, horizons=(5, 15, 30), thresholds=(0.2,), stop_losses=None):
+    """
+    Forward-looking labels for every (horizon, threshold) pair in one pass.
+
+    horizons are in bars; thresholds and stop_losses are in percent, like
+    profit_threshold in gpu_perfect_model_params.json (0.2 = 0.2%). Stop losses
+    default to the take-profit thresholds (symmetric barriers).
+
+    Columns per horizon h:
+        fwd_ret_{h}, fwd_max_ret_{h}, fwd_min_ret_{h}
+    Columns per threshold t and horizon h:
+        profit_{t}_{h}   1 if the high reaches +t% within h bars
+        barrier_{t}_{h}  1 if +t% is touched before -sl% within h bars
+                         (a bar touching both counts as a stop)
+    Columns per threshold t:
+        bars_to_tp_{t}, bars_to_sl_{t}  first touch within the longest horizon, -1 if none
+
+    Rows without a full horizon ahead get NaN so dropna() removes them.
+    """
+    horizons = np.array(sorted(set(int(h) for h in horizons)), dtype=np.int64)
+    thresholds = list(thresholds)
+    stop_losses = list(stop_losses) if stop_losses is not None else thresholds
+    if len(stop_losses) != len(thresholds):
+        raise ValueError("stop_losses must have the same length as thresholds")
+
+    close = data['close'].to_numpy(dtype=np.float64)
+    high = data['high'].to_numpy(dtype=np.float64)
+    low = data['low'].to_numpy(dtype=np.float64)
+
+    fwd_max, fwd_min, fwd_close, first_tp, first_sl = _label_kernel(
+        close, high, low, horizons,
+        np.asarray(thresholds, dtype=np.float64) / 100.0,
+        np.asarray(stop_losses, dtype=np.float64) / 100.0
+    )
+
+    labels = {}
+    entry = close[:, None]
+    fwd_ret = fwd_close / entry - 1.0
+    fwd_max_ret = fwd_max / entry - 1.0
+    fwd_min_ret = fwd_min / entry - 1.0
+    for h_index, horizon in enumerate(horizons):
+        labels[f'fwd_ret_{horizon}'] = fwd_ret[:, h_index]
+        labels[f'fwd_max_ret_{horizon}'] = fwd_max_ret[:, h_index]
+        labels[f'fwd_min_ret_{horizon}'] = fwd_min_ret[:, h_index]
+
+    for b_index, threshold in enumerate(thresholds):
+        name = _label_name(threshold)
+        tp = first_tp[:, b_index]
+        sl = first_sl[:, b_index]
+        labels[f'bars_to_tp_{name}'] = tp
+        labels[f'bars_to_sl_{name}'] = sl
+        for h_index, horizon in enumerate(horizons):
+            valid = ~np.isnan(fwd_close[:, h_index])
+            tp_in_window = (tp > 0) & (tp <= horizon)
+            stopped_first = (sl > 0) & (sl <= tp)
+            labels[f'profit_{name}_{horizon}'] = np.where(valid, tp_in_window, np.nan)
+            labels[f'barrier_{name}_{horizon}'] = np.where(valid, tp_in_window & ~stopped_first, np.nan)
+
+    return pd.DataFrame(labels, index=data.index)
+
+
+def add_profit_target(data, horizon=15, threshold=0.2, stop_loss=None):
+    """Set data['target'] to the production target: +threshold% within horizon bars"""
+    column = 'profit' if stop_loss is None else 'barrier'
+    labels = compute_labels(data, horizons=(horizon,), thresholds=(threshold,),
+                            stop_losses=None if stop_loss is None else (stop_loss,))
+    data['target'] = labels[f'{column}_{_label_name(threshold)}_{horizon}']
+    return data
@@ -0,0 +1,302 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import optuna
+import xgboost as xgb
+from optuna.study import MaxTrialsCallback
+from optuna.trial import TrialState
+from sklearn.ensemble import RandomForestClassifier
+from xgboost import XGBClassifier
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from quantum_model_registry import ModelRegistry  # noqa: E402
+
+DEFAULT_STORAGE = 'sqlite:///optuna_studies.db'
+DEFAULT_CACHE_DIR = 'feature_cache'
+
+
+def suggest_random_forest(trial):
+    return {
+        'n_estimators': trial.suggest_int('n_estimators', 50, 400, step=50),
+        'max_depth': trial.suggest_int('max_depth', 3, 12),
+        'min_samples_split': trial.suggest_int('min_samples_split', 2, 20),
+        'min_samples_leaf': trial.suggest_int('min_samples_leaf', 1, 10),
+        'max_features': trial.suggest_categorical('max_features', ['sqrt', 'log2', None])
+    }
+
+
+def suggest_xgboost(trial):
+    return {
+        'n_estimators': trial.suggest_int('n_estimators', 50, 800, step=50),
+        'max_depth': trial.suggest_int('max_depth', 3, 15),
+        'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3, log=True),
+        'subsample': trial.suggest_float('subsample', 0.5, 1.0),
+        'colsample_bytree': trial.suggest_float('colsample_bytree', 0.5, 1.0),
+        'min_child_weight': trial.suggest_int('min_child_weight', 1, 10),
+        'reg_alpha': trial.suggest_float('reg_alpha', 1e-3, 10.0, log=True),
+        'reg_lambda': trial.suggest_float('reg_lambda', 1e-3, 10.0, log=True)
+    }
+
+
+SEARCH_SPACES = {
+    'RandomForest': suggest_random_forest,
+    'XGBoost': suggest_xgboost
+}
+
+
+class FeatureCache:
+    """Feature matrix and target saved once as .npy and memory-mapped by every worker"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.X_path = os.path.join(cache_dir, 'X.npy')
+        self.y_path = os.path.join(cache_dir, 'y.npy')
+        self.features_path = os.path.join(cache_dir, 'features.txt')
+
+    def exists(self):
+        return os.path.exists(self.X_path) and os.path.exists(self.y_path)
+
+    @classmethod
+    def from_frame(cls, df, features, cache_dir=DEFAULT_CACHE_DIR, target='target'):
+        cache = cls(cache_dir)
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(cache.X_path, df[features].to_numpy(dtype=np.float32))
+        np.save(cache.y_path, df[target].to_numpy(dtype=np.int8))
+        cache._write_features(features)
+        return cache
+
+    @classmethod
+    def from_store(cls, store, features, cache_dir=DEFAULT_CACHE_DIR, target='target'):
+        """Build the cache from a ChunkStore (see out_of_core.py) without loading it all in RAM"""
+        cache = cls(cache_dir)
+        os.makedirs(cache_dir, exist_ok=True)
+        n_rows = store.total_rows
+        X = np.lib.format.open_memmap(cache.X_path, mode='w+', dtype=np.float32, shape=(n_rows, len(features)))
+        y = np.lib.format.open_memmap(cache.y_path, mode='w+', dtype=np.int8, shape=(n_rows,))
+        offset = 0
+        for chunk in store.iter_chunks(features + [target]):
+            rows = len(chunk)
+            X[offset:offset + rows] = chunk[features].to_numpy(dtype=np.float32)
+            y[offset:offset + rows] = chunk[target].to_numpy(dtype=np.int8)
+            offset += rows
+        X.flush()
+        y.flush()
+        cache._write_features(features)
+        return cache
+
+    def _write_features(self, features):
+        with open(self.features_path, 'w') as f:
+            f.write('\n'.join(features))
+
+    @property
+    def features(self):
+        with open(self.features_path, 'r') as f:
+            return f.read().split('\n')
+
+    def load(self):
+        return np.load(self.X_path, mmap_mode='r'), np.load(self.y_path, mmap_mode='r')
+
+
+# Folds (and their DMatrix) are built once per worker process and reused by every trial
+_FOLD_CACHE = {}
+
+
+def get_folds(cache, n_splits, nthread, label_horizon=1):
+    from walk_forward import purged_splits
+
+    key = (os.path.abspath(cache.cache_dir), n_splits, label_horizon)
+    if key not in _FOLD_CACHE:
+        X, y = cache.load()
+        folds = []
+        for train_index, valid_index in purged_splits(X.shape[0], n_splits, label_horizon):
+            fold = {
+                'X_train': np.asarray(X[train_index]), 'y_train': np.asarray(y[train_index]),
+                'X_valid': np.asarray(X[valid_index]), 'y_valid': np.asarray(y[valid_index])
+            }
+            fold['dtrain'] = xgb.DMatrix(fold['X_train'], label=fold['y_train'], nthread=nthread)
+            fold['dvalid'] = xgb.DMatrix(fold['X_valid'], label=fold['y_valid'], nthread=nthread)
+            folds.append(fold)
+        _FOLD_CACHE[key] = folds
+    return _FOLD_CACHE[key]
+
+
+def score_fold(model_name, params, fold, nthread):
+    if model_name == 'XGBoost':
+        train_params = {k: v for k, v in params.items() if k != 'n_estimators'}
+        train_params.update({'objective': 'binary:logistic', 'tree_method': 'hist',
+                             'nthread': nthread, 'seed': 42})
+        booster = xgb.train(train_params, fold['dtrain'], num_boost_round=params['n_estimators'])
+        y_pred = booster.predict(fold['dvalid']) > 0.5
+    else:
+        model = RandomForestClassifier(random_state=42, n_jobs=nthread, **params)
+        model.fit(fold['X_train'], fold['y_train'])
+        y_pred = model.predict(fold['X_valid'])
+    return float((y_pred == fold['y_valid']).mean())
+
+
+def make_objective(model_name, cache, n_splits, nthread, label_horizon=1):
+    suggest = SEARCH_SPACES[model_name]
+
+    def objective(trial):
+        params = suggest(trial)
+        folds = get_folds(cache, n_splits, nthread, label_horizon)
+        scores = []
+        for step, fold in enumerate(folds):
+            scores.append(score_fold(model_name, params, fold, nthread))
+            # Report the running CV mean so the pruner can stop weak trials after early folds
+            trial.report(float(np.mean(scores)), step)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
+        trial.set_user_attr('cv_std_accuracy', float(np.std(scores)))
+        return float(np.mean(scores))
+
+    return objective
+
+
+def make_pruner(name, n_splits):
+    if name == 'hyperband':
+        return optuna.pruners.HyperbandPruner(min_resource=1, max_resource=n_splits)
+    if name == 'none':
+        return optuna.pruners.NopPruner()
+    return optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=1)
+
+
+def make_storage(storage_url):
+    if storage_url.startswith('sqlite'):
+        # Several processes write to the same file; wait on locks instead of failing
+        return optuna.storages.RDBStorage(storage_url, engine_kwargs={'connect_args': {'timeout': 60}})
+    return storage_url
+
+
+def _run_worker(worker_id, study_name, storage_url, model_name, cache_dir, n_splits, n_trials, pruner_name, nthread,
+                label_horizon):
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = optuna.load_study(
+        study_name=study_name,
+        storage=make_storage(storage_url),
+        sampler=optuna.samplers.TPESampler(seed=42 + worker_id),
+        pruner=make_pruner(pruner_name, n_splits)
+    )
+    objective = make_objective(model_name, FeatureCache(cache_dir), n_splits, nthread, label_horizon)
+    study.optimize(objective, callbacks=[MaxTrialsCallback(n_trials, states=(TrialState.COMPLETE, TrialState.PRUNED))])
+
+
+def run_study(model_name, cache, n_trials=50, n_workers=None, n_splits=5, pruner='median',
+              storage_url=DEFAULT_STORAGE, study_name=None, label_horizon=1):
+    """
+    Run (or resume) a study; n_trials is the total across all workers and restarts.
+    label_horizon (bars) purges training rows whose label looks into the validation fold.
+    """
+    n_workers = n_workers or max(1, multiprocessing.cpu_count() // 2)
+    nthread = max(1, multiprocessing.cpu_count() // n_workers)
+    study_name = study_name or f"{model_name.lower()}_search"
+
+    study = optuna.create_study(
+        study_name=study_name,
+        storage=make_storage(storage_url),
+        direction='maximize',
+        pruner=make_pruner(pruner, n_splits),
+        load_if_exists=True
+    )
+    finished = len(study.get_trials(deepcopy=False, states=(TrialState.COMPLETE, TrialState.PRUNED)))
+    logging.info(f"Study '{study_name}': {finished}/{n_trials} trials done, {n_workers} workers x {nthread} threads")
+
+    started = time.time()
+    workers = [
+        multiprocessing.Process(
+            target=_run_worker,
+            args=(worker_id, study_name, storage_url, model_name, cache.cache_dir, n_splits, n_trials, pruner, nthread,
+                  label_horizon)
+        )
+        for worker_id in range(n_workers)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    study = optuna.load_study(study_name=study_name, storage=make_storage(storage_url))
+    pruned = len(study.get_trials(deepcopy=False, states=(TrialState.PRUNED,)))
+    logging.info(f"Search finished in {time.time() - started:.1f}s ({pruned} trials pruned)")
+    logging.info(f"Best CV accuracy: {study.best_value:.4f} with {study.best_params}")
+    return study
+
+
+def fit_best(model_name, study, cache):
+    X, y = cache.load()
+    if model_name == 'XGBoost':
+        model = XGBClassifier(random_state=42, tree_method='hist', **study.best_params)
+    else:
+        model = RandomForestClassifier(random_state=42, n_jobs=-1, **study.best_params)
+    model.fit(np.asarray(X), np.asarray(y))
+    return model
+
+
+def export_best(model_name, study, cache, model_path, registry_dir='models', promote=False):
+    """Fit the best configuration on the full cache, save it and register it with its params"""
+    started = time.time()
+    model = fit_best(model_name, study, cache)
+    joblib.dump(model, model_path)
+
+    best_trial = study.best_trial
+    X, _ = cache.load()
+    params = {
+        'model_name': model_name,
+        'best_params': study.best_params,
+        'cv_mean_accuracy': study.best_value,
+        'cv_std_accuracy': best_trial.user_attrs.get('cv_std_accuracy'),
+        'n_samples': int(X.shape[0]),
+        'n_features': int(X.shape[1]),
+        'features': cache.features,
+        'training_time': time.time() - started,
+        'study_name': study.study_name,
+        'n_trials': len(study.trials),
+        'timestamp': datetime.now().isoformat()
+    }
+    entry = ModelRegistry(registry_dir).register(model_path, params=params, promote=promote)
+    print(f"Model saved as '{model_path}' and registered as {entry['version']}")
+    return entry
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description='Parallel Optuna search with pruning')
+    parser.add_argument('--model', choices=list(SEARCH_SPACES), default='XGBoost')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_DIR, help='Directory with X.npy/y.npy')
+    parser.add_argument('--feature-store', default=None, help='ChunkStore directory to build the cache from')
+    parser.add_argument('--trials', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--splits', type=int, default=5)
+    parser.add_argument('--horizon', type=int, default=1, help='Label horizon in bars (15 for the profit target)')
+    parser.add_argument('--pruner', choices=['median', 'hyperband', 'none'], default='median')
+    parser.add_argument('--storage', default=DEFAULT_STORAGE)
+    parser.add_argument('--study', default=None)
+    parser.add_argument('--registry', default='models')
+    parser.add_argument('--promote', action='store_true', help='Make the exported model the current version')
+    args = parser.parse_args()
+
+    if args.feature_store:
+        from out_of_core import ChunkStore
+        from XGBClassifier import config
+        cache = FeatureCache.from_store(ChunkStore(args.feature_store), config['features'], args.cache)
+    else:
+        cache = FeatureCache(args.cache)
+    if not cache.exists():
+        print(f"No feature cache found in '{args.cache}'. Use --feature-store to build it.")
+        return
+
+    study = run_study(args.model, cache, args.trials, args.workers, args.splits, args.pruner,
+                      args.storage, args.study, args.horizon)
+    export_best(args.model, study, cache, f'{args.model.lower()}_model.pkl', args.registry, args.promote)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from XGBClassifier import HistoricalDataRetriever, RateCache, prepare_data, config
+
+# Rows of raw history carried from one chunk into the next so rolling/EWM
+# indicators (EMA 26, signal line, RSI 14) are warmed up at chunk boundaries.
+DEFAULT_OVERLAP_ROWS = 500
+
+
+class ChunkStore:
+    """Columnar on-disk store: one directory per chunk, one .npy file per column"""
+
+    def __init__(self, root):
+        self.root = root
+        self.manifest_path = os.path.join(root, 'manifest.json')
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r') as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {'columns': None, 'chunks': []}
+
+    def __len__(self):
+        return len(self.manifest['chunks'])
+
+    @property
+    def columns(self):
+        return self.manifest['columns']
+
+    @property
+    def total_rows(self):
+        return sum(chunk['rows'] for chunk in self.manifest['chunks'])
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        self.manifest = {'columns': None, 'chunks': []}
+
+    def append(self, df, name=None):
+        name = name or f"chunk_{len(self):05d}"
+        chunk_dir = os.path.join(self.root, name)
+        os.makedirs(chunk_dir, exist_ok=True)
+        for column in df.columns:
+            np.save(os.path.join(chunk_dir, f"{column}.npy"), df[column].to_numpy())
+
+        if self.manifest['columns'] is None:
+            self.manifest['columns'] = list(df.columns)
+        entry = {'name': name, 'rows': int(len(df))}
+        if 'time' in df.columns and len(df):
+            entry['start'] = str(df['time'].iloc[0])
+            entry['end'] = str(df['time'].iloc[-1])
+        self.manifest['chunks'].append(entry)
+        self._write_manifest()
+        return entry
+
+    def _write_manifest(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def read_chunk(self, index, columns=None, mmap=True):
+        """Load one chunk; columns are memory-mapped so only touched pages are read"""
+        chunk_dir = os.path.join(self.root, self.manifest['chunks'][index]['name'])
+        columns = columns or self.columns
+        mmap_mode = 'r' if mmap else None
+        return pd.DataFrame({
+            column: np.load(os.path.join(chunk_dir, f"{column}.npy"), mmap_mode=mmap_mode)
+            for column in columns
+        })
+
+    def iter_chunks(self, columns=None, indices=None):
+        for index in (range(len(self)) if indices is None else indices):
+            yield self.read_chunk(index, columns)
+
+
+def stream_rates_to_store(symbol, start_date, end_date, store, cache=None):
+    """Download month by month and write each month straight to disk (no all_data list)"""
+    chunk_start = start_date
+    chunk_end = min((chunk_start + pd.DateOffset(months=1)) - pd.Timedelta(days=1), end_date)
+
+    while chunk_start <= end_date:
+        data_retriever = HistoricalDataRetriever(symbol, chunk_start, chunk_end, cache=cache)
+        rates = data_retriever.get_historical_data()
+        if rates is None:
+            print(f"No more data found after {chunk_start.strftime('%Y-%m-%d')}")
+            break
+
+        df = data_retriever.convert_to_dataframe(rates)
+        store.append(df, name=chunk_start.strftime('%Y_%m_%d'))
+        print(f"Stored {len(df)} rows for {chunk_start.strftime('%Y-%m-%d')} to {chunk_end.strftime('%Y-%m-%d')}")
+
+        chunk_start = chunk_end + pd.Timedelta(days=1)
+        chunk_end = min((chunk_start + pd.DateOffset(months=1)) - pd.Timedelta(days=1), end_date)
+
+    return store
+
+
+def build_feature_store(raw_store, feature_store, overlap_rows=DEFAULT_OVERLAP_ROWS):
+    """
+    Compute features chunk by chunk. The tail of the previous chunk is prepended
+    as warm-up for the rolling indicators and also supplies the next close for the
+    last row of the previous chunk, so no row is lost at a boundary. Only rows newer
+    than the last emitted timestamp are written.
+    """
+    columns = config['features'] + ['target']
+    tail = None
+    last_emitted = None
+
+    for raw in raw_store.iter_chunks():
+        raw = raw.copy()
+        combined = raw if tail is None else pd.concat([tail, raw], ignore_index=True)
+        tail = combined.iloc[-overlap_rows:].reset_index(drop=True)
+
+        prepared = prepare_data(combined.copy())
+        if last_emitted is not None:
+            prepared = prepared[prepared['time'] > last_emitted]
+        if prepared.empty:
+            continue
+
+        last_emitted = prepared['time'].iloc[-1]
+        feature_store.append(prepared[['time'] + columns].reset_index(drop=True).astype(
+            {column: np.float32 for column in config['features']}))
+
+    logging.info(f"Feature store: {feature_store.total_rows} rows in {len(feature_store)} chunks")
+    return feature_store
+
+
+class ChunkIterator(xgb.DataIter):
+    """Feeds feature chunks to XGBoost one at a time (external memory)"""
+
+    def __init__(self, store, indices, features, label='target', cache_prefix=None):
+        self.store = store
+        self.indices = list(indices)
+        self.features = features
+        self.label = label
+        self._position = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._position >= len(self.indices):
+            return False
+        chunk = self.store.read_chunk(self.indices[self._position], self.features + [self.label])
+        input_data(
+            data=np.ascontiguousarray(chunk[self.features].to_numpy(dtype=np.float32)),
+            label=chunk[self.label].to_numpy(),
+            feature_names=self.features
+        )
+        self._position += 1
+        return True
+
+    def reset(self):
+        self._position = 0
+
+
+def train_out_of_core(feature_store, params=None, num_boost_round=100, valid_chunks=1, cache_dir='xgb_cache'):
+    """Train on all chunks except the last valid_chunks, which are used for evaluation"""
+    features = config['features']
+    n_chunks = len(feature_store)
+    if n_chunks <= valid_chunks:
+        raise ValueError(f"Need more than {valid_chunks} chunks to hold out validation data")
+
+    os.makedirs(cache_dir, exist_ok=True)
+    train_iter = ChunkIterator(feature_store, range(n_chunks - valid_chunks), features,
+                               cache_prefix=os.path.join(cache_dir, 'train'))
+    valid_iter = ChunkIterator(feature_store, range(n_chunks - valid_chunks, n_chunks), features,
+                               cache_prefix=os.path.join(cache_dir, 'valid'))
+    dtrain = xgb.DMatrix(train_iter)
+    dvalid = xgb.DMatrix(valid_iter)
+
+    train_params = {
+        'objective': 'binary:logistic',
+        'eval_metric': ['logloss', 'error'],
+        'tree_method': 'hist',
+        'max_depth': 5,
+        'learning_rate': 0.1,
+        'seed': 42
+    }
+    train_params.update(params or {})
+
+    booster = xgb.train(train_params, dtrain, num_boost_round=num_boost_round,
+                        evals=[(dtrain, 'train'), (dvalid, 'valid')], verbose_eval=25)
+
+    y_valid = dvalid.get_label()
+    accuracy = float(((booster.predict(dvalid) > 0.5) == y_valid).mean())
+    print(f"Validation accuracy: {accuracy}")
+    return booster
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    symbol = "BTCUSD"
+    start_date = datetime(2020, 1, 1)
+    end_date = datetime(2022, 12, 31)
+
+    raw_store = ChunkStore(os.path.join('data', symbol, 'raw'))
+    feature_store = ChunkStore(os.path.join('data', symbol, 'features'))
+    raw_store.clear()
+    feature_store.clear()
+
+    stream_rates_to_store(symbol, start_date, end_date, raw_store, cache=RateCache())
+    if len(raw_store) == 0:
+        print(f"No data found for {symbol} in any of the date ranges.")
+        return
+
+    build_feature_store(raw_store, feature_store)
+    booster = train_out_of_core(feature_store, num_boost_round=200)
+
+    booster.save_model('xgboost_out_of_core_model.json')
+    print("Model saved as 'xgboost_out_of_core_model.json'")
+
+
+if __name__ == "__main__":
+    main()
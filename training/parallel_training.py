@@ -0,0 +1,141 @@
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import ParameterGrid
+
+from optuna_search import FeatureCache
+from walk_forward import purged_splits
+
+DEFAULT_RESULTS_PATH = 'training_results.csv'
+
+# Memory-mapped inputs, opened once per worker process
+_WORKER_DATA = {}
+
+
+def cpu_budget(n_jobs, n_workers=None):
+    """Workers and threads per job so that workers * threads <= available cores"""
+    n_cpus = multiprocessing.cpu_count()
+    n_workers = max(1, min(n_workers or n_cpus, n_jobs, n_cpus))
+    return n_workers, max(1, n_cpus // n_workers)
+
+
+def expand_jobs(models_config):
+    """One job per (model family, parameter set) in config['models']"""
+    return [
+        (model_name, params)
+        for model_name, model_info in models_config.items()
+        for params in ParameterGrid(model_info['param_grid'])
+    ]
+
+
+def _init_worker(cache_dir):
+    X, y = FeatureCache(cache_dir).load()
+    _WORKER_DATA['X'] = X
+    _WORKER_DATA['y'] = y
+
+
+def _make_estimator(estimator, params, nthread):
+    model = clone(estimator).set_params(**params)
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=nthread)
+    return model
+
+
+def _balance(X, y):
+    from imblearn.over_sampling import SMOTE
+    return SMOTE(random_state=42).fit_resample(X, y)
+
+
+def _cv_job(job_id, model_name, estimator, params, n_splits, label_horizon, balance, nthread):
+    """Cross-validated accuracy of one parameter set (folds run sequentially inside the job)"""
+    X, y = _WORKER_DATA['X'], _WORKER_DATA['y']
+    started = time.perf_counter()
+    scores = []
+    for train_index, test_index in purged_splits(X.shape[0], n_splits, label_horizon):
+        X_train, y_train = np.asarray(X[train_index]), np.asarray(y[train_index])
+        if balance:
+            # Only the training fold is resampled, so the test fold stays untouched
+            X_train, y_train = _balance(X_train, y_train)
+        model = _make_estimator(estimator, params, nthread)
+        model.fit(X_train, y_train)
+        scores.append(accuracy_score(np.asarray(y[test_index]), model.predict(np.asarray(X[test_index]))))
+    return {
+        'job': job_id,
+        'model': model_name,
+        'params': json.dumps(params, sort_keys=True),
+        'cv_accuracy': float(np.mean(scores)),
+        'cv_std': float(np.std(scores)),
+        'nthread': nthread,
+        'pid': os.getpid(),
+        'seconds': time.perf_counter() - started
+    }
+
+
+def _refit_job(model_name, estimator, params, balance, nthread, artifact_path):
+    """Fit the winning parameter set on all rows and save it"""
+    X, y = _WORKER_DATA['X'], _WORKER_DATA['y']
+    started = time.perf_counter()
+    X_all, y_all = np.asarray(X), np.asarray(y)
+    if balance:
+        X_all, y_all = _balance(X_all, y_all)
+    model = _make_estimator(estimator, params, nthread)
+    model.fit(X_all, y_all)
+    joblib.dump(model, artifact_path)
+    return model_name, artifact_path, time.perf_counter() - started
+
+
+def train_models_parallel(cache, models_config, n_workers=None, n_splits=5, label_horizon=1, balance=False,
+                          output_dir='.', results_path=DEFAULT_RESULTS_PATH):
+    """
+    Grid-search every model family on a process pool. All workers memory-map the
+    same FeatureCache; each job gets cpu_count // n_workers threads. The best
+    parameter set of each family is refitted and saved as <model>_model.pkl.
+    Returns the results table (one row per job), also written to results_path.
+    """
+    jobs = expand_jobs(models_config)
+    n_workers, nthread = cpu_budget(len(jobs), n_workers)
+    logging.info(f"{len(jobs)} jobs over {len(models_config)} models: {n_workers} workers x {nthread} threads")
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(cache.cache_dir,)) as pool:
+        futures = [
+            pool.submit(_cv_job, job_id, model_name, models_config[model_name]['model'], params,
+                        n_splits, label_horizon, balance, nthread)
+            for job_id, (model_name, params) in enumerate(jobs)
+        ]
+        results = pd.DataFrame([future.result() for future in futures]).set_index('job')
+
+        best = results.loc[results.groupby('model')['cv_accuracy'].idxmax()]
+        # Fewer refits than jobs: give each one a larger share of the cores
+        _, refit_threads = cpu_budget(len(best), n_workers)
+        refits = [
+            pool.submit(_refit_job, row['model'], models_config[row['model']]['model'], json.loads(row['params']),
+                        balance, refit_threads, os.path.join(output_dir, f"{row['model'].lower()}_model.pkl"))
+            for _, row in best.iterrows()
+        ]
+        artifacts = {model_name: (path, seconds) for model_name, path, seconds in (f.result() for f in refits)}
+    wall_time = time.perf_counter() - started
+
+    results['best'] = results.index.isin(best.index)
+    results['artifact'] = [artifacts[model][0] if is_best else '' for model, is_best in
+                           zip(results['model'], results['best'])]
+    results['refit_seconds'] = [artifacts[model][1] if is_best else np.nan for model, is_best in
+                                zip(results['model'], results['best'])]
+    results.attrs['wall_time'] = wall_time
+    if results_path:
+        results.to_csv(results_path)
+
+    for model_name, row in results[results['best']].set_index('model').iterrows():
+        print(f"Model: {model_name} | CV accuracy {row['cv_accuracy']:.4f} (+/- {row['cv_std']:.4f}) "
+              f"with {row['params']} -> '{row['artifact']}'")
+    print(f"Wall time: {wall_time:.1f}s | Sum of job times: {results['seconds'].sum():.1f}s")
+    return results
@@ -2,18 +2,24 @@ import MetaTrader5 as mt5
 import pandas as pd
 from datetime import datetime
 import logging
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import TimeSeriesSplit, GridSearchCV
+import os
+import sys
 from sklearn.metrics import classification_report, accuracy_score
 import numpy as np
 import joblib  # Import joblib for saving the model
+from optuna_search import FeatureCache, run_study, fit_best
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trading_system.data_sources.rate_cache import RateCache  # noqa: E402
 
 class HistoricalDataRetriever:
-    def __init__(self, symbol, start_date, end_date):
+    def __init__(self, symbol, start_date, end_date, cache=None):
         self.symbol = symbol
         self.timeframe = mt5.TIMEFRAME_M5  # 5-minute timeframe
+        self.timeframe_name = '5m'  # Cache key, shared with HistoricalDataSource
         self.start_date = start_date
         self.end_date = end_date
+        self.cache = cache
 
     def initialize_mt5(self):
         if not mt5.initialize():
@@ -26,17 +32,25 @@ class HistoricalDataRetriever:
         mt5.shutdown()
         logging.info("MetaTrader5 shutdown successfully.")
 
-    def get_historical_data(self):
+    def fetch_rates(self, start_date, end_date):
         if not self.initialize_mt5():
             return None
 
         try:
-            rates = mt5.copy_rates_range(self.symbol, self.timeframe, self.start_date, self.end_date)
+            rates = mt5.copy_rates_range(self.symbol, self.timeframe, start_date, end_date)
         except Exception as e:
             logging.error(f"Error retrieving data: {e}")
             rates = None
         finally:
             self.shutdown_mt5()
+        return rates
+
+    def get_historical_data(self):
+        if self.cache is not None:
+            # MT5 is only initialized for days that are not cached yet
+            rates = self.cache.get(self.symbol, self.timeframe_name, self.start_date, self.end_date, self.fetch_rates)
+        else:
+            rates = self.fetch_rates(self.start_date, self.end_date)
 
         if rates is None or len(rates) == 0:
             logging.warning(f"No data available for {self.symbol} in the specified range.")
@@ -65,7 +79,7 @@ def prepare_data(data):
     data['close_open_range'] = data['close'] - data['open']
     
     data['price_change'] = data['close'].shift(-1) - data['close']
-    data['target'] = data['price_change'].apply(lambda x: 1 if x > 0 else 0)
+    data['target'] = (data['price_change'] > 0).astype(int)
     data.dropna(inplace=True)
     return data
 
@@ -87,7 +101,7 @@ def main():
     all_data = []
 
     while True:
-        data_retriever = HistoricalDataRetriever(symbol, start_date, end_date)
+        data_retriever = HistoricalDataRetriever(symbol, start_date, end_date, cache=RateCache())
         rates = data_retriever.get_historical_data()
 
         if rates is not None:
@@ -122,18 +136,10 @@ def main():
     X = df[features]
     y = df['target']
 
-    tscv = TimeSeriesSplit(n_splits=5)
-    model = RandomForestClassifier(random_state=42)
-
-    param_grid = {
-        'n_estimators': [50, 100, 200],
-        'max_depth': [4, 6, 8],
-        'min_samples_split': [2, 5, 10]
-    }
-
-    grid_search = GridSearchCV(model, param_grid, cv=tscv, scoring='accuracy')
-    grid_search.fit(X, y)
-    best_model = grid_search.best_estimator_
+    # Parallel Optuna search over a cached feature matrix (resumable from optuna_studies.db)
+    cache = FeatureCache.from_frame(df, features)
+    study = run_study('RandomForest', cache, n_trials=50, n_splits=5)
+    best_model = fit_best('RandomForest', study, cache)
 
     y_pred = best_model.predict(X)
     print(classification_report(y, y_pred))